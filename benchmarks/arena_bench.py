@@ -0,0 +1,70 @@
+import sys, gc, time, tracemalloc
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+import simple_token
+import simple_parser
+import simple_resolver
+import simple_eval
+import simple_arena
+import object as obj
+
+# machine generated looking code: many top level functions and calls, every line evaluates
+LINE = 'let add_%s = fn(x, y) { if (x == y) { x * 2 } else { x + y - 10 / 3 } }; let s_%s = add_%s(%d, 2) + len([1, 2, {"k": true}]);\n'
+
+# identifiers cannot contain digits
+def name(number: int) -> str:
+    letters = ""
+    while True:
+        number, letter = divmod(number, 26)
+        letters += chr(ord("a") + letter)
+        if number == 0: return letters
+
+def parse_tree(source: str):
+    program = simple_parser.Parser(simple_token.RegexLexer(source)).parse_program()
+    simple_resolver.Resolver().resolve(program)
+    return program
+
+def parse_arena(source: str): return simple_arena.parse(simple_parser.Parser(simple_token.RegexLexer(source)))
+
+LAYOUTS = {"tree": (parse_tree, simple_eval.Evaluator), "arena": (parse_arena, simple_arena.ArenaEvaluator)}
+
+def memory(parse, source: str) -> tuple[float, float]:
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    parsed = parse(source)
+    gc.collect()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del parsed
+    return (peak - start) / 1024 / 1024, (kept - start) / 1024 / 1024
+
+# a full collection with the parsed program alive, what every gen2 collection of a long running process pays for holding it
+def gc_pause(parsed) -> float:
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        gc.collect()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    source = "".join(LINE % (name(line), name(line), name(line), line) for line in range(lines)) + f's_{name(lines - 1)}'
+    print(f'{lines} lines, {len(source) / 1024 / 1024:.1f} MB of source')
+    for layout, (parse, evaluator) in LAYOUTS.items():
+        peak, kept = memory(parse, source)
+        start = time.perf_counter()
+        parsed = parse(source)
+        parse_time = time.perf_counter() - start
+        pause = gc_pause(parsed)
+        tracked = len(gc.get_objects())
+        start = time.perf_counter()
+        evaluated = evaluator().eval(parsed, obj.Environment())
+        eval_time = time.perf_counter() - start
+        print(f'{layout:>6}: parse {parse_time:.2f}s, {peak:.1f} MB peak, {kept:.1f} MB kept, gc pause {pause * 1000:.1f} ms over {tracked} tracked objects, eval {eval_time:.2f}s ({evaluated.inspect()})')
+        del parsed, evaluated
@@ -0,0 +1,24 @@
+import sys, time, os
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+import simple_batch
+
+SCRIPT = """let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+fib(%d);"""
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    sources = [SCRIPT % (10 + i % 8) for i in range(count)]
+    baseline = None
+    for mode in simple_batch.MODES:
+        for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+            with simple_batch.BatchRunner(workers, mode) as runner:
+                runner.run(sources[:workers])
+                start = time.perf_counter()
+                runner.run(sources)
+                elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            print(f'{mode:>7} x{workers:<3}: {count / elapsed:8.0f} programs/s ({baseline / elapsed:.1f}x)')
@@ -0,0 +1,33 @@
+import sys, time
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+import simple_token
+import simple_parser
+import simple_engine
+import object as obj
+
+FIB = """let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+fib(%d);"""
+
+def bench(source: str, engine: str, repeat: int = 3):
+    program = simple_parser.Parser(simple_token.Lexer(source)).parse_program()
+    best = None
+    for _ in range(repeat):
+        evaluator = simple_engine.new_engine(engine)
+        start = time.perf_counter()
+        result = evaluator.eval(program, obj.Environment())
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 25
+    sys.setrecursionlimit(100000)
+    baseline = None
+    for engine in simple_engine.ENGINES:
+        result, elapsed = bench(FIB % n, engine)
+        baseline = baseline or elapsed
+        print(f'{engine:>10}: fib({n}) = {result.inspect()} in {elapsed:.3f}s ({baseline / elapsed:.1f}x)')
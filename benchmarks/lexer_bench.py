@@ -0,0 +1,37 @@
+import sys, time, os, tempfile, tracemalloc
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+import simple_token
+
+LINE = 'let add_%d = fn(x, y) { if (x == y) { x * 2 } else { x + y - 10 / 3 } }; let s = "string %d"; add(s, [1, 2, {"k": true}]) != false;\n'
+
+if __name__ == "__main__":
+    megabytes = float(sys.argv[1]) if len(sys.argv) > 1 else 5
+    lines = []
+    while sum(len(line) for line in lines) < megabytes * 1024 * 1024: lines.append(LINE % (len(lines), len(lines)))
+    source = "".join(lines)
+    size = len(source.encode()) / 1024 / 1024
+    with tempfile.NamedTemporaryFile("w", suffix=".monkey", delete=False) as file: file.write(source)
+    del lines, source
+    # reading the file is part of the work for every lexer, the in memory ones need the whole text first
+    lexers = {"Lexer": lambda path: simple_token.Lexer(open(path).read()), "RegexLexer": lambda path: simple_token.RegexLexer(open(path).read()), "StreamLexer": simple_token.StreamLexer}
+    baseline = None
+    try:
+        for name, new_lexer in lexers.items():
+            start = time.perf_counter()
+            lexer = new_lexer(file.name)
+            while lexer.next_token().type != simple_token.EOF: pass
+            elapsed = time.perf_counter() - start
+            del lexer
+            tracemalloc.start()
+            lexer = new_lexer(file.name)
+            for _ in range(1000): lexer.next_token()
+            peak = tracemalloc.get_traced_memory()[1] / 1024 / 1024
+            tracemalloc.stop()
+            del lexer
+            baseline = baseline or elapsed
+            print(f'{name:>11}: {size:.1f} MB in {elapsed:.2f}s, {size / elapsed:.2f} MB/s ({baseline / elapsed:.1f}x), {peak:.1f} MB peak')
+    finally: os.unlink(file.name)
@@ -0,0 +1,30 @@
+import sys, gc, tracemalloc
+from pathlib import Path
+
+root_dir = Path(__file__).parent.parent
+sys.path.append(str(root_dir))
+
+import simple_token
+import simple_parser
+import simple_resolver
+
+LINE = 'let add_%d = fn(x, y) { if (x == y) { x * 2 } else { x + y - 10 / 3 } }; let s = "string %d"; add(s, [1, 2, {"k": true}]) != false;\n'
+
+# peak is everything alive while parsing (source, lexer, tree), kept is what the resolved tree holds on to once parsing is done
+def measure(lexer: type, lines: int) -> tuple[float, float]:
+    source = "".join(LINE % (line, line) for line in range(lines))
+    gc.collect()
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    program = simple_parser.Parser(lexer(source)).parse_program()
+    simple_resolver.Resolver().resolve(program)
+    gc.collect()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (peak - start) / lines * 1000 / 1024, (kept - start) / lines * 1000 / 1024
+
+if __name__ == "__main__":
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    for lexer in (simple_token.Lexer, simple_token.RegexLexer):
+        peak, kept = measure(lexer, lines)
+        print(f'{lexer.__name__:>10}, {lines} lines: {peak:.0f} KB peak, {kept:.0f} KB kept per 1k lines')
@@ -1,4 +1,5 @@
 from typing import Callable
+from array import array
 import simple_ast
 
 INTEGER_OBJ = 'INTEGER'
@@ -16,17 +17,37 @@ class Object():
     def type(): raise NotImplementedError('Subclass should implement type() function')
     def inspect(self): return f'{self.value}'
 
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
 class Integer(Object):
     def __init__(self, value: int): self.value = value
     def type(self): return INTEGER_OBJ
     def inspect(self): return str(self.value)
-    def hashkey(self): return hash(('int', self.value))
+    def hashkey(self): return self.value
+
+# integers in this range are shared instead of allocated, like CPython's small int cache
+SMALL_INTEGERS = [Integer(value) for value in range(-5, 257)]
+
+def new_integer(value: int) -> Integer:
+    if type(value) is int and -5 <= value <= 256: return SMALL_INTEGERS[value + 5]
+    return Integer(value)
+
+# booleans need their own keys in a Hash, True and 1 are the same python dict key. the two keys hash by identity,
+# so unpickling maps them back to the shared ones
+class BooleanKey():
+    __slots__ = ("value",)
+    def __init__(self, value: bool): self.value = value
+    def __reduce__(self): return (boolean_key, (self.value,))
+
+BOOLEAN_KEYS = (BooleanKey(False), BooleanKey(True))
+
+def boolean_key(value: bool) -> BooleanKey: return BOOLEAN_KEYS[value]
 
 class Boolean(Object):
     def __init__(self, value: bool): self.value = value
     def type(self): return BOOLEAN_OBJ
     def inspect(self): return str(self.value)
-    def hashkey(self): return hash(('bool', self.value))
+    def hashkey(self): return BOOLEAN_KEYS[self.value]
 
 class Null(Object):
     def inspect(self): return 'null'
@@ -48,45 +69,160 @@ class Environment():
         self.outer = outer
 
     def get(self, key: str) -> Object: 
-        if key in self.environment: return self.environment[key]
-        if self.outer is not None and key in self.outer.environment: return self.outer.environment[key]
-        return None
+        value = self.environment.get(key)
+        if value is None and self.outer is not None: return self.outer.get(key)
+        return value
 
     def set(self, key: str, value: Object): self.environment[key] = value    
 
+    # a new top level scope reading through to this one, its lets shadow ours instead of writing into us
+    def fork(self) -> "Environment": return Environment(self)
+
+# environment of a resolved function call, variables live in slots assigned by simple_resolver
+class SlotEnvironment(Environment):
+    def __init__(self, names: dict[str, int], outer: Environment = None):
+        self.environment: dict[str, Object] = {}
+        self.outer = outer
+        self.names = names
+        self.slots: list[Object] = [None] * len(names)
+
+    def get(self, key: str) -> Object:
+        value = self.slots[self.names[key]] if key in self.names else self.environment.get(key)
+        if value is None and self.outer is not None: return self.outer.get(key)
+        return value
+
+    def set(self, key: str, value: Object):
+        if key in self.names: self.slots[self.names[key]] = value
+        else: self.environment[key] = value
+
+    def get_slot(self, depth: int, slot: int) -> Object:
+        environment = self
+        while depth > 0:
+            environment = environment.outer
+            depth -= 1
+        return environment.slots[slot]
+
 class Builtin(Object):
     def __init__(self, builtin: Callable[[list[Object]], Object]): self.builtin = builtin 
     def inspect(self): return 'builtin function'
-    def type(self): BUILTIN_OBJ
+    def type(self): return BUILTIN_OBJ
 
 class Function(Object):
-    def __init__(self, parameters: list[simple_ast.Identifier], body: simple_ast.BlockStatement, environment: Environment):
+    def __init__(self, parameters: list[simple_ast.Identifier], body: simple_ast.BlockStatement, environment: Environment, compiled: "Compiled" = None, scope: list = None, names: dict[str, int] = None, memo = None):
         self.parameters = parameters
         self.body = body
         self.environment = environment
+        self.compiled = compiled
+        self.scope = scope
+        self.names = names
+        self.memo = memo # call cache of pure functions, see simple_memo_eval
 
     def inspect(self): return f'fn ({''.join(parameter.inspect() for parameter in self.parameters)}) {{{'\n'.join(statement.inspect() for statement in self.body)}}}'
     def type(self): return FUNCTION_OBJ
 
+# strings up to this length are joined right away, longer ones become rope nodes
+FLAT_CONCAT_LIMIT = 64
+
+# a String is either flat or the concatenation of two Strings, the contents are joined on first use of value and cached
 class String(Object):
-    def __init__(self, value: str): self.value = value
+    def __init__(self, value: str = None, left: "String" = None, right: "String" = None):
+        self.flat = value
+        self.left = left
+        self.right = right
+        self.length = len(value) if value is not None else left.length + right.length
+
+    @property
+    def value(self) -> str:
+        if self.flat is None: self.flatten()
+        return self.flat
+
+    def concat(self, other: "String") -> "String":
+        if self.length + other.length <= FLAT_CONCAT_LIMIT: return String(self.value + other.value)
+        return String(left=self, right=other)
+
+    def flatten(self):
+        parts, pending = [], [self]
+        while len(pending) > 0:
+            node = pending.pop()
+            if node.flat is not None: parts.append(node.flat)
+            else: pending.extend((node.right, node.left))
+        self.flat = ''.join(parts)
+        self.left = self.right = None
+
     def inspect(self): return self.value
     def type(self): return STRING_OBJ
-    def hashkey(self): return hash(('str', self.value))
+    def hashkey(self): return self.value
 
+# arrays are views (start, end) into a backing list that is only ever appended to, so rest and push never copy.
+# push appends in place when the array ends where the backing list ends, otherwise it copies its own elements first.
+# arrays of integers keep the raw values in an int64 buffer and box them when they are read
 class Array(Object):
-    def __init__(self, elements: list[simple_ast.Expression]): self.elements = elements
+    # only a fresh list of elements is checked for the int64 form, views (rest, push) keep the backing they share as it is
+    def __init__(self, elements: list[Object], start: int = 0, end: int = None):
+        if end is None and type(elements) is list and all(type(element) is Integer and type(element.value) is int for element in elements):
+            try: elements = array('q', [element.value for element in elements])
+            except OverflowError: pass
+        self.backing = elements
+        self.start = start
+        self.end = len(elements) if end is None else end
+
+    @property
+    def elements(self) -> list[Object]:
+        if type(self.backing) is array: return [new_integer(value) for value in self.backing[self.start:self.end]]
+        if self.start == 0 and self.end == len(self.backing): return self.backing
+        return self.backing[self.start:self.end]
+
+    def length(self) -> int: return self.end - self.start
+
+    def get(self, index: int) -> Object:
+        if type(self.backing) is array: return new_integer(self.backing[self.start + index])
+        return self.backing[self.start + index]
+
+    def rest(self) -> "Array": return Array(self.backing, self.start + 1, self.end)
+
+    def push(self, element: Object) -> "Array":
+        if self.end != len(self.backing): return Array(self.elements + [element])
+        if type(self.backing) is array:
+            if type(element) is not Integer or type(element.value) is not int or not INT64_MIN <= element.value <= INT64_MAX: return Array(self.elements + [element])
+            self.backing.append(element.value)
+        else: self.backing.append(element)
+        # another thread pushed onto the same array between the check and our append, the slot after end is theirs
+        if len(self.backing) != self.end + 1: return Array(self.elements + [element])
+        return Array(self.backing, self.start, self.end + 1)
+
     def inspect(self): return f'[{', '.join(element.inspect() for element in self.elements)}]'
     def type(self): return ARRAY_OBJ
 
-class HashPair():
-    def __init__(self, key: Object, value: Object):
-        self.key = key
-        self.value = value
-    
+# entries are stored as hashkey() -> value, the python values themselves are the keys (str caches its own hash)
+# and the key object is rebuilt from them when needed
 class Hash():
-    def __init__(self): self.dict: dict[int, HashPair] = {}
+    def __init__(self): self.dict: dict[int | float | str | BooleanKey, Object] = {}
     def type(self): return HASH_OBJ
-    def inspect(self): return f'{{{', '.join(f'{hashpair.key.inspect()}: {hashpair.value.inspect()}' for _, hashpair in self.dict.items())}}}'
+    def set(self, key: "Hashable", value: Object): self.dict[key.hashkey()] = value
+    def get(self, key: "Hashable") -> Object: return self.dict.get(key.hashkey())
+    def inspect(self): return f'{{{', '.join(f'{hash_key_object(key).inspect()}: {value.inspect()}' for key, value in self.dict.items())}}}'
+
+def hash_key_object(key) -> Object:
+    if type(key) is BooleanKey: return Boolean(key.value)
+    if type(key) is str: return String(key)
+    return Integer(key)
+
+Hashable = Integer | Boolean | String
+
+# engine specific form of a function body, apply_function hands calls of compiled functions back to their engine
+class Compiled():
+    def call(self, function: Function, args: list[Object]) -> Object: raise NotImplementedError('Subclass should implement call() function')
+
+class CompiledFunction(Compiled):
+    def __init__(self, instructions: list[int], constants: list, num_slots: int, parameters: list[simple_ast.Identifier], body: simple_ast.BlockStatement):
+        self.instructions = instructions
+        self.constants = constants
+        self.num_slots = num_slots
+        self.num_parameters = len(parameters)
+        self.padding = [None] * (num_slots - len(parameters))
+        self.parameters = parameters
+        self.body = body
 
-Hashable = Integer | Boolean | String
\ No newline at end of file
+    def call(self, function: Function, args: list[Object]) -> Object:
+        import simple_vm
+        return simple_vm.VM().call_function(function, args)
@@ -1,14 +1,21 @@
+import sys
 from simple_token import Lexer
 from simple_parser import Parser
-from simple_eval import Evaluator
+from simple_engine import new_engine
+from simple_optimizer import Optimizer
 from object import Environment
 
 
 PROMPT = ">> "
 
 class Repl():
+    def __init__(self, engine: str = "eval", optimize: bool = False):
+        self.engine = engine
+        self.optimize = optimize
+
     def scan(self):
         environment = Environment()
+        evaluator = new_engine(self.engine)
         while True:
             repl_input = input(PROMPT)
             if repl_input == "quit" or repl_input == "q":
@@ -17,7 +24,7 @@ class Repl():
             parser = Parser(lexer)
             program = parser.parse_program()
             if not self.check_for_errors(parser.errors): continue
-            evaluator = Evaluator()
+            if self.optimize: program = Optimizer().optimize(program)
             evaluated = evaluator.eval(program, environment)
             if evaluated is not None: print(f'{evaluated.inspect()}')
 
@@ -29,5 +36,7 @@ class Repl():
         for error in errors:
             print(f'parser error: {error}')
 
-repl = Repl()
-repl.scan()
\ No newline at end of file
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if argument != "-O"]
+    repl = Repl(arguments[0] if len(arguments) > 0 else "eval", "-O" in sys.argv)
+    repl.scan()
@@ -0,0 +1,317 @@
+from array import array
+import simple_ast, object as obj
+import simple_eval
+import simple_builtins
+import simple_resolver
+import simple_parser
+
+# node kinds, calls in tail position get their own kind instead of a flag
+LET, RETURN, EXPRESSION, BLOCK, IDENTIFIER, INTEGER, STRING, BOOLEAN, PREFIX, INFIX, IF, FUNCTION, CALL, TAIL_CALL, ARRAY, INDEX, HASH = range(17)
+KIND_NAMES = ["LET", "RETURN", "EXPRESSION", "BLOCK", "IDENTIFIER", "INTEGER", "STRING", "BOOLEAN", "PREFIX", "INFIX", "IF", "FUNCTION", "CALL", "TAIL_CALL", "ARRAY", "INDEX", "HASH"]
+NONE = -1
+# what an operand holds: a node index, the start of a list in children, an index into literals, a 0/1 value, or a list of key, value, key, value..
+NODE, LIST, LITERAL, FLAG, PAIRS = range(5)
+# attribute name of the matching simple_ast field -> (operand, what it holds)
+FIELDS = {LET: {"name": (0, NODE), "value": (1, NODE)}, RETURN: {"value": (0, NODE)}, EXPRESSION: {"expression": (0, NODE)}, BLOCK: {"statements": (0, LIST)},
+        IDENTIFIER: {"value": (0, LITERAL)}, INTEGER: {"value": (0, LITERAL)}, STRING: {"value": (0, LITERAL)}, BOOLEAN: {"value": (0, FLAG)},
+        PREFIX: {"operator": (0, LITERAL), "right": (1, NODE)}, INFIX: {"operator": (0, LITERAL), "left": (1, NODE), "right": (2, NODE)},
+        IF: {"condition": (0, NODE), "consequence": (1, NODE), "alternative": (2, NODE)}, FUNCTION: {"parameters": (0, LIST), "body": (1, NODE)},
+        CALL: {"function": (0, NODE), "arguments": (1, LIST)}, TAIL_CALL: {"function": (0, NODE), "arguments": (1, LIST)}, ARRAY: {"elements": (0, LIST)},
+        INDEX: {"left": (0, NODE), "index": (1, NODE)}, HASH: {"dict": (0, PAIRS)}}
+
+# a whole program in a handful of typed arrays: node i is kinds[i], offsets[i] and three operands, lists are a count followed by
+# the node indices in children. names, numbers, strings and operators are stored once in literals. children always come before
+# their parent, so a tree of any size is a few objects for the garbage collector instead of one per node
+class Arena():
+    def __init__(self):
+        self.kinds = array("B")
+        self.offsets = array("q")
+        self.operands = (array("i"), array("i"), array("i"))
+        self.children = array("i")
+        self.literals = []
+        self.literal_indices: dict = {}
+        self.statements = array("i") # the top level statements of the program
+
+    def __len__(self): return len(self.kinds)
+
+    def add(self, kind: int, offset: int, first: int = NONE, second: int = NONE, third: int = NONE) -> int:
+        self.kinds.append(kind)
+        self.offsets.append(NONE if offset is None else offset)
+        self.operands[0].append(first)
+        self.operands[1].append(second)
+        self.operands[2].append(third)
+        return len(self.kinds) - 1
+
+    def add_list(self, indices: list[int]) -> int:
+        if indices is None: return NONE
+        start = len(self.children)
+        self.children.append(len(indices))
+        self.children.extend(indices)
+        return start
+
+    def items(self, start: int) -> array:
+        if start == NONE: return None
+        return self.children[start + 1:start + 1 + self.children[start]]
+
+    def literal(self, value) -> int:
+        index = self.literal_indices.get(value)
+        if index is None:
+            index = self.literal_indices[value] = len(self.literals)
+            self.literals.append(value)
+        return index
+
+    def cursor(self, index: int) -> "Cursor": return Cursor(self, index) if index != NONE else None
+
+    def stats(self) -> dict[str, int]:
+        size = sum(len(values) * values.itemsize for values in (self.kinds, self.offsets, *self.operands, self.children, self.statements))
+        return {"nodes": len(self.kinds), "children": len(self.children), "literals": len(self.literals), "bytes": size}
+
+    # converting from simple_ast, lists are appended before the node that holds them
+    def append(self, node: simple_ast.Node) -> int:
+        if node is None: return NONE
+        kind = type(node)
+        if kind == simple_ast.LetStatement: return self.add(LET, node.offset, self.append(node.name), self.append(node.value))
+        if kind == simple_ast.ReturnStatement: return self.add(RETURN, node.offset, self.append(node.value))
+        if kind == simple_ast.ExpressionStatement: return self.add(EXPRESSION, node.offset, self.append(node.expression))
+        if kind == simple_ast.BlockStatement: return self.add(BLOCK, node.offset, self.append_all(node.statements))
+        if kind == simple_ast.Identifier: return self.add(IDENTIFIER, node.offset, self.literal(node.value))
+        if kind == simple_ast.IntegerLiteral: return self.add(INTEGER, node.offset, self.literal(node.value))
+        if kind == simple_ast.StringLiteral: return self.add(STRING, node.offset, self.literal(node.value))
+        if kind == simple_ast.Boolean: return self.add(BOOLEAN, node.offset, int(node.value))
+        if kind == simple_ast.PrefixExpression: return self.add(PREFIX, node.offset, self.literal(node.operator), self.append(node.right))
+        if kind == simple_ast.InfixExpression: return self.add(INFIX, node.offset, self.literal(node.operator), self.append(node.left), self.append(node.right))
+        if kind == simple_ast.IfExpression: return self.add(IF, node.offset, self.append(node.condition), self.append(node.consequence), self.append(node.alternative))
+        if kind == simple_ast.FunctionLiteral: return self.add(FUNCTION, node.offset, self.append_all(node.parameters), self.append(node.body))
+        if kind == simple_ast.CallExpression: return self.add(TAIL_CALL if node.tail else CALL, node.offset, self.append(node.function), self.append_all(node.arguments))
+        if kind == simple_ast.ArrayLiteral: return self.add(ARRAY, node.offset, self.append_all(node.elements))
+        if kind == simple_ast.IndexExpression: return self.add(INDEX, node.offset, self.append(node.left), self.append(node.index))
+        if kind == simple_ast.HashLiteral: return self.add(HASH, node.offset, self.append_all([element for pair in node.dict.items() for element in pair]))
+        raise ValueError(f'cannot store {kind.__name__} in an arena')
+
+    def append_all(self, nodes: list[simple_ast.Node]) -> int:
+        if nodes is None: return NONE
+        return self.add_list([self.append(node) for node in nodes])
+
+    def append_statement(self, statement: simple_ast.Statement): self.statements.append(self.append(statement))
+
+    # converting back to simple_ast
+    def node(self, index: int) -> simple_ast.Node:
+        if index == NONE: return None
+        kind, offset = self.kinds[index], self.offsets[index]
+        first, second, third = self.operands[0][index], self.operands[1][index], self.operands[2][index]
+        if offset == NONE: offset = None
+        if kind == LET: return simple_ast.LetStatement(offset, self.node(first), self.node(second))
+        if kind == RETURN: return simple_ast.ReturnStatement(offset, self.node(first))
+        if kind == EXPRESSION: return simple_ast.ExpressionStatement(offset, self.node(first))
+        if kind == IDENTIFIER: return simple_ast.Identifier(offset, self.literals[first])
+        if kind == INTEGER: return simple_ast.IntegerLiteral(offset, self.literals[first])
+        if kind == STRING: return simple_ast.StringLiteral(offset, self.literals[first])
+        if kind == BOOLEAN: return simple_ast.Boolean(offset, first == 1)
+        if kind == PREFIX: return simple_ast.PrefixExpression(offset, self.literals[first], self.node(second))
+        if kind == INFIX: return simple_ast.InfixExpression(offset, self.node(second), self.literals[first], self.node(third))
+        if kind == BLOCK:
+            node = simple_ast.BlockStatement(offset)
+            node.statements = self.nodes(first)
+        elif kind == IF:
+            node = simple_ast.IfExpression(offset)
+            node.condition, node.consequence, node.alternative = self.node(first), self.node(second), self.node(third)
+        elif kind == FUNCTION:
+            node = simple_ast.FunctionLiteral(offset)
+            node.parameters, node.body = self.nodes(first), self.node(second)
+        elif kind == CALL or kind == TAIL_CALL:
+            node = simple_ast.CallExpression(offset, self.node(first))
+            node.arguments, node.tail = self.nodes(second), kind == TAIL_CALL
+        elif kind == ARRAY:
+            node = simple_ast.ArrayLiteral(offset)
+            node.elements = self.nodes(first)
+        elif kind == INDEX:
+            node = simple_ast.IndexExpression(offset, self.node(first))
+            node.index = self.node(second)
+        elif kind == HASH:
+            node = simple_ast.HashLiteral(offset)
+            elements = self.nodes(first)
+            node.dict = dict(zip(elements[::2], elements[1::2]))
+        else: raise ValueError(f'unknown node kind {kind} at {index}')
+        return node
+
+    def nodes(self, start: int) -> list[simple_ast.Node]:
+        if start == NONE: return None
+        return [self.node(index) for index in self.items(start)]
+
+# a view of one node, fields are read from the arena when asked for under the same names simple_ast uses.
+# simple_kernels caches compiled function bodies weakly, and bodies of arena functions are cursors
+class Cursor():
+    __slots__ = ("arena", "index", "__weakref__")
+
+    def __init__(self, arena: Arena, index: int):
+        self.arena = arena
+        self.index = index
+
+    @property
+    def kind(self) -> int: return self.arena.kinds[self.index]
+
+    @property
+    def offset(self) -> int:
+        offset = self.arena.offsets[self.index]
+        return None if offset == NONE else offset
+
+    @property
+    def tail(self) -> bool: return self.kind == TAIL_CALL
+
+    def __getattr__(self, name: str):
+        if name.startswith("__"): raise AttributeError(name) # pickle and copy probe for hooks before the slots are set
+        field = FIELDS[self.arena.kinds[self.index]].get(name)
+        if field is None: raise AttributeError(f'{KIND_NAMES[self.kind]} node has no field {name}')
+        arena, (operand, holds) = self.arena, field
+        value = arena.operands[operand][self.index]
+        if holds == NODE: return arena.cursor(value)
+        if holds == LITERAL: return arena.literals[value]
+        if holds == FLAG: return value == 1
+        elements = [Cursor(arena, index) for index in arena.items(value)] if value != NONE else None
+        if holds == PAIRS: return dict(zip(elements[::2], elements[1::2]))
+        return elements
+
+    def __eq__(self, other) -> bool: return type(other) is Cursor and other.arena is self.arena and other.index == self.index
+    def __hash__(self) -> int: return hash((id(self.arena), self.index))
+    def __repr__(self) -> str: return f'Cursor({KIND_NAMES[self.kind]} {self.index})'
+
+    def node(self) -> simple_ast.Node: return self.arena.node(self.index)
+    def string(self) -> str: return self.node().string()
+
+def from_ast(program: simple_ast.Program) -> Arena:
+    if not program.resolved: simple_resolver.Resolver().resolve(program)
+    arena = Arena()
+    for statement in program.statements: arena.append_statement(statement)
+    return arena
+
+def to_ast(arena: Arena) -> simple_ast.Program:
+    program = simple_ast.Program()
+    program.statements = [arena.node(index) for index in arena.statements]
+    return program
+
+# parses one top level statement at a time into the arena, only that statement ever exists as simple_ast nodes
+def parse(parser: simple_parser.Parser) -> Arena:
+    arena = Arena()
+    while parser.current_token.type != "EOF":
+        statement = parser.parse_statement()
+        if statement is not None:
+            simple_resolver.Resolver().resolve(statement)
+            arena.append_statement(statement)
+        parser.next_token()
+    return arena
+
+# marks functions made by ArenaEvaluator, other engines hand calls of them back through Evaluator.apply_function
+class ArenaFunction(obj.Compiled):
+    def call(self, function: obj.Function, args: list[obj.Object]) -> obj.Object: return ArenaEvaluator().apply_function(function, args)
+
+ARENA_FUNCTION = ArenaFunction()
+
+# walks the arena by index, with the Evaluator's operators and error messages. functions keep a cursor on their body, names are
+# looked up through plain Environments the way an unresolved program runs
+class ArenaEvaluator(simple_eval.Evaluator):
+    def eval(self, program, environment: obj.Environment):
+        arena = program if type(program) is Arena else from_ast(program)
+        token = simple_builtins.caller.set(self)
+        try:
+            result = None
+            for statement in arena.statements:
+                result = self.eval_node(arena, statement, environment)
+                if type(result) == obj.Return: return result.value
+                if type(result) == obj.Error: return result
+            return result
+        finally: simple_builtins.caller.reset(token)
+
+    # missing nodes of programs with parser errors evaluate to None, as they do in the Evaluator
+    def eval_node(self, arena: Arena, index: int, environment: obj.Environment):
+        if index == NONE: return None
+        kind = arena.kinds[index]
+        first = arena.operands[0][index]
+        if kind == INTEGER: return obj.new_integer(arena.literals[first])
+        if kind == IDENTIFIER: return self.eval_name(arena.literals[first], environment)
+        if kind == INFIX:
+            left = self.eval_node(arena, arena.operands[1][index], environment)
+            right = self.eval_node(arena, arena.operands[2][index], environment)
+            return self.eval_infix_expression(arena.literals[first], left, right)
+        if kind == CALL or kind == TAIL_CALL:
+            function = self.eval_node(arena, first, environment)
+            if self.is_error(function): return function
+            args = self.eval_nodes(arena, arena.operands[1][index], environment)
+            if len(args) == 1 and self.is_error(args[0]): return args[0]
+            if kind == TAIL_CALL: return simple_eval.TailCall(function, args)
+            return self.apply_function(function, args)
+        if kind == EXPRESSION: return self.eval_node(arena, first, environment)
+        if kind == IF:
+            condition = self.eval_node(arena, first, environment)
+            if self.is_error(condition): return condition
+            if self.is_truthy(condition): return self.eval_node(arena, arena.operands[1][index], environment)
+            alternative = arena.operands[2][index]
+            if alternative != NONE: return self.eval_node(arena, alternative, environment)
+            return simple_eval.NULL
+        if kind == BLOCK:
+            result = None
+            for statement in arena.items(first):
+                result = self.eval_node(arena, statement, environment)
+                if type(result) == obj.Return or type(result) == obj.Error: return result
+            return result
+        if kind == BOOLEAN: return simple_eval.TRUE if first == 1 else simple_eval.FALSE
+        if kind == PREFIX: return self.eval_prefix_expression(arena.literals[first], self.eval_node(arena, arena.operands[1][index], environment))
+        if kind == RETURN: return self.eval_return_statement(self.eval_node(arena, first, environment))
+        if kind == LET:
+            value = self.eval_node(arena, arena.operands[1][index], environment)
+            if self.is_error(value): return value
+            environment.set(arena.literals[arena.operands[0][first]], value)
+            return None
+        if kind == FUNCTION:
+            parameters = [Cursor(arena, parameter) for parameter in arena.items(first)]
+            return obj.Function(parameters, Cursor(arena, arena.operands[1][index]), environment, ARENA_FUNCTION)
+        if kind == STRING: return obj.String(arena.literals[first])
+        if kind == ARRAY:
+            elements = self.eval_nodes(arena, first, environment)
+            if len(elements) == 1 and self.is_error(elements[0]): return elements[0]
+            return obj.Array(elements)
+        if kind == INDEX:
+            left = self.eval_node(arena, first, environment)
+            if self.is_error(left): return left
+            value = self.eval_node(arena, arena.operands[1][index], environment)
+            if self.is_error(value): return value
+            return self.eval_index(left, value)
+        if kind == HASH: return self.eval_hash_pairs(arena, arena.items(first), environment)
+        return None
+
+    def eval_nodes(self, arena: Arena, start: int, environment: obj.Environment) -> list[obj.Object]:
+        result = []
+        for index in arena.items(start):
+            evaluated = self.eval_node(arena, index, environment)
+            if self.is_error(evaluated): return [evaluated]
+            result.append(evaluated)
+        return result
+
+    def eval_hash_pairs(self, arena: Arena, elements: array, environment: obj.Environment):
+        hash_dict = obj.Hash()
+        for i in range(0, len(elements), 2):
+            key = self.eval_node(arena, elements[i], environment)
+            if self.is_error(key): return key
+            if not isinstance(key, obj.Hashable): return self.new_error(f'object type not supported for key, got={key.type()}')
+            value = self.eval_node(arena, elements[i + 1], environment)
+            if self.is_error(value): return value
+            hash_dict.set(key, value)
+        return hash_dict
+
+    def eval_name(self, name: str, environment: obj.Environment):
+        value = environment.get(name)
+        if value is None: value = simple_builtins.functions.get(name)
+        if value is None: return self.new_error(f'identifier not found: {name}')
+        return value
+
+    # functions made by another engine (a prelude, an image) go to the Evaluator, which hands compiled ones to their own engine
+    def apply_function(self, function: obj.Object, args: list[obj.Object]):
+        while True:
+            if type(function) == obj.Function and type(function.compiled) is not ArenaFunction: return simple_eval.Evaluator().apply_function(function, args)
+            if type(function) == obj.Function:
+                arena, environment = function.body.arena, obj.Environment(function.environment)
+                for i, parameter in enumerate(function.parameters): environment.set(arena.literals[arena.operands[0][parameter.index]], args[i])
+                evaluated = self.unwrapped_return_value(self.eval_node(arena, function.body.index, environment))
+                if type(evaluated) != simple_eval.TailCall: return evaluated
+                function, args = evaluated.function, evaluated.args
+            elif type(function) == obj.Builtin: return self.apply_builtin(function, args)
+            else: return self.new_error(f'not a function: {function.type()}')
@@ -1,18 +1,25 @@
-from simple_token import Token
-
+# nodes keep the source offset of the token they were parsed from instead of the token itself, token_literal() is rebuilt
+# from what the node holds. every class lists its attributes in __slots__, trees are the bulk of a parsed program
 class Node():
+    __slots__ = ()
     def token_literal(): raise NotImplementedError("Subclasses should implement the token_literal method")
     def string(): raise NotImplementedError("Subclasses should implement the string method")
 
 class Statement(Node):
+    __slots__ = ()
     def statemenetNode(): raise NotImplementedError("Subclasses should implement the statementNode method")
 
-class Expression(Node): 
+class Expression(Node):
+    __slots__ = ()
     def expressionNode(): raise NotImplementedError("Subclasses should implement the expressionNode method")
 
 class Program():
+    __slots__ = ("statements", "transpiled", "resolved")
+
     def __init__(self):
         self.statements = []
+        self.transpiled = None # python code object built by simple_transpiler
+        self.resolved = False
 
     def token_literal(self):
         if len(self.statemens > 0):
@@ -28,22 +35,31 @@ class Program():
 
 
 class Identifier(Expression):
-    def __init__(self, token: Token, value: str):
-        self.token = token
+    __slots__ = ("offset", "value", "depth", "slot", "builtin")
+
+    def __init__(self, offset: int, value: str):
+        self.offset = offset
         self.value = value
+        # filled in by simple_resolver: functions between here and the binding, its slot (None for globals) and the builtin it may refer to
+        self.depth: int = None
+        self.slot: int = None
+        self.builtin = None
 
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return self.value
     def string(self): return self.value
 
 class LetStatement(Statement):
-    def __init__(self, token: Token, identifier: Identifier, expression: Expression):
-        self.token = token
+    __slots__ = ("offset", "name", "value", "slot")
+
+    def __init__(self, offset: int, identifier: Identifier, expression: Expression):
+        self.offset = offset
         self.name = identifier
         self.value = expression
+        self.slot: int = None
 
     def statementNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return "let"
     
     def string(self):
         out = f'{self.token_literal()}: {self.name.string()} = '
@@ -53,12 +69,14 @@ class LetStatement(Statement):
         return out
 
 class ReturnStatement(Statement):
-    def __init__(self, token: Token, return_value: Expression = None):
-        self.token = token
+    __slots__ = ("offset", "value")
+
+    def __init__(self, offset: int, return_value: Expression = None):
+        self.offset = offset
         self.value = return_value
     
     def statementNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return "return"
 
     def string(self):
         out = f'{self.token_literal()} '
@@ -68,12 +86,14 @@ class ReturnStatement(Statement):
         return out
     
 class ExpressionStatement(Statement):
-    def __init__(self, token: Token, expression: Expression = None):
-        self.token = token
+    __slots__ = ("offset", "expression")
+
+    def __init__(self, offset: int, expression: Expression = None):
+        self.offset = offset
         self.expression = expression
 
     def statemenetNode(): pass        
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return self.expression.token_literal() if self.expression is not None else ""
     
     def string(self):
         if self.expression is not None:
@@ -81,71 +101,87 @@ class ExpressionStatement(Statement):
         return ""
 
 class IntegerLiteral(Expression):
-    def __init__(self, token: Token, value: int = None):
-        self.token = token
+    __slots__ = ("offset", "value", "constant")
+
+    def __init__(self, offset: int, value: int = None):
+        self.offset = offset
         self.value = value
+        self.constant = None # boxed value shared by every evaluation of the literal
 
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
-    def string(self): return self.token.literal
+    def token_literal(self): return str(self.value)
+    def string(self): return self.token_literal()
 
 class StringLiteral(Expression):
-    def __init__(self, token: Token, value: int = None):
-        self.token = token
+    __slots__ = ("offset", "value")
+
+    def __init__(self, offset: int, value: int = None):
+        self.offset = offset
         self.value = value
 
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
-    def string(self): return self.token.literal
+    def token_literal(self): return self.value
+    def string(self): return self.token_literal()
 
 class PrefixExpression(Expression):
-    def __init__(self, token: Token, operator: str = None, right: Expression = None):
-        self.token = token
+    __slots__ = ("offset", "operator", "right")
+
+    def __init__(self, offset: int, operator: str = None, right: Expression = None):
+        self.offset = offset
         self.operator = operator
         self.right = right
     
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return self.operator
     def string(self): return f'({self.operator}{self.right.string()})'
 
 class InfixExpression(Expression):
-    def __init__(self, token: Token, left: Expression = None, operator: str = None, right: Expression = None):
-        self.token = token
+    __slots__ = ("offset", "left", "operator", "right")
+
+    def __init__(self, offset: int, left: Expression = None, operator: str = None, right: Expression = None):
+        self.offset = offset
         self.left = left
         self.operator = operator
         self.right = right
     
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return self.operator
     def string(self): return f'({self.left.string()} {self.operator} {self.right.string()})'
 
 class Boolean(Expression):
-    def __init__(self, token: Token, value: bool):
-        self.token = token
+    __slots__ = ("offset", "value")
+
+    def __init__(self, offset: int, value: bool):
+        self.offset = offset
         self.value = value
     
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
-    def string(self): return self.token.literal
+    def token_literal(self): return "true" if self.value else "false"
+    def string(self): return self.token_literal()
 
 class BlockStatement(Statement):
-    def __init__(self, token: Token):
-        self.token = token #{ token
+    # simple_kernels keys compiled kernels weakly by function bodies
+    __slots__ = ("offset", "statements", "__weakref__")
+
+    def __init__(self, offset: int):
+        self.offset = offset
         self.statements = []
     
     def statemenetNode(): pass
-    def token_literal(self): self.token.literal
+    def token_literal(self): return "{"
     def string(self): return ''.join(statement.string() for statement in self.statements)
 
 class IfExpression(Expression):
-    def __init__(self, token: Token):
-        self.token = token
+    __slots__ = ("offset", "condition", "consequence", "alternative")
+
+    def __init__(self, offset: int):
+        self.offset = offset
         self.condition: Expression = None
         self.consequence: BlockStatement = None
         self.alternative: BlockStatement = None
 
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return "if"
     def string(self):
         string = f'if {self.condition.string()} {self.consequence.string()}'
         if self.alternative is not None:
@@ -153,49 +189,64 @@ class IfExpression(Expression):
         return string
 
 class FunctionLiteral(Expression):
-    def __init__(self, token: Token):
-        self.token = token
+    __slots__ = ("offset", "parameters", "body", "closure", "names", "pure", "captured")
+
+    def __init__(self, offset: int):
+        self.offset = offset
         self.parameters = []
         self.body: BlockStatement = None
+        self.closure = None # body pre-translated by simple_closure
+        self.names: dict[str, int] = None # slots of parameters and lets, filled in by simple_resolver
+        self.pure: bool = None # filled in by simple_purity
+        self.captured: list[str] = None # names read from enclosing environments, filled in by simple_purity
 
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
-    def string(self): return f'fn ({"".join(parameter.string() for parameter in self.parameters)}) {{ {self.consequence.string()} }}'
+    def token_literal(self): return "fn"
+    def string(self): return f'fn ({"".join(parameter.string() for parameter in self.parameters)}) {{ {self.body.string()} }}'
 
 class CallExpression(Expression):
-    def __init__(self, token: Token, function: Expression):
-        self.token = token #the '(' token
+    __slots__ = ("offset", "function", "arguments", "tail")
+
+    def __init__(self, offset: int, function: Expression):
+        self.offset = offset
         self.function = function
         self.arguments = list[Expression]
+        self.tail = False # set by simple_resolver for calls in tail position
     
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return "("
     def string(self): return f'{self.function.string()}({", ".join(argument.string() for argument in self.arguments)})'
 
 class ArrayLiteral(Expression):
-    def __init__(self, token: Token):
-        self.token = token
+    __slots__ = ("offset", "elements")
+
+    def __init__(self, offset: int):
+        self.offset = offset
         self.elements = list[Expression]
     
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return "["
     def string(self): return f'[{", ".join(element.string() for element in self.elements)}]'
 
 class IndexExpression(Expression):
-    def __init__(self, token: Token, left: Expression):
-        self.token = token
+    __slots__ = ("offset", "left", "index")
+
+    def __init__(self, offset: int, left: Expression):
+        self.offset = offset
         self.left = left
         self.index: Expression
     
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return "["
     def string(self): return f'({self.left.string()}[{self.index.string()}])'
 
 class HashLiteral(Expression):
-    def __init__(self, token: Token): 
-        self.token = token
+    __slots__ = ("offset", "dict")
+
+    def __init__(self, offset: int): 
+        self.offset = offset
         self.dict = dict[Expression,Expression]
     def expressionNode(): pass
-    def token_literal(self): return self.token.literal
+    def token_literal(self): return "{"
     def string(self): return f'{{{', '.join(f'{key.string()}: {value.string()}' for (key, value) in self.dict.items())}}}'
         
\ No newline at end of file
@@ -0,0 +1,70 @@
+import os, io, gc, pickle, hashlib, tempfile
+import simple_ast
+import simple_parser
+import simple_image
+
+SUFFIX = ".mast"
+
+# parsed programs stored one file per source under a directory shared by any number of processes. files are written under a
+# temporary name and renamed into place, a reader sees either nothing or a whole tree. hits touch the file so eviction drops
+# the least recently used ones once the directory grows past max_bytes
+class AstCache():
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, source: str) -> str:
+        key = hashlib.sha256(simple_parser.PARSER_VERSION.to_bytes(4, "little") + source.encode()).hexdigest()
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def get(self, source: str) -> simple_ast.Program:
+        path = self.path(source)
+        # a tree is thousands of small objects, collections triggered while they are created would only walk them for nothing
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            with open(path, "rb") as file: program = simple_image.ImageUnpickler(file).load()
+            os.utime(path)
+        except (OSError, EOFError, pickle.UnpicklingError, simple_image.ImageError):
+            self.misses += 1
+            return None
+        finally:
+            if enabled: gc.enable()
+        self.hits += 1
+        return program
+
+    def put(self, source: str, program: simple_ast.Program):
+        buffer = io.BytesIO()
+        simple_image.ImagePickler(buffer).dump(program)
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, prefix=".ast-")
+        try:
+            with os.fdopen(descriptor, "wb") as file: file.write(buffer.getvalue())
+            os.replace(temporary, self.path(source))
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self.writes += 1
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.name.endswith(SUFFIX): continue
+            try: status = entry.stat()
+            except FileNotFoundError: continue
+            entries.append((status.st_mtime, status.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes: break
+            try: os.unlink(path)
+            except FileNotFoundError: pass
+            total -= size
+            self.evictions += 1
+
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "writes": self.writes, "evictions": self.evictions}
@@ -0,0 +1,117 @@
+import os, hashlib, threading, pickle
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import object as obj
+import simple_token
+import simple_parser
+import simple_resolver
+import simple_engine
+import simple_ast_cache
+
+MODES = ("process", "thread")
+# programs are sent to process workers in runs of this many per worker, so small scripts don't pay one round trip each
+CHUNKS_PER_WORKER = 4
+
+# parsed and resolved programs by source hash. evaluation only fills in caches on the tree (the boxed constant of an
+# IntegerLiteral), the same value from every evaluator, so one tree can be run by any number of evaluators at once.
+# misses try the on-disk cache, when there is one, before parsing
+class ParseCache():
+    def __init__(self, size: int = 1024, disk: simple_ast_cache.AstCache = None):
+        self.size = size
+        self.disk = disk
+        self.entries: OrderedDict = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def parse(self, source: str):
+        key = hashlib.sha256(source.encode()).digest()
+        with self.lock:
+            found = self.entries.get(key)
+            if found is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+                return found
+            self.misses += 1
+        found = self.disk.get(source) if self.disk is not None else None
+        if found is None: found = self.parse_source(source)
+        with self.lock:
+            self.entries[key] = found
+            if len(self.entries) > self.size: self.entries.popitem(last=False)
+        return found
+
+    def parse_source(self, source: str):
+        parser = simple_parser.Parser(simple_token.RegexLexer(source))
+        program = parser.parse_program()
+        if len(parser.errors) > 0: return obj.Error(f'parser has {len(parser.errors)} error(s): {"; ".join(parser.errors)}')
+        simple_resolver.Resolver().resolve(program)
+        if self.disk is not None: self.disk.put(source, program)
+        return program
+
+    def stats(self) -> dict[str, int]:
+        stats = {"hits": self.hits, "misses": self.misses, "entries": len(self.entries)}
+        if self.disk is not None: stats.update((f'disk_{name}', value) for name, value in self.disk.stats().items())
+        return stats
+
+# one per process, workers of a process pool each fill their own
+CACHE = ParseCache()
+# set in process pool workers when they start, thread pools pass their prelude along with each source
+PRELUDE: simple_engine.Prelude = None
+
+def start_worker(engine: str, prelude: str, cache_directory: str):
+    global PRELUDE, CACHE
+    if prelude is not None: PRELUDE = simple_engine.Prelude(prelude, engine)
+    if cache_directory is not None: CACHE = ParseCache(disk=simple_ast_cache.AstCache(cache_directory))
+
+def evaluate(engine: str, source: str, prelude: simple_engine.Prelude = None, cache: ParseCache = None) -> obj.Object:
+    program = (cache or CACHE).parse(source)
+    if type(program) is obj.Error: return program
+    # a program that crashes the engine (5 / 0, a recursion too deep for python) only fails its own slot of the batch
+    try: return simple_engine.new_engine(engine).eval(program, prelude.fork() if prelude is not None else obj.Environment())
+    except Exception as exception: return obj.Error(f'{type(exception).__name__}: {exception}')
+
+def evaluate_all(engine: str, sources: list[str]) -> list[obj.Object]:
+    return [portable(evaluate(engine, source, PRELUDE)) for source in sources]
+
+# results of process workers travel back pickled, functions of the closure and python engines hold python closures that can't.
+# strings are sent flat, pickling a deep rope recurses once per node
+def portable(result: obj.Object) -> obj.Object:
+    if type(result) is obj.String: return obj.String(result.value)
+    if type(result) in (obj.Integer, obj.Boolean, obj.Null, obj.Error): return result
+    try: pickle.dumps(result)
+    except (pickle.PicklingError, AttributeError, TypeError, RecursionError): return obj.Error(f'{result.type()} result can not be sent back from a worker process')
+    return result
+
+# threads share the interpreter lock, only mode="process" scales with cores
+class BatchRunner():
+    def __init__(self, workers: int = None, mode: str = "process", engine: str = "eval", prelude: str = None, cache_directory: str = None):
+        if mode not in MODES: raise ValueError(f'unknown mode: {mode}, expected one of {", ".join(MODES)}')
+        if engine not in simple_engine.ENGINES: raise ValueError(f'unknown engine: {engine}, expected one of {", ".join(simple_engine.ENGINES)}')
+        self.workers = workers or os.cpu_count() or 1
+        self.mode = mode
+        self.engine = engine
+        self.prelude, self.cache = None, None
+        if mode == "thread":
+            if prelude is not None: self.prelude = simple_engine.Prelude(prelude, engine)
+            if cache_directory is not None: self.cache = ParseCache(disk=simple_ast_cache.AstCache(cache_directory))
+            self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        elif prelude is not None or cache_directory is not None: self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=start_worker, initargs=(engine, prelude, cache_directory))
+        else: self.executor = ProcessPoolExecutor(max_workers=self.workers)
+
+    def run(self, sources: list[str]) -> list[obj.Object]:
+        if self.mode == "thread": return list(self.executor.map(evaluate, [self.engine] * len(sources), sources, [self.prelude] * len(sources), [self.cache] * len(sources)))
+        size = max(1, -(-len(sources) // (self.workers * CHUNKS_PER_WORKER)))
+        chunks = [sources[start:start + size] for start in range(0, len(sources), size)]
+        results = []
+        for chunk in self.executor.map(evaluate_all, [self.engine] * len(chunks), chunks): results.extend(chunk)
+        return results
+
+    def close(self):
+        self.executor.shutdown()
+
+    def __enter__(self): return self
+
+    def __exit__(self, *exception): self.close()
+
+def run_batch(sources: list[str], workers: int = None, mode: str = "process", engine: str = "eval", prelude: str = None, cache_directory: str = None) -> list[obj.Object]:
+    with BatchRunner(workers, mode, engine, prelude, cache_directory) as runner: return runner.run(sources)
@@ -0,0 +1,110 @@
+from array import array
+import simple_ast, object as obj
+import simple_eval
+import simple_builtins
+
+# rough bytes per allocation, close to what sys.getsizeof reports for the python objects behind them
+ARRAY_BYTES, ELEMENT_BYTES = 56, 8
+STRING_BYTES = 49
+HASH_BYTES, ENTRY_BYTES = 64, 40
+
+class BudgetExceeded(Exception):
+    def __init__(self, error: obj.Error):
+        super().__init__(error.message)
+        self.error = error
+
+# evaluation stops with an error once it has made max_calls calls, nested max_depth calls deep, or allocated about max_memory
+# bytes of arrays, strings and hashes. monkey has no loops, so counting calls (tail calls included) bounds the running time
+# without paying for a check on every node
+class BudgetedEvaluator(simple_eval.Evaluator):
+    def __init__(self, max_calls: int = None, max_depth: int = None, max_memory: int = None):
+        self.max_calls = max_calls
+        self.max_depth = max_depth
+        self.max_memory = max_memory
+        self.reset()
+
+    def reset(self):
+        self.calls = 0
+        self.depth = 0
+        self.memory = 0
+        self.exhausted_at: int = None # depth of the call that ran out of python stack, the depth itself is unwound by then
+
+    def usage(self) -> dict[str, int]:
+        return {"calls": self.calls, "memory": self.memory}
+
+    def eval_program(self, program: simple_ast.Program, environment: obj.Environment):
+        self.reset()
+        try: return super().eval_program(program, environment)
+        except BudgetExceeded as exceeded: return exceeded.error
+        except RecursionError: return self.new_error(f'call depth limit exceeded: python stack exhausted at depth {self.exhausted_at}')
+
+    def apply_function(self, function: obj.Object, args: list[obj.Object]):
+        if type(function) == obj.Builtin: return self.apply_builtin(function, args)
+        self.depth += 1
+        try:
+            if self.max_depth is not None and self.depth > self.max_depth: raise BudgetExceeded(self.new_error(f'call depth limit exceeded: {self.max_depth}'))
+            return super().apply_function(function, args)
+        except RecursionError:
+            if self.exhausted_at is None: self.exhausted_at = self.depth
+            raise
+        finally: self.depth -= 1
+
+    # builtins in tail position reach this from the trampoline as well. builtins whose result grows with their arguments
+    # are checked before they run, so range(10 ** 8) is refused rather than built and then charged
+    def apply_builtin(self, builtin: obj.Builtin, args: list[obj.Object]):
+        if self.max_memory is None: return builtin.builtin(args)
+        self.check_memory(self.estimated(builtin, args))
+        value = builtin.builtin(args)
+        self.allocated(value, args)
+        return value
+
+    # bytes the builtin is sure to allocate, never more than allocated() charges for its result
+    def estimated(self, builtin: obj.Builtin, args: list[obj.Object]) -> int:
+        if builtin is simple_builtins.functions["range"]:
+            if len(args) < 1 or len(args) > 3 or any(type(arg) is not obj.Integer or type(arg.value) is not int for arg in args): return 0
+            if len(args) == 3 and args[2].value == 0: return 0
+            return ARRAY_BYTES + ELEMENT_BYTES * len(range(*[arg.value for arg in args]))
+        if builtin is simple_builtins.functions["map"] or builtin is simple_builtins.functions["pmap"]:
+            if len(args) == 2 and type(args[1]) is obj.Array: return ARRAY_BYTES + ELEMENT_BYTES * args[1].length()
+        return 0
+
+    def extended_function_environment(self, function: obj.Function, args: list[obj.Object]):
+        self.calls += 1
+        if self.max_calls is not None and self.calls > self.max_calls: raise BudgetExceeded(self.new_error(f'call limit exceeded: {self.max_calls}'))
+        return super().extended_function_environment(function, args)
+
+    def eval_array_literals(self, node: simple_ast.ArrayLiteral, environment: obj.Environment):
+        value = super().eval_array_literals(node, environment)
+        if self.max_memory is not None: self.allocated(value, ())
+        return value
+
+    def eval_hash_literal(self, node: simple_ast.HashLiteral, environment: obj.Environment):
+        value = super().eval_hash_literal(node, environment)
+        if self.max_memory is not None: self.allocated(value, ())
+        return value
+
+    # a concatenation that builds a rope node only allocates the node, its halves are already charged
+    def eval_infix_string_expression(self, operator: str, left: obj.String, right: obj.String):
+        value = super().eval_infix_string_expression(operator, left, right)
+        if self.max_memory is None or type(value) is not obj.String: return value
+        if value.flat is None:
+            self.memory += STRING_BYTES
+            self.check_memory(0)
+        else: self.allocated(value, ())
+        return value
+
+    # arrays that share storage with an argument (rest, push onto the end) are only charged for the elements they add to it
+    def allocated(self, value: obj.Object, args):
+        kind = type(value)
+        if kind is obj.Array:
+            header, size = ARRAY_BYTES, value.length()
+            for arg in args:
+                if type(arg) is obj.Array and arg.backing is value.backing: header, size = 0, min(size, max(0, value.end - arg.end))
+            self.memory += header + size * (ELEMENT_BYTES if type(value.backing) is array else 2 * ELEMENT_BYTES)
+        elif kind is obj.String: self.memory += STRING_BYTES + value.length
+        elif kind is obj.Hash: self.memory += HASH_BYTES + ENTRY_BYTES * len(value.dict)
+        else: return
+        self.check_memory(0)
+
+    def check_memory(self, needed: int):
+        if self.memory + needed > self.max_memory: raise BudgetExceeded(self.new_error(f'memory limit exceeded: {self.max_memory} bytes'))
@@ -1,52 +1,155 @@
+import contextvars
+from array import array
 import simple_eval
+import simple_kernels
 import object as obj
 
+# builtins that call back into monkey use the evaluator running the program, set by each tree walking engine around a run so
+# its limits, caches and stack discipline apply to callbacks. functions of the vm, closure and python engines are compiled
+# and go back to their own engine from any Evaluator, those engines leave it unset
+caller: contextvars.ContextVar = contextvars.ContextVar("caller", default=None)
+
+def callback_evaluator() -> "simple_eval.Evaluator":
+    return caller.get() or simple_eval.Evaluator()
+
 def builtin_len(args: list[obj.Object]) -> obj.Object:
     if len(args) != 1: return obj.Error(f'wrong number of arguments. got={len(args)}, want=1')
-    if type(args[0]) is obj.String: return obj.Integer(len(args[0].value))
-    elif type(args[0]) is obj.Array: return obj.Integer(len(args[0].elements))
+    if type(args[0]) is obj.String: return obj.Integer(args[0].length)
+    elif type(args[0]) is obj.Array: return obj.Integer(args[0].length())
     return obj.Error(f'argument to \'len\' not supported, got {args[0].type()}')
 
 def builtin_first(args: list[obj.Object]) -> obj.Object:
     if len(args) != 1: return obj.Error(f'wrong number of arguments. got={len(args)}, want=1')
     if type(args[0]) is not obj.Array: return obj.Error(f'argument to \'first\' must be ARRAY, got {args[0].type()}')
-    elif len(args[0].elements) > 0: return args[0].elements[0]
+    elif args[0].length() > 0: return args[0].get(0)
     return simple_eval.NULL
 
 def builtin_last(args: list[obj.Object]) -> obj.Object:
     if len(args) != 1: return obj.Error(f'wrong number of arguments. got={len(args)}, want=1')
     if type(args[0]) is not obj.Array: return obj.Error(f'argument to \'last\' must be ARRAY, got {args[0].type()}')
-    elif len(args[0].elements) > 0: return args[0].elements[len(args[0].elements)-1]
+    elif args[0].length() > 0: return args[0].get(args[0].length() - 1)
     return simple_eval.NULL
 
 def builtin_rest(args: list[obj.Object]) -> obj.Object:
     if len(args) != 1: return obj.Error(f'wrong number of arguments. got={len(args)}, want=1')
     if type(args[0]) is not obj.Array: return obj.Error(f'argument to \'rest\' must be ARRAY, got {args[0].type()}')
-    elif len(args[0].elements) > 0: 
-        copy = []
-        for element in args[0].elements[1:]: copy.append(element)
-        return obj.Array(copy)
+    elif args[0].length() > 0: return args[0].rest()
     return simple_eval.NULL
 
 def builtin_push(args: list[obj.Object]) -> obj.Object:
     if len(args) != 2: return obj.Error(f'wrong number of arguments. got={len(args)}, want=2')
     if type(args[0]) is not obj.Array: return obj.Error(f'first argument to \'push\' must be ARRAY, got {args[0].type()}')
     if type(args[1]) is not obj.Integer: return obj.Error(f'second argument to \'push\' must be INTEGER, got {args[1].type()}')
-    elif len(args[0].elements) >= 0:
-        args[0].elements.append(args[1])
-        return args[0]
-    return simple_eval.NULL
+    return args[0].push(args[1])
 
 def builtin_puts(args: list[obj.Object]) -> obj.Object:
     for arg in args:
         print(arg.inspect())
     return simple_eval.NULL
 
+def check_function(name: str, function: obj.Object, arity: int) -> obj.Error:
+    if type(function) not in (obj.Function, obj.Builtin): return obj.Error(f'first argument to \'{name}\' must be FUNCTION, got {function.type()}')
+    if type(function) is obj.Function and len(function.parameters) != arity: return obj.Error(f'function passed to \'{name}\' must take {arity} argument(s), got {len(function.parameters)}')
+    return None
+
+def check_array(name: str, array_object: obj.Object, position: str = "second") -> obj.Error:
+    if type(array_object) is not obj.Array: return obj.Error(f'{position} argument to \'{name}\' must be ARRAY, got {array_object.type()}')
+    return None
+
+def builtin_map(args: list[obj.Object]) -> obj.Object:
+    if len(args) != 2: return obj.Error(f'wrong number of arguments. got={len(args)}, want=2')
+    error = check_function("map", args[0], 1) or check_array("map", args[1])
+    if error is not None: return error
+    mapped = simple_kernels.map_kernel(args[0], args[1])
+    if mapped is not None: return mapped
+    evaluator, results = callback_evaluator(), []
+    for i in range(args[1].length()):
+        value = evaluator.apply_function(args[0], [args[1].get(i)])
+        if evaluator.is_error(value): return value
+        results.append(value)
+    return obj.Array(results)
+
+def builtin_filter(args: list[obj.Object]) -> obj.Object:
+    if len(args) != 2: return obj.Error(f'wrong number of arguments. got={len(args)}, want=2')
+    error = check_function("filter", args[0], 1) or check_array("filter", args[1])
+    if error is not None: return error
+    filtered = simple_kernels.filter_kernel(args[0], args[1])
+    if filtered is not None: return filtered
+    evaluator, results = callback_evaluator(), []
+    for i in range(args[1].length()):
+        element = args[1].get(i)
+        value = evaluator.apply_function(args[0], [element])
+        if evaluator.is_error(value): return value
+        if evaluator.is_truthy(value): results.append(element)
+    return obj.Array(results)
+
+def builtin_reduce(args: list[obj.Object]) -> obj.Object:
+    if len(args) != 3: return obj.Error(f'wrong number of arguments. got={len(args)}, want=3')
+    error = check_function("reduce", args[0], 2) or check_array("reduce", args[1])
+    if error is not None: return error
+    reduced = simple_kernels.reduce_kernel(args[0], args[1], args[2])
+    if reduced is not None: return reduced
+    evaluator, accumulator = callback_evaluator(), args[2]
+    for i in range(args[1].length()):
+        accumulator = evaluator.apply_function(args[0], [accumulator, args[1].get(i)])
+        if evaluator.is_error(accumulator): return accumulator
+    return accumulator
+
+def builtin_pmap(args: list[obj.Object]) -> obj.Object:
+    if len(args) != 2: return obj.Error(f'wrong number of arguments. got={len(args)}, want=2')
+    error = check_function("pmap", args[0], 1) or check_array("pmap", args[1])
+    if error is not None: return error
+    import simple_parallel
+    return simple_parallel.pmap(args[0], args[1])
+
+def integer_values(name: str, args: list[obj.Object]):
+    if len(args) != 1: return obj.Error(f'wrong number of arguments. got={len(args)}, want=1')
+    error = check_array(name, args[0], "first")
+    if error is not None: return error
+    values = simple_kernels.raw_values(args[0])
+    if values is not None: return values
+    for element in args[0].elements:
+        if type(element) is not obj.Integer: return obj.Error(f'elements of \'{name}\' must be INTEGER, got {element.type()}')
+    return [element.value for element in args[0].elements]
+
+def builtin_sum(args: list[obj.Object]) -> obj.Object:
+    values = integer_values("sum", args)
+    if type(values) is obj.Error: return values
+    return obj.new_integer(sum(values))
+
+def builtin_min(args: list[obj.Object]) -> obj.Object:
+    values = integer_values("min", args)
+    if type(values) is obj.Error: return values
+    if len(values) == 0: return simple_eval.NULL
+    return obj.new_integer(min(values))
+
+def builtin_max(args: list[obj.Object]) -> obj.Object:
+    values = integer_values("max", args)
+    if type(values) is obj.Error: return values
+    if len(values) == 0: return simple_eval.NULL
+    return obj.new_integer(max(values))
+
+def builtin_range(args: list[obj.Object]) -> obj.Object:
+    if len(args) < 1 or len(args) > 3: return obj.Error(f'wrong number of arguments. got={len(args)}, want=1 to 3')
+    for arg in args:
+        if type(arg) is not obj.Integer or type(arg.value) is not int: return obj.Error(f'arguments to \'range\' must be INTEGER, got {arg.type()}')
+    if len(args) == 3 and args[2].value == 0: return obj.Error(f'step of \'range\' must not be 0')
+    try: return obj.Array(array('q', range(*[arg.value for arg in args])))
+    except OverflowError: return obj.Array([obj.Integer(value) for value in range(*[arg.value for arg in args])])
+
 functions = {
     "len": obj.Builtin(builtin_len),
     "first": obj.Builtin(builtin_first),
     "last": obj.Builtin(builtin_last),
     "rest": obj.Builtin(builtin_rest),
     "push": obj.Builtin(builtin_push),
-    "puts": obj.Builtin(builtin_puts)
+    "puts": obj.Builtin(builtin_puts),
+    "map": obj.Builtin(builtin_map),
+    "filter": obj.Builtin(builtin_filter),
+    "reduce": obj.Builtin(builtin_reduce),
+    "pmap": obj.Builtin(builtin_pmap),
+    "sum": obj.Builtin(builtin_sum),
+    "min": obj.Builtin(builtin_min),
+    "max": obj.Builtin(builtin_max),
+    "range": obj.Builtin(builtin_range)
     }
@@ -0,0 +1,205 @@
+import operator
+import simple_ast, object as obj
+import simple_builtins
+import simple_eval
+from simple_eval import NULL, TRUE, FALSE
+
+ARITHMETIC = {"+": operator.add, "-": operator.sub, "*": operator.mul, "/": operator.truediv}
+COMPARISON = {"<": operator.lt, ">": operator.gt, "==": operator.eq, "!=": operator.ne}
+
+class CompiledClosure(obj.Compiled):
+    def __init__(self, parameters: list[str], body):
+        self.parameters = parameters
+        self.body = body
+
+    def call(self, function: obj.Function, args: list[obj.Object]) -> obj.Object:
+        environment = obj.Environment(function.environment)
+        for i, parameter in enumerate(self.parameters): environment.set(parameter, args[i])
+        result = self.body(environment)
+        if type(result) is obj.Return: return result.value
+        return result
+
+# every node is translated once into a python callable taking the environment, evaluation then only runs those callables
+class ClosureCompiler():
+    def __init__(self):
+        self.evaluator = simple_eval.Evaluator()
+
+    def eval(self, node: simple_ast.Node, environment: obj.Environment):
+        return self.compile(node)(environment)
+
+    def compile(self, node: simple_ast.Node):
+        if type(node) == simple_ast.Program: return self.compile_program(node)
+        if type(node) == simple_ast.ExpressionStatement: return self.compile(node.expression)
+        if type(node) == simple_ast.IntegerLiteral: return self.compile_constant(obj.Integer(node.value))
+        if type(node) == simple_ast.Boolean: return self.compile_constant(TRUE if node.value else FALSE)
+        if type(node) == simple_ast.StringLiteral: return self.compile_constant(obj.String(node.value))
+        if type(node) == simple_ast.PrefixExpression: return self.compile_prefix_expression(node)
+        if type(node) == simple_ast.InfixExpression: return self.compile_infix_expression(node)
+        if type(node) == simple_ast.BlockStatement: return self.compile_block_statement(node)
+        if type(node) == simple_ast.IfExpression: return self.compile_if_expression(node)
+        if type(node) == simple_ast.ReturnStatement: return self.compile_return_statement(node)
+        if type(node) == simple_ast.LetStatement: return self.compile_let_statement(node)
+        if type(node) == simple_ast.Identifier: return self.compile_identifier(node)
+        if type(node) == simple_ast.FunctionLiteral: return self.compile_function_literal(node)
+        if type(node) == simple_ast.CallExpression: return self.compile_call_expression(node)
+        if type(node) == simple_ast.ArrayLiteral: return self.compile_array_literal(node)
+        if type(node) == simple_ast.IndexExpression: return self.compile_index_expression(node)
+        if type(node) == simple_ast.HashLiteral: return self.compile_hash_literal(node)
+        return self.compile_constant(None)
+
+    def compile_constant(self, constant: obj.Object):
+        def constant_closure(environment): return constant
+        return constant_closure
+
+    def compile_program(self, node: simple_ast.Program):
+        statements = [self.compile(statement) for statement in node.statements]
+        def program_closure(environment):
+            result = None
+            for statement in statements:
+                result = statement(environment)
+                if type(result) is obj.Return: return result.value
+                if type(result) is obj.Error: return result
+            return result
+        return program_closure
+
+    def compile_block_statement(self, node: simple_ast.BlockStatement):
+        statements = [self.compile(statement) for statement in node.statements]
+        if len(statements) == 1: return statements[0]
+        def block_closure(environment):
+            result = None
+            for statement in statements:
+                result = statement(environment)
+                if type(result) is obj.Return or type(result) is obj.Error: return result
+            return result
+        return block_closure
+
+    def compile_prefix_expression(self, node: simple_ast.PrefixExpression):
+        right, operator, evaluator = self.compile(node.right), node.operator, self.evaluator
+        if operator == "-":
+            def minus_closure(environment):
+                value = right(environment)
+                if type(value) is obj.Integer: return obj.Integer(-value.value)
+                return evaluator.eval_prefix_expression(operator, value)
+            return minus_closure
+        def prefix_closure(environment): return evaluator.eval_prefix_expression(operator, right(environment))
+        return prefix_closure
+
+    def compile_infix_expression(self, node: simple_ast.InfixExpression):
+        left, right, operator, evaluator = self.compile(node.left), self.compile(node.right), node.operator, self.evaluator
+        Integer = obj.Integer
+        if operator in ARITHMETIC:
+            function = ARITHMETIC[operator]
+            def arithmetic_closure(environment):
+                left_value, right_value = left(environment), right(environment)
+                if type(left_value) is Integer and type(right_value) is Integer: return Integer(function(left_value.value, right_value.value))
+                return evaluator.eval_infix_expression(operator, left_value, right_value)
+            return arithmetic_closure
+        if operator in COMPARISON:
+            function = COMPARISON[operator]
+            def comparison_closure(environment):
+                left_value, right_value = left(environment), right(environment)
+                if type(left_value) is Integer and type(right_value) is Integer: return TRUE if function(left_value.value, right_value.value) else FALSE
+                return evaluator.eval_infix_expression(operator, left_value, right_value)
+            return comparison_closure
+        def infix_closure(environment): return evaluator.eval_infix_expression(operator, left(environment), right(environment))
+        return infix_closure
+
+    def compile_if_expression(self, node: simple_ast.IfExpression):
+        condition, consequence, evaluator = self.compile(node.condition), self.compile(node.consequence), self.evaluator
+        alternative = self.compile(node.alternative) if node.alternative is not None else self.compile_constant(NULL)
+        def if_closure(environment):
+            value = condition(environment)
+            if value is FALSE or value is NULL: return alternative(environment)
+            if evaluator.is_error(value): return value
+            return consequence(environment)
+        return if_closure
+
+    def compile_return_statement(self, node: simple_ast.ReturnStatement):
+        value, evaluator = self.compile(node.value), self.evaluator
+        def return_closure(environment): return evaluator.eval_return_statement(value(environment))
+        return return_closure
+
+    def compile_let_statement(self, node: simple_ast.LetStatement):
+        value, name, evaluator = self.compile(node.value), node.name.value, self.evaluator
+        def let_closure(environment):
+            result = value(environment)
+            if evaluator.is_error(result): return result
+            environment.set(name, result)
+        return let_closure
+
+    def compile_identifier(self, node: simple_ast.Identifier):
+        name, evaluator = node.value, self.evaluator
+        builtin = simple_builtins.functions.get(name)
+        def identifier_closure(environment):
+            value = environment.get(name)
+            if value is not None: return value
+            if builtin is not None: return builtin
+            return evaluator.new_error(f'identifier not found: {name}')
+        return identifier_closure
+
+    def compile_function_literal(self, node: simple_ast.FunctionLiteral):
+        if node.closure is None: node.closure = CompiledClosure([parameter.value for parameter in node.parameters], self.compile(node.body))
+        parameters, body, compiled = node.parameters, node.body, node.closure
+        def function_closure(environment): return obj.Function(parameters, body, environment, compiled)
+        return function_closure
+
+    def compile_expressions(self, nodes: list[simple_ast.Expression]):
+        expressions, evaluator = [self.compile(node) for node in nodes], self.evaluator
+        def expressions_closure(environment):
+            result = []
+            for expression in expressions:
+                value = expression(environment)
+                if evaluator.is_error(value): return [value]
+                result.append(value)
+            return result
+        return expressions_closure
+
+    # calls into functions compiled here run their pre-built body directly, anything else goes through apply_function
+    def compile_call_expression(self, node: simple_ast.CallExpression):
+        function, arguments, evaluator = self.compile(node.function), self.compile_expressions(node.arguments), self.evaluator
+        Function, Environment, Return = obj.Function, obj.Environment, obj.Return
+        def call_closure(environment):
+            callee = function(environment)
+            if evaluator.is_error(callee): return callee
+            args = arguments(environment)
+            if len(args) == 1 and evaluator.is_error(args[0]): return args[0]
+            if type(callee) is Function and type(callee.compiled) is CompiledClosure:
+                extended = Environment(callee.environment)
+                for i, parameter in enumerate(callee.compiled.parameters): extended.environment[parameter] = args[i]
+                result = callee.compiled.body(extended)
+                if type(result) is Return: return result.value
+                return result
+            return evaluator.apply_function(callee, args)
+        return call_closure
+
+    def compile_array_literal(self, node: simple_ast.ArrayLiteral):
+        elements, evaluator = self.compile_expressions(node.elements), self.evaluator
+        def array_closure(environment):
+            values = elements(environment)
+            if len(values) == 1 and evaluator.is_error(values[0]): return values[0]
+            return obj.Array(values)
+        return array_closure
+
+    def compile_index_expression(self, node: simple_ast.IndexExpression):
+        left, index, evaluator = self.compile(node.left), self.compile(node.index), self.evaluator
+        def index_closure(environment):
+            left_value = left(environment)
+            if evaluator.is_error(left_value): return left_value
+            index_value = index(environment)
+            if evaluator.is_error(index_value): return index_value
+            return evaluator.eval_index(left_value, index_value)
+        return index_closure
+
+    def compile_hash_literal(self, node: simple_ast.HashLiteral):
+        pairs, evaluator = [(self.compile(key), self.compile(value)) for key, value in node.dict.items()], self.evaluator
+        def hash_closure(environment):
+            hash_dict = obj.Hash()
+            for key_closure, value_closure in pairs:
+                key = key_closure(environment)
+                if evaluator.is_error(key): return key
+                if not isinstance(key, obj.Hashable): return evaluator.new_error(f'object type not supported for key, got={key.type()}')
+                value = value_closure(environment)
+                if evaluator.is_error(value): return value
+                hash_dict.set(key, value)
+            return hash_dict
+        return hash_closure
@@ -0,0 +1,220 @@
+import simple_ast, object as obj
+import simple_eval
+import simple_resolver
+
+# opcodes, operands follow inline in the instruction list
+OP_CONSTANT = 0       # const_index
+OP_POP = 1
+OP_ADD = 2
+OP_SUB = 3
+OP_MUL = 4
+OP_DIV = 5
+OP_LT = 6
+OP_GT = 7
+OP_EQ = 8
+OP_NEQ = 9
+OP_BANG = 10
+OP_MINUS = 11
+OP_JUMP = 12          # target
+OP_JUMP_IF_FALSY = 13 # target
+OP_GET_GLOBAL = 14    # name_index
+OP_SET_GLOBAL = 15    # name_index
+OP_GET_LOCAL = 16     # slot, name_index
+OP_SET_LOCAL = 17     # slot
+OP_GET_OUTER = 18     # depth, slot, name_index
+OP_CLOSURE = 19       # const_index
+OP_CALL = 20          # argument count
+OP_RETURN = 21
+OP_ARRAY = 22         # element count
+OP_HASH = 23          # pair count
+OP_HASH_KEY = 24
+OP_INDEX = 25
+OP_RETURN_VALUE = 26     # return statement, OP_RETURN (the end of a body) unwraps a Return value left by the last statement
+OP_POP_OR_JUMP = 27      # target
+OP_WRAP_RETURN = 28
+
+OPERAND_WIDTHS = {OP_CONSTANT: 1, OP_JUMP: 1, OP_JUMP_IF_FALSY: 1, OP_GET_GLOBAL: 1, OP_SET_GLOBAL: 1, OP_GET_LOCAL: 2, OP_SET_LOCAL: 1,
+                  OP_GET_OUTER: 3, OP_CLOSURE: 1, OP_CALL: 1, OP_ARRAY: 1, OP_HASH: 1, OP_POP_OR_JUMP: 1}
+OP_NAMES = {value: name for name, value in globals().items() if name.startswith('OP_') and type(value) == int}
+INFIX_OPS = {"+": OP_ADD, "-": OP_SUB, "*": OP_MUL, "/": OP_DIV, "<": OP_LT, ">": OP_GT, "==": OP_EQ, "!=": OP_NEQ}
+PREFIX_OPS = {"!": OP_BANG, "-": OP_MINUS}
+
+class Bytecode():
+    def __init__(self, instructions: list[int], constants: list):
+        self.instructions = instructions
+        self.constants = constants
+
+class Scope():
+    def __init__(self, outer: "Scope" = None):
+        self.outer = outer
+        self.symbols: dict[str, int] = {}
+        self.instructions: list[int] = []
+        self.bound: set[str] = set() # parameters and the lets compiled so far
+
+    # slot 0 of every runtime scope holds the enclosing scope
+    def define(self, name: str) -> int:
+        if name not in self.symbols: self.symbols[name] = len(self.symbols) + 1
+        return self.symbols[name]
+
+    # every let of a function has its slot from the start, like simple_resolver gives them. the function itself only reads a slot
+    # once a parameter or an earlier let has bound it, before that (and in the value of its own first let) the name is the outer one.
+    # nested functions run later and read any slot
+    def resolve(self, name: str):
+        scope, depth = self, 0
+        while scope is not None:
+            if name in scope.symbols and (depth > 0 or name in scope.bound): return depth, scope.symbols[name]
+            scope, depth = scope.outer, depth + 1
+        return None
+
+    # slots of the same name in functions further out than depth, read in turn (then the globals) when the resolved slot is
+    # still empty at run time, its let not having run yet or sitting in a branch that was not taken
+    def outer_slots(self, name: str, depth: int) -> tuple:
+        scope, found = self, []
+        for _ in range(depth + 1): scope = scope.outer
+        depth += 1
+        while scope is not None:
+            if name in scope.symbols: found.append((depth, scope.symbols[name]))
+            scope, depth = scope.outer, depth + 1
+        return tuple(found)
+
+class Compiler():
+    def __init__(self):
+        self.constants = []
+        self.constant_index: dict = {}
+        self.scope: Scope = None
+        self.instructions: list[int] = []
+        # jumps to the end of the innermost if used as an operand, None outside one (see compile_if_expression)
+        self.exits: list[int] = None
+
+    def bytecode(self) -> Bytecode: return Bytecode(self.instructions, self.constants)
+
+    def compile(self, node: simple_ast.Node):
+        if type(node) == simple_ast.Program: self.compile_statements(node.statements); self.emit(OP_RETURN)
+        elif type(node) == simple_ast.BlockStatement: self.compile_statements(node.statements)
+        elif type(node) == simple_ast.ExpressionStatement:
+            if type(node.expression) == simple_ast.IfExpression: self.compile_if_expression(node.expression, statement=True)
+            else: self.compile(node.expression)
+        elif type(node) == simple_ast.LetStatement: self.compile_let_statement(node)
+        elif type(node) == simple_ast.ReturnStatement: self.compile_return_statement(node)
+        elif type(node) == simple_ast.IntegerLiteral: self.emit(OP_CONSTANT, self.add_constant(obj.Integer(node.value), ('int', node.value)))
+        elif type(node) == simple_ast.StringLiteral: self.emit(OP_CONSTANT, self.add_constant(obj.String(node.value), ('str', node.value)))
+        elif type(node) == simple_ast.Boolean: self.emit(OP_CONSTANT, self.add_constant(simple_eval.TRUE if node.value else simple_eval.FALSE, ('bool', node.value)))
+        elif type(node) == simple_ast.PrefixExpression: self.compile(node.right); self.emit(PREFIX_OPS[node.operator])
+        elif type(node) == simple_ast.InfixExpression: self.compile(node.left); self.compile(node.right); self.emit(INFIX_OPS[node.operator])
+        elif type(node) == simple_ast.IfExpression: self.compile_if_expression(node)
+        elif type(node) == simple_ast.Identifier: self.compile_identifier(node)
+        elif type(node) == simple_ast.FunctionLiteral: self.compile_function_literal(node)
+        elif type(node) == simple_ast.CallExpression: self.compile_call_expression(node)
+        elif type(node) == simple_ast.ArrayLiteral: self.compile_array_literal(node)
+        elif type(node) == simple_ast.HashLiteral: self.compile_hash_literal(node)
+        elif type(node) == simple_ast.IndexExpression: self.compile(node.left); self.compile(node.index); self.emit(OP_INDEX)
+        else: self.emit(OP_CONSTANT, self.add_constant(None, ('none',)))
+
+    # a statement list leaves exactly one value on the stack, like eval_statements returns one result
+    def compile_statements(self, statements: list[simple_ast.Statement]):
+        if len(statements) == 0: self.emit(OP_CONSTANT, self.add_constant(None, ('none',)))
+        for i, statement in enumerate(statements):
+            self.compile(statement)
+            last = i == len(statements) - 1
+            if type(statement) == simple_ast.ExpressionStatement and not last:
+                if self.exits is None: self.emit(OP_POP)
+                else: self.exits.append(self.emit(OP_POP_OR_JUMP, -1))
+            if type(statement) == simple_ast.LetStatement and last: self.emit(OP_CONSTANT, self.add_constant(None, ('none',)))
+
+    def compile_let_statement(self, node: simple_ast.LetStatement):
+        if self.scope is None:
+            self.compile(node.value)
+            self.emit(OP_SET_GLOBAL, self.add_constant(node.name.value, ('name', node.name.value)))
+            return
+        self.compile(node.value)
+        self.scope.bound.add(node.name.value)
+        self.emit(OP_SET_LOCAL, self.scope.define(node.name.value))
+
+    def compile_identifier(self, node: simple_ast.Identifier):
+        name = self.add_constant(node.value, ('name', node.value))
+        resolved = self.scope.resolve(node.value) if self.scope is not None else None
+        if resolved is None:
+            self.emit(OP_GET_GLOBAL, name)
+            return
+        outer = self.scope.outer_slots(node.value, resolved[0])
+        # the name operand of a local read points at (name, outer slots) when there are slots to fall back to
+        if len(outer) > 0: name = self.add_constant((node.value, outer), ('outer', node.value, outer))
+        if resolved[0] == 0: self.emit(OP_GET_LOCAL, resolved[1], name)
+        else: self.emit(OP_GET_OUTER, resolved[0], resolved[1], name)
+
+    def compile_return_statement(self, node: simple_ast.ReturnStatement):
+        self.compile(node.value)
+        if self.exits is None: self.emit(OP_RETURN_VALUE)
+        else:
+            self.emit(OP_WRAP_RETURN)
+            self.exits.append(self.emit(OP_JUMP, -1))
+
+    # like the tree walker, a return only unwinds through statements. inside an if used as an operand (1 + if ..., a let
+    # value) it ends the if with the Return itself as its value, and so does a statement that evaluates to a Return
+    def compile_if_expression(self, node: simple_ast.IfExpression, statement: bool = False):
+        outer_exits = self.exits
+        if not statement: self.exits = []
+        self.compile(node.condition)
+        jump_if_falsy = self.emit(OP_JUMP_IF_FALSY, -1)
+        self.compile(node.consequence)
+        jump = self.emit(OP_JUMP, -1)
+        self.instructions[jump_if_falsy + 1] = len(self.instructions)
+        if node.alternative is not None: self.compile(node.alternative)
+        else: self.emit(OP_CONSTANT, self.add_constant(simple_eval.NULL, ('null',)))
+        self.instructions[jump + 1] = len(self.instructions)
+        if not statement:
+            for exit in self.exits: self.instructions[exit + 1] = len(self.instructions)
+        self.exits = outer_exits
+
+    def compile_function_literal(self, node: simple_ast.FunctionLiteral):
+        outer_instructions, outer_exits = self.instructions, self.exits
+        self.exits = None
+        self.scope = Scope(self.scope)
+        self.instructions = self.scope.instructions
+        for parameter in node.parameters:
+            self.scope.define(parameter.value)
+            self.scope.bound.add(parameter.value)
+        for name in simple_resolver.Resolver().let_names(node.body.statements): self.scope.define(name)
+        self.compile(node.body)
+        self.emit(OP_RETURN)
+        compiled = obj.CompiledFunction(self.instructions, self.constants, len(self.scope.symbols), node.parameters, node.body)
+        self.scope = self.scope.outer
+        self.instructions, self.exits = outer_instructions, outer_exits
+        self.emit(OP_CLOSURE, self.add_constant(compiled))
+
+    def compile_call_expression(self, node: simple_ast.CallExpression):
+        self.compile(node.function)
+        for argument in node.arguments: self.compile(argument)
+        self.emit(OP_CALL, len(node.arguments))
+
+    def compile_array_literal(self, node: simple_ast.ArrayLiteral):
+        for element in node.elements: self.compile(element)
+        self.emit(OP_ARRAY, len(node.elements))
+
+    # keys are validated before their value is evaluated, same order as eval_hash_literal
+    def compile_hash_literal(self, node: simple_ast.HashLiteral):
+        for key, value in node.dict.items():
+            self.compile(key)
+            self.emit(OP_HASH_KEY)
+            self.compile(value)
+        self.emit(OP_HASH, len(node.dict))
+
+    def add_constant(self, constant, key: tuple = None) -> int:
+        if key is not None and key in self.constant_index: return self.constant_index[key]
+        self.constants.append(constant)
+        if key is not None: self.constant_index[key] = len(self.constants) - 1
+        return len(self.constants) - 1
+
+    def emit(self, op: int, *operands: int) -> int:
+        position = len(self.instructions)
+        self.instructions.append(op)
+        self.instructions.extend(operands)
+        return position
+
+def disassemble(instructions: list[int]) -> list[str]:
+    out, ip = [], 0
+    while ip < len(instructions):
+        op, width = instructions[ip], OPERAND_WIDTHS.get(instructions[ip], 0)
+        out.append(' '.join([OP_NAMES[op][3:]] + [str(operand) for operand in instructions[ip + 1:ip + 1 + width]]))
+        ip += 1 + width
+    return out
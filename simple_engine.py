@@ -0,0 +1,39 @@
+import simple_token
+import simple_parser
+import object as obj
+import simple_eval
+import simple_vm
+import simple_closure
+import simple_transpiler
+import simple_heap_eval
+import simple_exception_eval
+import simple_memo_eval
+import simple_budget_eval
+import simple_image
+import simple_arena
+
+# every engine exposes eval(program, environment) and returns the same object.* results
+ENGINES = {"eval": simple_eval.Evaluator, "vm": simple_vm.VM, "closure": simple_closure.ClosureCompiler, "python": simple_transpiler.Transpiler, "heap": simple_heap_eval.HeapEvaluator, "exceptions": simple_exception_eval.ExceptionEvaluator, "memo": simple_memo_eval.MemoizingEvaluator, "budget": simple_budget_eval.BudgetedEvaluator, "arena": simple_arena.ArenaEvaluator}
+
+def new_engine(name: str = "eval"):
+    if name not in ENGINES: raise ValueError(f'unknown engine: {name}, expected one of {", ".join(ENGINES)}')
+    return ENGINES[name]()
+
+# setup code evaluated once, every request then runs in its own fork of the resulting environment.
+# with an image path the evaluated environment is loaded from there, and written there when missing or stale
+class Prelude():
+    def __init__(self, source: str, engine: str = "eval", image: str = None):
+        self.engine = engine
+        self.environment = simple_image.load(image, source) if image is not None else None
+        if self.environment is not None: return
+        parser = simple_parser.Parser(simple_token.RegexLexer(source))
+        program = parser.parse_program()
+        if len(parser.errors) > 0: raise ValueError(f'prelude has {len(parser.errors)} parser error(s): {"; ".join(parser.errors)}')
+        self.environment = obj.Environment()
+        value = new_engine(engine).eval(program, self.environment)
+        if type(value) is obj.Error: raise ValueError(f'prelude failed: {value.message}')
+        if image is not None: simple_image.dump(self.environment, image, source)
+
+    def fork(self) -> obj.Environment: return self.environment.fork()
+
+    def run(self, program) -> obj.Object: return new_engine(self.engine).eval(program, self.fork())
@@ -1,23 +1,32 @@
 import simple_ast, object as obj
 import simple_builtins
+import simple_resolver
 
 NULL = obj.Null()
 TRUE = obj.Boolean(True)
 FALSE = obj.Boolean(False)
+NUMBERS = (int, float)
+
+# call in tail position, handed back to apply_function instead of growing the python stack
+class TailCall(obj.Object):
+    def __init__(self, function: obj.Object, args: list[obj.Object]):
+        self.function = function
+        self.args = args
+
+    def type(self): return 'TAIL_CALL'
 
 #TODO: this does not need to be a class
 class Evaluator():
     def eval(self, node: simple_ast.Node, environment: obj.Environment):
-        if type(node) == simple_ast.Program: return self.eval_statements(node.statements, environment)
+        if type(node) == simple_ast.Program: return self.eval_program(node, environment)
         if type(node) == simple_ast.ExpressionStatement: return self.eval(node.expression, environment)
-        if type(node) == simple_ast.IntegerLiteral: return obj.Integer(node.value)
+        if type(node) == simple_ast.IntegerLiteral: return node.constant if node.constant is not None else self.eval_integer_literal(node)
         if type(node) == simple_ast.Boolean: return self.native_bool_to_object(node.value)
-        if type(node) == simple_ast.PrefixExpression: return self.eval_prefix_expression(node.operator, self.eval(node.right, environment))
-        if type(node) == simple_ast.InfixExpression: return self.eval_infix_expression(node.operator, self.eval(node.left, environment), self.eval(node.right, environment))
+        if type(node) == simple_ast.PrefixExpression or type(node) == simple_ast.InfixExpression: return self.boxed(self.eval_unboxed(node, environment))
         if type(node) == simple_ast.BlockStatement: return self.eval_block_statements(node.statements, environment)
         if type(node) == simple_ast.IfExpression: return self.eval_if_expression(node, environment)
         if type(node) == simple_ast.ReturnStatement: return self.eval_return_statement(self.eval(node.value, environment))
-        if type(node) == simple_ast.LetStatement: self.eval_let_statement(node, environment)
+        if type(node) == simple_ast.LetStatement: return self.eval_let_statement(node, environment)
         if type(node) == simple_ast.Identifier: return self.eval_identifiers(node, environment)
         if type(node) == simple_ast.FunctionLiteral: return self.eval_function_literal(node, environment)
         if type(node) == simple_ast.CallExpression: return self.eval_call_expression(node, environment)
@@ -27,7 +36,49 @@ class Evaluator():
         if type(node) == simple_ast.HashLiteral: return self.eval_hash_literal(node, environment)
         return None 
 
+    def eval_integer_literal(self, node: simple_ast.IntegerLiteral):
+        node.constant = obj.new_integer(node.value)
+        return node.constant
+
+    # arithmetic runs on python ints (and the floats of '/'), only the final result of an expression gets an object
+    def eval_unboxed(self, node: simple_ast.Expression, environment: obj.Environment):
+        kind = type(node)
+        if kind == simple_ast.IntegerLiteral: return node.value
+        if kind == simple_ast.InfixExpression:
+            left, right = self.eval_unboxed(node.left, environment), self.eval_unboxed(node.right, environment)
+            if type(left) in NUMBERS and type(right) in NUMBERS: return self.eval_unboxed_infix_expression(node.operator, left, right)
+            return self.eval_infix_expression(node.operator, self.boxed(left), self.boxed(right))
+        if kind == simple_ast.PrefixExpression:
+            right = self.eval_unboxed(node.right, environment)
+            if node.operator == "-" and type(right) in NUMBERS: return -right
+            return self.eval_prefix_expression(node.operator, self.boxed(right))
+        value = self.eval_identifiers(node, environment) if kind == simple_ast.Identifier else self.eval(node, environment)
+        if type(value) == obj.Integer: return value.value
+        return value
+
+    def eval_unboxed_infix_expression(self, operator: str, left, right):
+        if operator == "+": return left + right
+        if operator == "-": return left - right
+        if operator == "*": return left * right
+        if operator == "/": return left / right
+        if operator == "<": return TRUE if left < right else FALSE
+        if operator == ">": return TRUE if left > right else FALSE
+        if operator == "==": return TRUE if left == right else FALSE
+        if operator == "!=": return TRUE if left != right else FALSE
+        return self.new_error(f'unknown operator: {obj.INTEGER_OBJ} {operator} {obj.INTEGER_OBJ}')
+
+    def boxed(self, value):
+        if type(value) in NUMBERS: return obj.new_integer(value)
+        return value
+
+    def eval_program(self, program: simple_ast.Program, environment: obj.Environment):
+        if not program.resolved: simple_resolver.Resolver().resolve(program)
+        token = simple_builtins.caller.set(self)
+        try: return self.eval_statements(program.statements, environment)
+        finally: simple_builtins.caller.reset(token)
+
     def eval_statements(self, statements: list[simple_ast.Statement], environment: obj.Environment):
+        result = None
         for statement in statements:
             result = self.eval(statement, environment)
             if type(result) == obj.Return: return result.value
@@ -35,6 +86,7 @@ class Evaluator():
         return result
     
     def eval_block_statements(self, statemenets: list[simple_ast.Statement], environment: obj.Environment):
+        result = None
         for statement in statemenets:
             result = self.eval(statement, environment)
             if type(result) == obj.Return or type(result) == obj.Error: return result
@@ -43,20 +95,21 @@ class Evaluator():
     def eval_function_literal(self, node: simple_ast.FunctionLiteral, environment: obj.Environment):
         params = node.parameters
         body = node.body
-        return obj.Function(params, body, environment)
+        return obj.Function(params, body, environment, names=node.names)
     
     def eval_call_expression(self, node: simple_ast.CallExpression, environment: obj.Environment):
         function = self.eval(node.function, environment)
         if self.is_error(function): return function
         args = self.eval_expressions(node.arguments, environment)
         if len(args) == 1 and self.is_error(args[0]): return args[0]
+        if node.tail: return TailCall(function, args)
         return self.apply_function(function, args)
     
     def eval_expressions(self, args: list[simple_ast.Expression], environment: obj.Environment):
         result: list[obj.Object] = []
         for argument in args:
             evaluated = self.eval(argument, environment)
-            if self.is_error(evaluated): return evaluated
+            if self.is_error(evaluated): return [evaluated]
             result.append(evaluated)
         return result
     
@@ -66,11 +119,10 @@ class Evaluator():
             key = self.eval(key_node, environment)
             if self.is_error(key): return key
             if not isinstance(key, obj.Hashable): return self.new_error(f'object type not supported for key, got={key.type()}')
-            key_hash = key.hashkey()
             value = self.eval(value_node, environment)
             if self.is_error(value): return value
 
-            hash_dict.dict[key_hash] = obj.HashPair(key, value)
+            hash_dict.set(key, value)
         return hash_dict
     
     def eval_array_literals(self, node: simple_ast.ArrayLiteral, environment: obj.Environment):
@@ -83,31 +135,38 @@ class Evaluator():
         if self.is_error(left): return left
         index = self.eval(node.index, environment)
         if self.is_error(index): return index
+        return self.eval_index(left, index)
+
+    def eval_index(self, left: obj.Object, index: obj.Object):
         if type(left) == obj.Array and type(index) == obj.Integer: return self.eval_index_array_expression(left, index)
         if type(left) == obj.Hash and isinstance(index, obj.Hashable): return self.eval_index_hash_expression(left, index)
         return self.new_error(f'index operator not supported: {left.type()}')
     
     def eval_index_array_expression(self, array: obj.Array, index: obj.Integer):
-        max = len(array.elements)
-        print(f'array={len(array.elements)}, index={index.value}')
-        if index.value < 0 or index.value >= max: return None
-        return array.elements[index.value]
+        if index.value < 0 or index.value >= array.length(): return NULL
+        return array.get(index.value)
     
     def eval_index_hash_expression(self, hash_dict: obj.Hash, index: obj.Hashable):
-        pair = hash_dict.dict.get(index.hashkey())
-        if pair is None: return NULL
-        return pair.value
+        value = hash_dict.get(index)
+        if value is None: return NULL
+        return value
     
     def apply_function(self, function: obj.Object, args: list[obj.Object]):
-        if type(function) == obj.Function:
-            extended_environment = self.extended_function_environment(function, args)
-            evaluated = self.eval(function.body, extended_environment)
-            return self.unwrapped_return_value(evaluated)
-        if type(function) == obj.Builtin: return function.builtin(args) 
-        else: return self.new_error(f'not a function: {function.type()}') 
+        while True:
+            if type(function) == obj.Function and function.compiled is not None: return function.compiled.call(function, args)
+            if type(function) == obj.Function:
+                extended_environment = self.extended_function_environment(function, args)
+                evaluated = self.unwrapped_return_value(self.eval(function.body, extended_environment))
+                if type(evaluated) != TailCall: return evaluated
+                function, args = evaluated.function, evaluated.args
+            elif type(function) == obj.Builtin: return self.apply_builtin(function, args)
+            else: return self.new_error(f'not a function: {function.type()}') 
+
+    def apply_builtin(self, builtin: obj.Builtin, args: list[obj.Object]): return builtin.builtin(args)
     
     def extended_function_environment(self, function: obj.Function, args: list[obj.Object]):
-        environment = obj.Environment(function.environment)
+        if function.names is not None: environment = obj.SlotEnvironment(function.names, function.environment)
+        else: environment = obj.Environment(function.environment)
         for i, parameter in enumerate(function.parameters): 
             environment.set(parameter.value, args[i]) 
         return environment
@@ -118,15 +177,31 @@ class Evaluator():
 
     def eval_let_statement(self, node: simple_ast.LetStatement, environment: obj.Environment):
         value = self.eval(node.value, environment)
+        return self.bind_let_statement(node, value, environment)
+
+    def bind_let_statement(self, node: simple_ast.LetStatement, value: obj.Object, environment: obj.Environment):
         if self.is_error(value): return value 
-        environment.set(node.name.value, value)
+        if node.slot is not None: environment.slots[node.slot] = value
+        else: environment.set(node.name.value, value)
     
     def eval_identifiers(self, node: simple_ast.Identifier, environment: obj.Environment):
-        value = environment.get(node.value) 
-        if value is None: value = simple_builtins.functions.get(node.value)
+        if node.depth is None: 
+            value = environment.get(node.value) 
+            if value is None: value = simple_builtins.functions.get(node.value)
+        elif node.slot is not None:
+            value = environment.slots[node.slot] if node.depth == 0 else environment.get_slot(node.depth, node.slot)
+            if value is None: value = self.outer_environment(environment, node.depth + 1).get(node.value)
+            if value is None: value = simple_builtins.functions.get(node.value)
+        else:
+            value = (environment.outer if node.depth == 1 else self.outer_environment(environment, node.depth)).get(node.value)
+            if value is None: value = node.builtin
         if value is None: return self.new_error(f'identifier not found: {node.value}')
         
         return value
+
+    def outer_environment(self, environment: obj.Environment, depth: int):
+        for _ in range(depth): environment = environment.outer
+        return environment
     
     def native_bool_to_object(self, boolean): return TRUE if boolean else FALSE
 
@@ -144,8 +219,7 @@ class Evaluator():
     
     def eval_minus_operator_expression(self, object: obj.Object):
         if type(object) != obj.Integer: return self.new_error(f'unknown operator: -{object.type()}')
-        object.value = -object.value
-        return object
+        return obj.new_integer(-object.value)
     
     def eval_infix_expression(self, operator: str, left: obj.Object, right: obj.Object):
         if self.is_error(left): return left
@@ -156,7 +230,7 @@ class Evaluator():
         return self.new_error(f'type mismatch: {left.type()} {operator} {right.type()}')
     
     def eval_infix_string_expression(self, operator: str, left: obj.String, right: obj.String):
-        if operator == "+": return obj.String(f'{left.value}{right.value}')
+        if operator == "+": return left.concat(right)
         return self.new_error(f'unknown operator: {left.type()} {operator} {right.type()}')
     
     def eval_infix_boolean_expression(self, operator: str, left: obj.Boolean, right: obj.Boolean):
@@ -165,10 +239,10 @@ class Evaluator():
         return self.new_error(f'unknown operator: {left.type()} {operator} {right.type()}')
     
     def eval_infix_integer_expression(self, operator: str, left: obj.Integer, right: obj.Integer):
-        if operator == "+": return obj.Integer(left.value + right.value)
-        if operator == "-": return obj.Integer(left.value - right.value)
-        if operator == "*": return obj.Integer(left.value * right.value)
-        if operator == "/": return obj.Integer(left.value / right.value)
+        if operator == "+": return obj.new_integer(left.value + right.value)
+        if operator == "-": return obj.new_integer(left.value - right.value)
+        if operator == "*": return obj.new_integer(left.value * right.value)
+        if operator == "/": return obj.new_integer(left.value / right.value)
         if operator == "<": return self.native_bool_to_object(left.value < right.value)
         if operator == ">": return self.native_bool_to_object(left.value > right.value)
         if operator == "==": return self.native_bool_to_object(left.value == right.value)
@@ -177,6 +251,7 @@ class Evaluator():
     
     def eval_if_expression(self, if_expression: simple_ast.IfExpression, environment: obj.Environment):
         condition = self.eval(if_expression.condition, environment)
+        if self.is_error(condition): return condition
         if self.is_truthy(condition): return self.eval(if_expression.consequence, environment)
         elif if_expression.alternative is not None: return self.eval(if_expression.alternative, environment) 
         return NULL
@@ -194,5 +269,5 @@ class Evaluator():
     def new_error(self, message: str): return obj.Error(message)
 
     def is_error(self, object: obj.Object): 
-        if object.type() == obj.ERROR or object is None: return True
-        else: False
+        if object is None or object.type() == obj.ERROR: return True
+        return False
@@ -0,0 +1,133 @@
+import simple_ast, object as obj
+import simple_eval
+import simple_builtins
+import simple_resolver
+from simple_eval import NULL, TRUE, FALSE, NUMBERS, TailCall
+
+class ReturnSignal(Exception):
+    __slots__ = ("value",)
+    def __init__(self, value: obj.Object): self.value = value
+
+class MonkeyRuntimeError(Exception):
+    def __init__(self, error: obj.Error):
+        super().__init__(error.message)
+        self.error = error
+
+# an expression without a value (a block ending in a let, a function with an empty body), ends the statement it is part of
+class Void(Exception):
+    __slots__ = ()
+
+# return and errors unwind as python exceptions, values are never wrapped or checked on the way up.
+# apply_function catches returns, errors become obj.Error again at the program boundary
+class ExceptionEvaluator(simple_eval.Evaluator):
+    def eval(self, node: simple_ast.Node, environment: obj.Environment):
+        kind = type(node)
+        if kind == simple_ast.Identifier:
+            value = self.eval_identifiers(node, environment)
+            if type(value) is obj.Error: raise MonkeyRuntimeError(value)
+            return value
+        if kind == simple_ast.IntegerLiteral: return node.constant if node.constant is not None else self.eval_integer_literal(node)
+        if kind == simple_ast.InfixExpression or kind == simple_ast.PrefixExpression: return self.boxed(self.eval_unboxed(node, environment))
+        if kind == simple_ast.CallExpression: return self.eval_call_expression(node, environment)
+        if kind == simple_ast.IfExpression: return self.eval_if_value(node, environment)
+        if kind == simple_ast.Boolean: return TRUE if node.value else FALSE
+        if kind == simple_ast.StringLiteral: return obj.String(node.value)
+        if kind == simple_ast.FunctionLiteral: return self.eval_function_literal(node, environment)
+        if kind == simple_ast.ArrayLiteral: return obj.Array([self.eval(element, environment) for element in node.elements])
+        if kind == simple_ast.IndexExpression: return self.checked(self.eval_index(self.eval(node.left, environment), self.eval(node.index, environment)))
+        if kind == simple_ast.HashLiteral: return self.eval_hash_literal(node, environment)
+        if kind == simple_ast.Program: return self.eval_program(node, environment)
+        raise Void()
+
+    def eval_program(self, program: simple_ast.Program, environment: obj.Environment):
+        if not program.resolved: simple_resolver.Resolver().resolve(program)
+        token = simple_builtins.caller.set(self)
+        try: return self.eval_statements(program.statements, environment)
+        except ReturnSignal as signal: return signal.value
+        except MonkeyRuntimeError as error: return error.error
+        finally: simple_builtins.caller.reset(token)
+
+    def eval_statements(self, statements: list[simple_ast.Statement], environment: obj.Environment):
+        result = None
+        for statement in statements:
+            try:
+                kind = type(statement)
+                if kind == simple_ast.ExpressionStatement:
+                    expression = statement.expression
+                    result = self.eval_if_expression(expression, environment) if type(expression) == simple_ast.IfExpression else self.eval(expression, environment)
+                    if type(result) is obj.Return: raise ReturnSignal(result.value)
+                elif kind == simple_ast.LetStatement:
+                    value = self.eval(statement.value, environment)
+                    if statement.slot is not None: environment.slots[statement.slot] = value
+                    else: environment.set(statement.name.value, value)
+                    result = None
+                elif kind == simple_ast.ReturnStatement: raise ReturnSignal(self.eval(statement.value, environment))
+                else: result = None
+            except Void: result = None
+        return result
+
+    def eval_unboxed(self, node: simple_ast.Expression, environment: obj.Environment):
+        kind = type(node)
+        if kind == simple_ast.IntegerLiteral: return node.value
+        if kind == simple_ast.InfixExpression:
+            left, right = self.eval_unboxed(node.left, environment), self.eval_unboxed(node.right, environment)
+            if type(left) in NUMBERS and type(right) in NUMBERS: return self.checked(self.eval_unboxed_infix_expression(node.operator, left, right))
+            return self.checked(self.eval_infix_expression(node.operator, self.boxed(left), self.boxed(right)))
+        if kind == simple_ast.PrefixExpression:
+            right = self.eval_unboxed(node.right, environment)
+            if node.operator == "-" and type(right) in NUMBERS: return -right
+            return self.checked(self.eval_prefix_expression(node.operator, self.boxed(right)))
+        value = self.eval(node, environment)
+        if type(value) is obj.Integer: return value.value
+        return value
+
+    # the tree walker only unwinds a return through statements, an if used as an operand evaluates to the Return itself
+    # (1 + it is a type mismatch, a let binds it) and it unwinds later only if it ends up as the value of a statement
+    def eval_if_value(self, node: simple_ast.IfExpression, environment: obj.Environment):
+        try: return self.eval_if_expression(node, environment)
+        except ReturnSignal as signal: return obj.Return(signal.value)
+
+    def eval_if_expression(self, node: simple_ast.IfExpression, environment: obj.Environment):
+        condition = self.eval(node.condition, environment)
+        if condition is FALSE or condition is NULL:
+            if node.alternative is None: return NULL
+            block = node.alternative
+        else: block = node.consequence
+        value = self.eval_statements(block.statements, environment)
+        if value is None: raise Void()
+        return value
+
+    def eval_call_expression(self, node: simple_ast.CallExpression, environment: obj.Environment):
+        function = self.eval(node.function, environment)
+        args = [self.eval(argument, environment) for argument in node.arguments]
+        if node.tail: return TailCall(function, args)
+        value = self.call_function(function, args)
+        if value is None: raise Void()
+        if type(value) is obj.Error: raise MonkeyRuntimeError(value)
+        return value
+
+    def call_function(self, function: obj.Object, args: list[obj.Object]):
+        while type(function) == obj.Function and function.compiled is None:
+            environment = self.extended_function_environment(function, args)
+            try: value = self.eval_statements(function.body.statements, environment)
+            except ReturnSignal as signal: value = signal.value
+            if type(value) != TailCall: return value
+            function, args = value.function, value.args
+        return super().apply_function(function, args)
+
+    # entry point for callers outside this evaluator, they expect obj.Error values
+    def apply_function(self, function: obj.Object, args: list[obj.Object]):
+        try: return self.call_function(function, args)
+        except MonkeyRuntimeError as error: return error.error
+
+    def eval_hash_literal(self, node: simple_ast.HashLiteral, environment: obj.Environment):
+        hash_dict = obj.Hash()
+        for key_node, value_node in node.dict.items():
+            key = self.eval(key_node, environment)
+            if not isinstance(key, obj.Hashable): raise MonkeyRuntimeError(self.new_error(f'object type not supported for key, got={key.type()}'))
+            hash_dict.set(key, self.eval(value_node, environment))
+        return hash_dict
+
+    def checked(self, value: obj.Object):
+        if type(value) is obj.Error: raise MonkeyRuntimeError(value)
+        return value
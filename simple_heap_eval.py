@@ -0,0 +1,180 @@
+import simple_ast, object as obj
+import simple_eval
+import simple_builtins
+from simple_eval import NULL
+from simple_resolver import Resolver
+
+# continuations on the work stack, each entry is (tag, ...) and consumes the value the previous step left on the value stack
+EVAL = 0            # node, environment
+STATEMENTS = 1      # statements, next index, environment, is_program
+PREFIX = 2          # operator
+INFIX = 3           # operator
+IF = 4              # if node, environment
+RETURN = 5
+LET = 6             # let node, environment
+CALL_ARGUMENTS = 7  # call node, environment
+EXPRESSIONS = 8     # nodes, next index, environment, collected values
+APPLY = 9
+CALL_RESULT = 10
+ARRAY = 11
+INDEX_LEFT = 12     # index node, environment
+INDEX = 13          # left
+HASH_KEY = 14       # pairs, next index, environment, hash
+HASH_CHECK_KEY = 15 # pairs, index, environment, hash
+HASH_VALUE = 16     # pairs, index, environment, hash, key
+
+# evaluates without python recursion, monkey call depth is only bounded by memory
+class HeapEvaluator():
+    def __init__(self):
+        self.evaluator = simple_eval.Evaluator()
+
+    def eval(self, node: simple_ast.Node, environment: obj.Environment):
+        if type(node) == simple_ast.Program and not node.resolved: Resolver().resolve(node)
+        token = simple_builtins.caller.set(self)
+        try: return self.run(node, environment)
+        finally: simple_builtins.caller.reset(token)
+
+    # callbacks of map, filter and reduce, functions of other engines go back to them through the Evaluator
+    def apply_function(self, function: obj.Object, args: list[obj.Object]):
+        if type(function) != obj.Function or function.compiled is not None: return self.evaluator.apply_function(function, args)
+        return self.evaluator.unwrapped_return_value(self.run(function.body, self.evaluator.extended_function_environment(function, args)))
+
+    def is_error(self, value: obj.Object) -> bool: return self.evaluator.is_error(value)
+    def is_truthy(self, value: obj.Object) -> bool: return self.evaluator.is_truthy(value)
+
+    def run(self, node: simple_ast.Node, environment: obj.Environment):
+        evaluator = self.evaluator
+        is_error, Return, Error = evaluator.is_error, obj.Return, obj.Error
+        work = [(EVAL, node, environment)]
+        values = []
+        push, pop = work.append, work.pop
+
+        while len(work) > 0:
+            item = pop()
+            tag = item[0]
+            if tag == EVAL:
+                node, environment = item[1], item[2]
+                kind = type(node)
+                if kind == simple_ast.Identifier: values.append(evaluator.eval_identifiers(node, environment))
+                elif kind == simple_ast.IntegerLiteral: values.append(node.constant if node.constant is not None else evaluator.eval_integer_literal(node))
+                elif kind == simple_ast.InfixExpression:
+                    push((INFIX, node.operator))
+                    push((EVAL, node.right, environment))
+                    push((EVAL, node.left, environment))
+                elif kind == simple_ast.CallExpression:
+                    push((CALL_ARGUMENTS, node, environment))
+                    push((EVAL, node.function, environment))
+                elif kind == simple_ast.IfExpression:
+                    push((IF, node, environment))
+                    push((EVAL, node.condition, environment))
+                elif kind == simple_ast.ExpressionStatement: push((EVAL, node.expression, environment))
+                elif kind == simple_ast.BlockStatement or kind == simple_ast.Program: self.start_statements(node.statements, environment, kind == simple_ast.Program, push, values)
+                elif kind == simple_ast.Boolean: values.append(evaluator.native_bool_to_object(node.value))
+                elif kind == simple_ast.StringLiteral: values.append(obj.String(node.value))
+                elif kind == simple_ast.PrefixExpression:
+                    push((PREFIX, node.operator))
+                    push((EVAL, node.right, environment))
+                elif kind == simple_ast.ReturnStatement:
+                    push((RETURN,))
+                    push((EVAL, node.value, environment))
+                elif kind == simple_ast.LetStatement:
+                    push((LET, node, environment))
+                    push((EVAL, node.value, environment))
+                elif kind == simple_ast.FunctionLiteral: values.append(evaluator.eval_function_literal(node, environment))
+                elif kind == simple_ast.ArrayLiteral:
+                    push((ARRAY,))
+                    push((EXPRESSIONS, node.elements, 0, environment, []))
+                elif kind == simple_ast.IndexExpression:
+                    push((INDEX_LEFT, node.index, environment))
+                    push((EVAL, node.left, environment))
+                elif kind == simple_ast.HashLiteral: push((HASH_KEY, list(node.dict.items()), 0, environment, obj.Hash()))
+                else: values.append(None)
+            elif tag == INFIX:
+                right = values.pop()
+                values[-1] = evaluator.eval_infix_expression(item[1], values[-1], right)
+            elif tag == CALL_ARGUMENTS:
+                if is_error(values[-1]): continue
+                push((APPLY,))
+                push((EXPRESSIONS, item[1].arguments, 0, item[2], []))
+            elif tag == EXPRESSIONS:
+                nodes, index, environment, collected = item[1], item[2], item[3], item[4]
+                if index > 0:
+                    value = values.pop()
+                    if is_error(value):
+                        values.append([value])
+                        continue
+                    collected.append(value)
+                if index == len(nodes):
+                    values.append(collected)
+                    continue
+                push((EXPRESSIONS, nodes, index + 1, environment, collected))
+                push((EVAL, nodes[index], environment))
+            elif tag == APPLY:
+                args = values.pop()
+                function = values.pop()
+                if len(args) == 1 and is_error(args[0]): values.append(args[0])
+                elif type(function) == obj.Function and function.compiled is None:
+                    push((CALL_RESULT,))
+                    push((EVAL, function.body, evaluator.extended_function_environment(function, args)))
+                else: values.append(evaluator.apply_function(function, args))
+            elif tag == CALL_RESULT: values[-1] = evaluator.unwrapped_return_value(values[-1])
+            elif tag == STATEMENTS:
+                statements, index, environment, is_program = item[1], item[2], item[3], item[4]
+                result = values[-1]
+                if type(result) == Return:
+                    if is_program: values[-1] = result.value
+                    continue
+                if type(result) == Error or index == len(statements): continue
+                values.pop()
+                push((STATEMENTS, statements, index + 1, environment, is_program))
+                push((EVAL, statements[index], environment))
+            elif tag == IF:
+                condition, node, environment = values.pop(), item[1], item[2]
+                if is_error(condition): values.append(condition)
+                elif evaluator.is_truthy(condition): push((EVAL, node.consequence, environment))
+                elif node.alternative is not None: push((EVAL, node.alternative, environment))
+                else: values.append(NULL)
+            elif tag == PREFIX: values[-1] = evaluator.eval_prefix_expression(item[1], values[-1])
+            elif tag == RETURN: values[-1] = evaluator.eval_return_statement(values[-1])
+            elif tag == LET: values[-1] = evaluator.bind_let_statement(item[1], values[-1], item[2])
+            elif tag == ARRAY:
+                elements = values.pop()
+                values.append(elements[0] if len(elements) == 1 and is_error(elements[0]) else obj.Array(elements))
+            elif tag == INDEX_LEFT:
+                if is_error(values[-1]): continue
+                push((INDEX, values.pop()))
+                push((EVAL, item[1], item[2]))
+            elif tag == INDEX:
+                index = values.pop()
+                values.append(index if is_error(index) else evaluator.eval_index(item[1], index))
+            elif tag == HASH_KEY:
+                pairs, index, environment, hash_dict = item[1], item[2], item[3], item[4]
+                if index == len(pairs):
+                    values.append(hash_dict)
+                    continue
+                push((HASH_CHECK_KEY, pairs, index, environment, hash_dict))
+                push((EVAL, pairs[index][0], environment))
+            elif tag == HASH_CHECK_KEY:
+                pairs, index, environment, hash_dict = item[1], item[2], item[3], item[4]
+                key = values.pop()
+                if is_error(key): values.append(key)
+                elif not isinstance(key, obj.Hashable): values.append(evaluator.new_error(f'object type not supported for key, got={key.type()}'))
+                else:
+                    push((HASH_VALUE, pairs, index, environment, hash_dict, key))
+                    push((EVAL, pairs[index][1], environment))
+            elif tag == HASH_VALUE:
+                pairs, index, environment, hash_dict, key = item[1], item[2], item[3], item[4], item[5]
+                value = values.pop()
+                if is_error(value):
+                    values.append(value)
+                    continue
+                hash_dict.set(key, value)
+                push((HASH_KEY, pairs, index + 1, environment, hash_dict))
+        return values[-1]
+
+    def start_statements(self, statements: list[simple_ast.Statement], environment: obj.Environment, is_program: bool, push, values: list):
+        if len(statements) == 0:
+            values.append(None)
+            return
+        push((STATEMENTS, statements, 1, environment, is_program))
+        push((EVAL, statements[0], environment))
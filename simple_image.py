@@ -0,0 +1,94 @@
+import os, io, copy, pickle, hashlib, tempfile
+import simple_ast, object as obj
+import simple_eval
+import simple_builtins
+import simple_transpiler
+import simple_arena
+
+# bump whenever object.py or simple_ast.py change shape, images of another version are ignored
+FORMAT_VERSION = 3
+MAGIC = b"MONKEYIMG"
+HEADER_SIZE = len(MAGIC) + 2 + 32
+
+class ImageError(Exception): pass
+
+def source_hash(source: str) -> bytes: return hashlib.sha256(source.encode()).digest()
+
+# objects the evaluators compare by identity (NULL, TRUE, FALSE, builtins, the small integers, the boolean hash keys) are written
+# as references and resolved to this process' own singletons on load
+def singletons() -> dict[int, tuple]:
+    found = {id(simple_eval.NULL): ("null",), id(simple_eval.TRUE): ("boolean", True), id(simple_eval.FALSE): ("boolean", False)}
+    found.update((id(builtin), ("builtin", name)) for name, builtin in simple_builtins.functions.items())
+    found.update((id(integer), ("integer", integer.value)) for integer in obj.SMALL_INTEGERS)
+    found.update((id(key), ("key", key.value)) for key in obj.BOOLEAN_KEYS)
+    return found
+
+def singleton(reference: tuple):
+    kind = reference[0]
+    if kind == "null": return simple_eval.NULL
+    if kind == "boolean": return simple_eval.TRUE if reference[1] else simple_eval.FALSE
+    if kind == "builtin": return simple_builtins.functions[reference[1]]
+    if kind == "integer": return obj.new_integer(reference[1])
+    if kind == "key": return obj.BOOLEAN_KEYS[reference[1]]
+    raise ImageError(f'unknown reference in image: {reference}')
+
+# python code built by the closure compiler stays behind, those functions run on the Evaluator after loading. transpiled functions
+# keep their captures in python closure cells instead of an Environment, so they cannot be written at all.
+# ropes are flattened so long concatenation chains don't recurse in pickle
+class ImagePickler(pickle.Pickler):
+    def __init__(self, file):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.references = singletons()
+
+    def persistent_id(self, value):
+        return self.references.get(id(value))
+
+    def reducer_override(self, value):
+        kind = type(value)
+        if kind is obj.Function and value.compiled is not None and type(value.compiled) not in (obj.CompiledFunction, simple_arena.ArenaFunction):
+            if type(value.compiled) is simple_transpiler.TranspiledFunction: raise ImageError(f'functions built by the python engine cannot be written to an image')
+            stripped = copy.copy(value)
+            stripped.compiled = None
+        elif kind is simple_ast.FunctionLiteral and value.closure is not None:
+            stripped = copy.copy(value)
+            stripped.closure = None
+        elif kind is simple_ast.Program and value.transpiled is not None:
+            stripped = copy.copy(value)
+            stripped.transpiled = None
+        elif kind is obj.String and value.flat is None: stripped = obj.String(value.value)
+        else: return NotImplemented
+        return stripped.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+
+class ImageUnpickler(pickle.Unpickler):
+    def persistent_load(self, reference): return singleton(reference)
+
+def dumps(environment: obj.Environment, source: str) -> bytes:
+    buffer = io.BytesIO()
+    buffer.write(MAGIC + FORMAT_VERSION.to_bytes(2, "little") + source_hash(source))
+    try: ImagePickler(buffer).dump(environment)
+    except (pickle.PicklingError, TypeError, AttributeError) as error: raise ImageError(f'environment cannot be written to an image: {error}')
+    return buffer.getvalue()
+
+# None when the image was written by another format version or for another source
+def loads(image: bytes, source: str) -> obj.Environment:
+    if not image.startswith(MAGIC): raise ImageError(f'not a monkey image')
+    if int.from_bytes(image[len(MAGIC):len(MAGIC) + 2], "little") != FORMAT_VERSION: return None
+    if image[len(MAGIC) + 2:HEADER_SIZE] != source_hash(source): return None
+    return ImageUnpickler(io.BytesIO(memoryview(image)[HEADER_SIZE:])).load()
+
+# written next to the target and renamed over it, readers never see half an image
+def dump(environment: obj.Environment, path: str, source: str):
+    image = dumps(environment, source)
+    descriptor, temporary = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".image-")
+    try:
+        with os.fdopen(descriptor, "wb") as file: file.write(image)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+def load(path: str, source: str) -> obj.Environment:
+    try:
+        with open(path, "rb") as file: image = file.read()
+    except FileNotFoundError: return None
+    return loads(image, source)
@@ -0,0 +1,110 @@
+import weakref
+from array import array
+import simple_ast, object as obj
+import simple_eval
+try: import numpy
+except ImportError: numpy = None
+
+ARITHMETIC = ("+", "-", "*", "/")
+COMPARISON = ("<", ">", "==", "!=")
+# below this length building the numpy arrays costs more than the python loop
+NUMPY_MIN_LENGTH = 64
+
+# a function whose body is one arithmetic expression over its parameters and integer literals, turned into a python
+# lambda over raw numbers so map/filter/reduce can run it without boxing or apply_function
+class Kernel():
+    def __init__(self, expression: simple_ast.Expression, parameters: list[str]):
+        self.expression = expression
+        self.parameters = parameters
+        self.predicate = type(expression) == simple_ast.InfixExpression and expression.operator in COMPARISON
+        self.function = eval(f'lambda {", ".join(f"x{i}" for i in range(len(parameters)))}: {self.source(expression)}')
+
+    def source(self, node: simple_ast.Expression) -> str:
+        if type(node) == simple_ast.IntegerLiteral: return str(node.value)
+        if type(node) == simple_ast.Identifier: return f'x{self.parameters.index(node.value)}'
+        if type(node) == simple_ast.PrefixExpression: return f'(-{self.source(node.right)})'
+        return f'({self.source(node.left)} {node.operator} {self.source(node.right)})'
+
+    # largest magnitude the expression reaches for inputs up to bound, numpy int64 would wrap silently past INT64_MAX
+    def bound(self, node: simple_ast.Expression, bound: int) -> int:
+        if type(node) == simple_ast.IntegerLiteral: return abs(node.value)
+        if type(node) == simple_ast.Identifier: return bound
+        if type(node) == simple_ast.PrefixExpression: return self.bound(node.right, bound)
+        if node.operator == "*": return self.bound(node.left, bound) * self.bound(node.right, bound)
+        if node.operator in COMPARISON: return max(self.bound(node.left, bound), self.bound(node.right, bound))
+        return self.bound(node.left, bound) + self.bound(node.right, bound)
+
+    def vectorized(self, node: simple_ast.Expression, values):
+        if type(node) == simple_ast.IntegerLiteral: return node.value
+        if type(node) == simple_ast.Identifier: return values
+        if type(node) == simple_ast.PrefixExpression: return -self.vectorized(node.right, values)
+        left, right = self.vectorized(node.left, values), self.vectorized(node.right, values)
+        if node.operator == "+": return left + right
+        if node.operator == "-": return left - right
+        if node.operator == "*": return left * right
+        if node.operator == "<": return left < right
+        if node.operator == ">": return left > right
+        if node.operator == "==": return left == right
+        return left != right
+
+    def run_numpy(self, values: array):
+        if numpy is None or len(values) < NUMPY_MIN_LENGTH or self.has_operator(self.expression, "/"): return None
+        if self.bound(self.expression, max(abs(max(values)), abs(min(values)))) > obj.INT64_MAX: return None
+        return self.vectorized(self.expression, numpy.frombuffer(values, dtype=numpy.int64))
+
+    def has_operator(self, node: simple_ast.Expression, operator: str) -> bool:
+        if type(node) == simple_ast.PrefixExpression: return self.has_operator(node.right, operator)
+        if type(node) == simple_ast.InfixExpression: return node.operator == operator or self.has_operator(node.left, operator) or self.has_operator(node.right, operator)
+        return False
+
+KERNELS: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+def kernel(function: obj.Object, arity: int, comparisons: bool) -> Kernel:
+    if type(function) != obj.Function or len(function.parameters) != arity: return None
+    if function.body not in KERNELS:
+        parameters = [parameter.value for parameter in function.parameters]
+        statements = function.body.statements
+        expression = statements[0].expression if len(statements) == 1 and type(statements[0]) == simple_ast.ExpressionStatement else None
+        KERNELS[function.body] = Kernel(expression, parameters) if expression is not None and is_arithmetic(expression, parameters, True) else None
+    found = KERNELS[function.body]
+    if found is None or (found.predicate and not comparisons): return None
+    return found
+
+# comparisons are only allowed at the top, python would happily add the bool they produce to an int
+def is_arithmetic(node: simple_ast.Expression, parameters: list[str], top: bool) -> bool:
+    if type(node) == simple_ast.IntegerLiteral: return True
+    if type(node) == simple_ast.Identifier: return node.value in parameters
+    if type(node) == simple_ast.PrefixExpression: return node.operator == "-" and is_arithmetic(node.right, parameters, False)
+    if type(node) == simple_ast.InfixExpression:
+        if node.operator not in ARITHMETIC and not (top and node.operator in COMPARISON): return False
+        return is_arithmetic(node.left, parameters, False) and is_arithmetic(node.right, parameters, False)
+    return False
+
+def raw_values(array_object: obj.Array) -> array:
+    if type(array_object.backing) is not array: return None
+    return array_object.backing[array_object.start:array_object.end]
+
+def map_kernel(function: obj.Object, array_object: obj.Array) -> obj.Array:
+    found, values = kernel(function, 1, True), raw_values(array_object)
+    if found is None or values is None: return None
+    vectorized = found.run_numpy(values)
+    if vectorized is not None:
+        if found.predicate: return obj.Array([simple_eval.TRUE if value else simple_eval.FALSE for value in vectorized.tolist()])
+        return obj.Array(array('q', vectorized.astype(numpy.int64).tobytes()))
+    results = map(found.function, values)
+    if found.predicate: return obj.Array([simple_eval.TRUE if value else simple_eval.FALSE for value in results])
+    return obj.Array([obj.new_integer(value) for value in results])
+
+def filter_kernel(function: obj.Object, array_object: obj.Array) -> obj.Array:
+    found, values = kernel(function, 1, True), raw_values(array_object)
+    if found is None or values is None or not found.predicate: return None
+    mask = found.run_numpy(values)
+    if mask is not None: return obj.Array(array('q', numpy.frombuffer(values, dtype=numpy.int64)[mask].tobytes()))
+    return obj.Array(array('q', [value for value in values if found.function(value)]))
+
+def reduce_kernel(function: obj.Object, array_object: obj.Array, initial: obj.Object) -> obj.Object:
+    found, values = kernel(function, 2, False), raw_values(array_object)
+    if found is None or values is None or type(initial) is not obj.Integer: return None
+    accumulator, step = initial.value, found.function
+    for value in values: accumulator = step(accumulator, value)
+    return obj.new_integer(accumulator)
@@ -0,0 +1,88 @@
+from collections import OrderedDict
+import simple_ast, object as obj
+import simple_eval
+import simple_builtins
+from simple_purity import PurityAnalyzer, IMPURE_BUILTINS
+
+EVICTIONS = ("lru", "fifo")
+IMMUTABLE = (obj.Integer, obj.String, obj.Boolean, obj.Null)
+ARGUMENTS = (obj.Integer, obj.String, obj.Boolean)
+
+class MemoCache():
+    def __init__(self, captured: list[str], size: int = None, eviction: str = "lru"):
+        self.captured = captured
+        self.size = size
+        self.eviction = eviction
+        self.entries: OrderedDict = OrderedDict()
+        self.snapshot: list[obj.Object] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: tuple) -> obj.Object:
+        value = self.entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.eviction == "lru": self.entries.move_to_end(key)
+        return value
+
+    def put(self, key: tuple, value: obj.Object):
+        self.entries[key] = value
+        if self.size is not None and len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # results are only valid for the values the captured names held when they were computed
+    def validate(self, snapshot: list[obj.Object]):
+        if self.snapshot is not None and len(snapshot) == len(self.snapshot) and all(a is b for a, b in zip(snapshot, self.snapshot)): return
+        self.entries.clear()
+        self.snapshot = snapshot
+
+# calls to pure functions with INTEGER, STRING or BOOLEAN arguments are answered from a per function cache
+class MemoizingEvaluator(simple_eval.Evaluator):
+    def __init__(self, cache_size: int = 1024, eviction: str = "lru"):
+        if eviction not in EVICTIONS: raise ValueError(f'unknown eviction: {eviction}, expected one of {", ".join(EVICTIONS)}')
+        self.cache_size = cache_size
+        self.eviction = eviction
+
+    def eval_function_literal(self, node: simple_ast.FunctionLiteral, environment: obj.Environment):
+        if node.pure is None: PurityAnalyzer().analyze(node)
+        memo = MemoCache(node.captured, self.cache_size, self.eviction) if node.pure else None
+        return obj.Function(node.parameters, node.body, environment, names=node.names, memo=memo)
+
+    def apply_function(self, function: obj.Object, args: list[obj.Object]):
+        if type(function) != obj.Function or function.memo is None or not all(type(arg) in ARGUMENTS for arg in args): return super().apply_function(function, args)
+        snapshot = self.captured_values(function, set())
+        if snapshot is None: return super().apply_function(function, args)
+        memo = function.memo
+        memo.validate(snapshot)
+        key = tuple((type(arg.value), arg.value) for arg in args)
+        value = memo.get(key)
+        if value is not None: return value
+        value = super().apply_function(function, args)
+        if type(value) in IMMUTABLE: memo.put(key, value)
+        return value
+
+    # the values behind every captured name, None if one of them could change between calls
+    def captured_values(self, function: obj.Function, seen: set[int]) -> list[obj.Object]:
+        seen.add(id(function))
+        values = []
+        for name in function.memo.captured:
+            value = function.environment.get(name)
+            values.append(value)
+            if value is None or type(value) in IMMUTABLE: continue
+            if type(value) == obj.Builtin:
+                if any(value is simple_builtins.functions[impure] for impure in IMPURE_BUILTINS): return None
+                continue
+            if type(value) != obj.Function or value.memo is None: return None
+            if id(value) in seen: continue
+            captured = self.captured_values(value, seen)
+            if captured is None: return None
+            values.extend(captured)
+        return values
+
+    def memo_stats(self, function: obj.Function) -> dict[str, int]:
+        if function.memo is None: return None
+        return {"hits": function.memo.hits, "misses": function.memo.misses, "evictions": function.memo.evictions, "entries": len(function.memo.entries)}
@@ -0,0 +1,250 @@
+import simple_ast, object as obj
+import simple_eval
+
+# each pass rewrites the tree bottom-up, folding goes through the Evaluator's own operators so the optimized program behaves the same
+class Pass():
+    name = "pass"
+
+    def __init__(self):
+        self.evaluator = simple_eval.Evaluator()
+        self.rewrites = 0
+
+    def run(self, program: simple_ast.Program):
+        program.statements = self.visit_statements(program.statements, top_level=True)
+
+    def visit_statements(self, statements: list[simple_ast.Statement], top_level: bool = False) -> list[simple_ast.Statement]:
+        out = []
+        for i, statement in enumerate(statements):
+            out.extend(self.visit_statement(statement, i == len(statements) - 1, top_level))
+        return out
+
+    def visit_statement(self, node: simple_ast.Statement, last: bool, top_level: bool) -> list[simple_ast.Statement]:
+        if type(node) == simple_ast.ExpressionStatement: node.expression = self.visit_expression(node.expression)
+        elif type(node) in (simple_ast.LetStatement, simple_ast.ReturnStatement): node.value = self.visit_expression(node.value)
+        return [node]
+
+    def visit_block(self, block: simple_ast.BlockStatement):
+        if block is not None: block.statements = self.visit_statements(block.statements)
+
+    def visit_expression(self, node: simple_ast.Expression) -> simple_ast.Expression:
+        if type(node) == simple_ast.PrefixExpression: node.right = self.visit_expression(node.right)
+        elif type(node) == simple_ast.InfixExpression:
+            node.left = self.visit_expression(node.left)
+            node.right = self.visit_expression(node.right)
+        elif type(node) == simple_ast.IfExpression:
+            node.condition = self.visit_expression(node.condition)
+            self.visit_block(node.consequence)
+            self.visit_block(node.alternative)
+        elif type(node) == simple_ast.FunctionLiteral: self.visit_function_literal(node)
+        elif type(node) == simple_ast.CallExpression:
+            node.function = self.visit_expression(node.function)
+            node.arguments = [self.visit_expression(argument) for argument in node.arguments]
+        elif type(node) == simple_ast.ArrayLiteral: node.elements = [self.visit_expression(element) for element in node.elements]
+        elif type(node) == simple_ast.IndexExpression:
+            node.left = self.visit_expression(node.left)
+            node.index = self.visit_expression(node.index)
+        elif type(node) == simple_ast.HashLiteral: node.dict = {self.visit_expression(key): self.visit_expression(value) for key, value in node.dict.items()}
+        return self.rewrite(node)
+
+    def visit_function_literal(self, node: simple_ast.FunctionLiteral): self.visit_block(node.body)
+    def rewrite(self, node: simple_ast.Expression) -> simple_ast.Expression: return node
+
+def literal_object(node: simple_ast.Expression) -> obj.Object:
+    if type(node) == simple_ast.IntegerLiteral: return obj.Integer(node.value)
+    if type(node) == simple_ast.StringLiteral: return obj.String(node.value)
+    if type(node) == simple_ast.Boolean: return simple_eval.TRUE if node.value else simple_eval.FALSE
+    return None
+
+# the literal takes the place of the expression at offset
+def object_literal(value: obj.Object, offset: int) -> simple_ast.Expression:
+    if type(value) == obj.Integer and type(value.value) == int: return simple_ast.IntegerLiteral(offset, value.value)
+    if type(value) == obj.String: return simple_ast.StringLiteral(offset, value.value)
+    if type(value) == obj.Boolean: return simple_ast.Boolean(offset, value.value)
+    return None
+
+class ConstantFolding(Pass):
+    name = "constant folding"
+
+    # results that are errors (or floats from '/') stay in the tree so they surface at runtime as before
+    def rewrite(self, node: simple_ast.Expression) -> simple_ast.Expression:
+        if type(node) == simple_ast.PrefixExpression and literal_object(node.right) is not None:
+            folded = object_literal(self.evaluator.eval_prefix_expression(node.operator, literal_object(node.right)), node.offset)
+        elif type(node) == simple_ast.InfixExpression and literal_object(node.left) is not None and literal_object(node.right) is not None:
+            folded = object_literal(self.evaluator.eval_infix_expression(node.operator, literal_object(node.left), literal_object(node.right)), node.offset)
+        else: return node
+        if folded is None: return node
+        self.rewrites += 1
+        return folded
+
+class AlgebraicSimplification(Pass):
+    name = "algebraic simplification"
+
+    def __init__(self):
+        super().__init__()
+        self.integers: set[str] = set()
+
+    # operands that are an INTEGER or an error may drop a neutral operand, anything else would turn an error into a value.
+    # numbers may hold the float of a '/', which only survives '* 1' and '- 0' unchanged
+    def is_number(self, node: simple_ast.Expression) -> bool:
+        if type(node) == simple_ast.PrefixExpression: return node.operator == "-"
+        if type(node) == simple_ast.InfixExpression: return node.operator in ("-", "*", "/") or (node.operator == "+" and self.is_number(node.left) and self.is_number(node.right))
+        return self.is_integer(node)
+
+    def is_integer(self, node: simple_ast.Expression) -> bool:
+        if type(node) == simple_ast.IntegerLiteral: return True
+        if type(node) == simple_ast.Identifier: return node.value in self.integers
+        if type(node) == simple_ast.PrefixExpression: return node.operator == "-" and self.is_integer(node.right)
+        if type(node) == simple_ast.InfixExpression: return node.operator in ("+", "-", "*") and self.is_integer(node.left) and self.is_integer(node.right)
+        return False
+
+    def is_pure_integer(self, node: simple_ast.Expression) -> bool:
+        return type(node) == simple_ast.IntegerLiteral or (type(node) == simple_ast.Identifier and node.value in self.integers)
+
+    def is_literal(self, node: simple_ast.Expression, value: int) -> bool: return type(node) == simple_ast.IntegerLiteral and node.value == value
+
+    def visit_statement(self, node: simple_ast.Statement, last: bool, top_level: bool) -> list[simple_ast.Statement]:
+        statements = super().visit_statement(node, last, top_level)
+        if type(node) == simple_ast.LetStatement:
+            # a let whose value errors ends the program, so after it the name holds an INTEGER
+            if self.is_integer(node.value): self.integers.add(node.name.value)
+            else: self.integers.discard(node.name.value)
+        return statements
+
+    # lets in a branch may or may not have run afterwards, and a function body sees whatever its names are bound to when called
+    def visit_block(self, block: simple_ast.BlockStatement):
+        if block is None: return
+        integers = set(self.integers)
+        super().visit_block(block)
+        self.integers = integers - let_names(block.statements)
+
+    def visit_function_literal(self, node: simple_ast.FunctionLiteral):
+        integers, self.integers = self.integers, set()
+        super().visit_function_literal(node)
+        self.integers = integers
+
+    def rewrite(self, node: simple_ast.Expression) -> simple_ast.Expression:
+        if type(node) != simple_ast.InfixExpression: return node
+        left, right, operator = node.left, node.right, node.operator
+        simplified = None
+        if operator == "*" and self.is_literal(right, 1) and self.is_number(left): simplified = left
+        elif operator == "*" and self.is_literal(left, 1) and self.is_number(right): simplified = right
+        elif operator == "-" and self.is_literal(right, 0) and self.is_number(left): simplified = left
+        elif operator == "+" and self.is_literal(right, 0) and self.is_integer(left): simplified = left
+        elif operator == "+" and self.is_literal(left, 0) and self.is_integer(right): simplified = right
+        elif operator == "*" and (self.is_literal(right, 0) and self.is_pure_integer(left) or self.is_literal(left, 0) and self.is_pure_integer(right)): simplified = object_literal(obj.Integer(0), node.offset)
+        elif operator == "-" and type(left) == simple_ast.Identifier and type(right) == simple_ast.Identifier and left.value == right.value and self.is_pure_integer(left): simplified = object_literal(obj.Integer(0), node.offset)
+        if simplified is None: return node
+        self.rewrites += 1
+        return simplified
+
+class DeadBranchElimination(Pass):
+    name = "dead branch elimination"
+
+    def taken_branch(self, node: simple_ast.IfExpression) -> simple_ast.BlockStatement:
+        condition = literal_object(node.condition)
+        if condition is None: return None
+        if self.evaluator.is_truthy(condition): return node.consequence
+        return node.alternative if node.alternative is not None else False
+
+    # a statement level if is replaced by the statements of the branch that runs, they share the environment anyway
+    def visit_statement(self, node: simple_ast.Statement, last: bool, top_level: bool) -> list[simple_ast.Statement]:
+        statements = super().visit_statement(node, last, top_level)
+        if type(node) != simple_ast.ExpressionStatement or type(node.expression) != simple_ast.IfExpression: return statements
+        branch = self.taken_branch(node.expression)
+        if branch is None: return statements
+        if branch is False:
+            if last: return statements
+            self.rewrites += 1
+            return []
+        if len(branch.statements) == 0: return statements
+        self.rewrites += 1
+        return branch.statements
+
+    def rewrite(self, node: simple_ast.Expression) -> simple_ast.Expression:
+        if type(node) != simple_ast.IfExpression: return node
+        branch = self.taken_branch(node)
+        if branch is None or branch is False or len(branch.statements) != 1 or type(branch.statements[0]) != simple_ast.ExpressionStatement: return node
+        self.rewrites += 1
+        return branch.statements[0].expression
+
+class DeadLetElimination(Pass):
+    name = "unused let elimination"
+
+    def run(self, program: simple_ast.Program):
+        self.reads = read_names(program)
+        super().run(program)
+
+    def is_pure(self, node: simple_ast.Expression) -> bool:
+        if type(node) in (simple_ast.IntegerLiteral, simple_ast.StringLiteral, simple_ast.Boolean, simple_ast.FunctionLiteral): return True
+        if type(node) == simple_ast.ArrayLiteral: return all(self.is_pure(element) for element in node.elements)
+        return False
+
+    # top level bindings stay, the environment outlives the program; the last statement stays because it is the block's value
+    def visit_statement(self, node: simple_ast.Statement, last: bool, top_level: bool) -> list[simple_ast.Statement]:
+        statements = super().visit_statement(node, last, top_level)
+        if type(node) != simple_ast.LetStatement or top_level or last: return statements
+        if node.name.value in self.reads or not self.is_pure(node.value): return statements
+        self.rewrites += 1
+        return []
+
+def let_names(statements: list[simple_ast.Statement]) -> set[str]:
+    names = set()
+    for statement in statements:
+        if type(statement) == simple_ast.LetStatement: names.add(statement.name.value)
+        expression = statement.expression if type(statement) == simple_ast.ExpressionStatement else statement.value
+        for node in walk(expression, into_functions=False):
+            if type(node) == simple_ast.IfExpression:
+                names |= let_names(node.consequence.statements)
+                if node.alternative is not None: names |= let_names(node.alternative.statements)
+    return names
+
+def read_names(program: simple_ast.Program) -> set[str]:
+    return {node.value for statement in program.statements for node in walk(statement) if type(node) == simple_ast.Identifier}
+
+def walk(node: simple_ast.Node, into_functions: bool = True):
+    if node is None: return
+    yield node
+    for child in children(node, into_functions): yield from walk(child, into_functions)
+
+def children(node: simple_ast.Node, into_functions: bool = True) -> list[simple_ast.Node]:
+    if type(node) in (simple_ast.Program, simple_ast.BlockStatement): return node.statements
+    if type(node) == simple_ast.ExpressionStatement: return [node.expression]
+    if type(node) == simple_ast.LetStatement: return [node.value]
+    if type(node) == simple_ast.ReturnStatement: return [node.value]
+    if type(node) == simple_ast.PrefixExpression: return [node.right]
+    if type(node) == simple_ast.InfixExpression: return [node.left, node.right]
+    if type(node) == simple_ast.IfExpression: return [node.condition, node.consequence, node.alternative]
+    if type(node) == simple_ast.FunctionLiteral: return [node.body] if into_functions else []
+    if type(node) == simple_ast.CallExpression: return [node.function, *node.arguments]
+    if type(node) == simple_ast.ArrayLiteral: return node.elements
+    if type(node) == simple_ast.IndexExpression: return [node.left, node.index]
+    if type(node) == simple_ast.HashLiteral: return [item for pair in node.dict.items() for item in pair]
+    return []
+
+def count_nodes(program: simple_ast.Program) -> int: return sum(1 for _ in walk(program)) - 1
+
+class PassStats():
+    def __init__(self, name: str, rewrites: int, nodes_before: int, nodes_after: int):
+        self.name = name
+        self.rewrites = rewrites
+        self.nodes_before = nodes_before
+        self.nodes_after = nodes_after
+
+    def eliminated(self) -> int: return self.nodes_before - self.nodes_after
+
+class Optimizer():
+    def __init__(self, passes: list[type[Pass]] = None):
+        self.passes = passes if passes is not None else [ConstantFolding, AlgebraicSimplification, ConstantFolding, DeadBranchElimination, DeadLetElimination]
+        self.stats: list[PassStats] = []
+
+    def optimize(self, program: simple_ast.Program) -> simple_ast.Program:
+        for pass_type in self.passes:
+            optimization = pass_type()
+            before = count_nodes(program)
+            optimization.run(program)
+            self.stats.append(PassStats(optimization.name, optimization.rewrites, before, count_nodes(program)))
+        return program
+
+    def report(self) -> str:
+        lines = [f'{stats.name}: {stats.rewrites} rewrite(s), {stats.eliminated()} node(s) eliminated ({stats.nodes_before} -> {stats.nodes_after})' for stats in self.stats]
+        return '\n'.join(lines)
@@ -0,0 +1,122 @@
+import os, copy, pickle, io, functools
+from concurrent.futures import ProcessPoolExecutor
+import simple_ast, object as obj
+import simple_eval
+import simple_arena
+import simple_builtins
+from simple_resolver import Resolver
+from simple_purity import PurityAnalyzer, IMPURE_BUILTINS
+
+WORKERS = os.cpu_count() or 1
+CHUNK_SIZE = 1024
+executor: ProcessPoolExecutor = None
+
+def configure(workers: int = None, chunk_size: int = None):
+    global WORKERS, CHUNK_SIZE, executor
+    if workers is not None and workers != WORKERS:
+        if executor is not None: executor.shutdown()
+        WORKERS, executor = workers, None
+    if chunk_size is not None: CHUNK_SIZE = chunk_size
+
+class ShippingError(Exception): pass
+
+# a function as it travels to a worker, the worker resolves it again as a top level literal over a flat environment of its captures
+class FunctionSpec():
+    def __init__(self, parameters: list[simple_ast.Identifier], body: simple_ast.BlockStatement):
+        self.parameters = parameters
+        self.body = body
+
+    def literal(self) -> simple_ast.FunctionLiteral:
+        literal = simple_ast.FunctionLiteral(None)
+        literal.parameters, literal.body = self.parameters, self.body
+        return literal
+
+# the closure compiler caches python callables on function literals, those stay behind
+class ShippingPickler(pickle.Pickler):
+    def reducer_override(self, value):
+        if type(value) != simple_ast.FunctionLiteral or value.closure is None: return NotImplemented
+        stripped = copy.copy(value)
+        stripped.closure = None
+        return stripped.__reduce_ex__(pickle.HIGHEST_PROTOCOL)
+
+def ship(function: obj.Object) -> bytes:
+    if type(function) == obj.Builtin: spec, bindings = check_builtin("the function", function), {}
+    else:
+        bindings = {}
+        spec = collect(function, bindings, {})
+    buffer = io.BytesIO()
+    try: ShippingPickler(buffer, pickle.HIGHEST_PROTOCOL).dump((spec, bindings))
+    except (pickle.PicklingError, TypeError, AttributeError) as error: raise ShippingError(f'function passed to \'pmap\' cannot be pickled: {error}')
+    return buffer.getvalue()
+
+# captures of captured functions end up in the same flat environment, a name bound to two different values cannot be shipped
+def collect(function: obj.Function, bindings: dict, origins: dict) -> FunctionSpec:
+    spec = FunctionSpec(function.parameters, function.body)
+    # functions of the arena engine point into an arena, they travel as simple_ast nodes
+    if type(function.body) is simple_arena.Cursor: spec = FunctionSpec([parameter.node() for parameter in function.parameters], function.body.node())
+    literal = spec.literal()
+    PurityAnalyzer().analyze(literal)
+    if not literal.pure: raise ShippingError(f'function passed to \'pmap\' must be pure, it calls {", ".join(sorted(IMPURE_BUILTINS))}')
+    for name in literal.captured:
+        value = function.environment.get(name)
+        if value is None and name in simple_builtins.functions: continue
+        # the vm and the python engine keep captures in their own frames and cells, not in the environment
+        if value is None: raise ShippingError(f'function passed to \'pmap\' captures {name}, which is not in its environment and cannot be sent to a worker')
+        if name in origins:
+            if origins[name] is not value: raise ShippingError(f'function passed to \'pmap\' captures {name} from two different scopes')
+            continue
+        origins[name] = value
+        if type(value) == obj.Function: bindings[name] = collect(value, bindings, origins)
+        elif type(value) == obj.Builtin: bindings[name] = check_builtin(name, value)
+        elif is_data(value): bindings[name] = value
+        else: raise ShippingError(f'function passed to \'pmap\' captures {name} of type {value.type()}, which cannot be sent to a worker')
+    return spec
+
+def check_builtin(name: str, builtin: obj.Builtin) -> obj.Builtin:
+    if any(builtin is simple_builtins.functions[impure] for impure in IMPURE_BUILTINS): raise ShippingError(f'function passed to \'pmap\' must be pure, {name} is {", ".join(sorted(IMPURE_BUILTINS))}')
+    return builtin
+
+def is_data(value: obj.Object) -> bool:
+    if type(value) in (obj.Integer, obj.String, obj.Boolean, obj.Null): return True
+    if type(value) == obj.Array: return type(value.backing) is not list or all(is_data(element) for element in value.elements)
+    if type(value) == obj.Hash: return all(is_data(element) for element in value.dict.values())
+    return False
+
+@functools.lru_cache(maxsize=16)
+def load(payload: bytes) -> obj.Object:
+    spec, bindings = pickle.loads(payload)
+    if type(spec) == obj.Builtin: return spec
+    environment, evaluator = obj.Environment(), simple_eval.Evaluator()
+    for name, value in bindings.items(): environment.set(name, rebuild(value, environment, evaluator) if type(value) == FunctionSpec else value)
+    return rebuild(spec, environment, evaluator)
+
+def rebuild(spec: FunctionSpec, environment: obj.Environment, evaluator: simple_eval.Evaluator) -> obj.Function:
+    literal = spec.literal()
+    Resolver().resolve_function_literal(literal)
+    return evaluator.eval_function_literal(literal, environment)
+
+def evaluate_chunk(payload: bytes, chunk: obj.Array):
+    function, evaluator, results = load(payload), simple_eval.Evaluator(), []
+    for i in range(chunk.length()):
+        value = evaluator.apply_function(function, [chunk.get(i)])
+        if evaluator.is_error(value): return value
+        results.append(value)
+    return results
+
+def chunks(array_object: obj.Array, size: int) -> list[obj.Array]:
+    return [obj.Array(array_object.backing[start:min(start + size, array_object.end)]) for start in range(array_object.start, array_object.end, size)]
+
+def pmap(function: obj.Object, array_object: obj.Array) -> obj.Object:
+    global executor
+    try: payload = ship(function)
+    except ShippingError as error: return obj.Error(str(error))
+    parts = chunks(array_object, CHUNK_SIZE)
+    if len(parts) <= 1 or WORKERS <= 1: results = [evaluate_chunk(payload, part) for part in parts]
+    else:
+        if executor is None: executor = ProcessPoolExecutor(max_workers=WORKERS)
+        results = executor.map(evaluate_chunk, [payload] * len(parts), parts)
+    elements = []
+    for result in results:
+        if type(result) is not list: return result
+        elements.extend(result)
+    return obj.Array(elements)
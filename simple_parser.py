@@ -3,6 +3,8 @@ from simple_ast import Program
 import simple_token
 from simple_token import Lexer, Token
 
+# bump whenever the parser, the resolver or simple_ast change the trees they produce, cached trees of another version are ignored
+PARSER_VERSION = 2
 PRECEDENCE = {"_": 0, "LOWEST": 1, "EQUALS": 2, "LESSGREATER": 3, "SUM": 4, "PRODUCT": 5, "PREFIX": 6, "CALL": 7, "INDEX": 8}
 OP_PRECEDENCES = {"EQ": "EQUALS", "NEQ": "EQUALS", "LT": "LESSGREATER", "GT": "LESSGREATER", "MINUS": "SUM", "PLUS": "SUM", "SLASH": "PRODUCT", "ASTERISK": "PRODUCT", "LPAREN": "CALL", "LBRACKET": "INDEX"}
 
@@ -11,6 +13,8 @@ class Parser():
         self.lexer = lexer 
         self.current_token: Token = None
         self.peek_token: Token = None
+        self.current_offset: int = None
+        self.peek_offset: int = None
         self.errors = []
         self.prefix_parse_fn = {}
         self.infix_parse_fn = {}
@@ -42,9 +46,11 @@ class Parser():
         self.next_token()
         self.next_token()    
 
+    # nodes are built with the offset of the token they start from, lexers share token objects so offsets come from the lexer
     def next_token(self):
-        self.current_token = self.peek_token
+        self.current_token, self.current_offset = self.peek_token, self.peek_offset
         self.peek_token = self.lexer.next_token()
+        self.peek_offset = self.lexer.token_offset
 
     def register_prefix(self, token: Token, fn: callable):
         self.prefix_parse_fn[token] = fn
@@ -71,10 +77,10 @@ class Parser():
             return self.parse_expression_statement()
     
     def parse_let_statement(self):
-        statement = simple_ast.LetStatement(self.current_token, None, None)
+        statement = simple_ast.LetStatement(self.current_offset, None, None)
 
         if not self.expect_peek("IDENT"): return None
-        statement.name = simple_ast.Identifier(self.current_token, self.current_token.literal)
+        statement.name = simple_ast.Identifier(self.current_offset, self.current_token.literal)
         if not self.expect_peek("ASSIGN"): return None
         self.next_token()
         statement.value = self.parse_expression(PRECEDENCE["LOWEST"])
@@ -82,14 +88,14 @@ class Parser():
         return statement
 
     def parse_return_statement(self):
-        statement = simple_ast.ReturnStatement(self.current_token)
+        statement = simple_ast.ReturnStatement(self.current_offset)
         self.next_token()
         statement.value = self.parse_expression(PRECEDENCE["LOWEST"])
         if self.peek_token.type == "SEMICOLON": self.next_token()
         return statement
     
     def parse_expression_statement(self):
-        statement = simple_ast.ExpressionStatement(self.current_token)
+        statement = simple_ast.ExpressionStatement(self.current_offset)
         statement.expression = self.parse_expression(PRECEDENCE.get("LOWEST"))
 
         if self.peek_token.type == "SEMICOLON":
@@ -97,12 +103,12 @@ class Parser():
         return statement
     
     #TODO: errorhandling for type conversion into int
-    def parse_integer_literal(self): return simple_ast.IntegerLiteral(self.current_token, int(self.current_token.literal))
-    def parse_identifier(self): return simple_ast.Identifier(self.current_token, self.current_token.literal)
-    def parse_string_literal(self): return simple_ast.StringLiteral(self.current_token, self.current_token.literal)
+    def parse_integer_literal(self): return simple_ast.IntegerLiteral(self.current_offset, int(self.current_token.literal))
+    def parse_identifier(self): return simple_ast.Identifier(self.current_offset, self.current_token.literal)
+    def parse_string_literal(self): return simple_ast.StringLiteral(self.current_offset, self.current_token.literal)
 
     def parse_hash_literal(self):
-        hash_literal = simple_ast.HashLiteral(self.current_token)
+        hash_literal = simple_ast.HashLiteral(self.current_offset)
         hash_literal.dict = {}
 
         while not self.peek_token.type == "RBRACE":
@@ -117,7 +123,7 @@ class Parser():
         return hash_literal
 
     def parse_array_literal(self):
-        array = simple_ast.ArrayLiteral(self.current_token)
+        array = simple_ast.ArrayLiteral(self.current_offset)
         array.elements = self.parse_expression_list("RBRACKET")
         return array
     
@@ -137,7 +143,7 @@ class Parser():
         return expressions
 
     def parse_index_expression(self, left: simple_ast.Expression):
-        index_expression = simple_ast.IndexExpression(self.current_token, left)
+        index_expression = simple_ast.IndexExpression(self.current_offset, left)
         self.next_token()
         index_expression.index = self.parse_expression(PRECEDENCE["LOWEST"])
         if not self.expect_peek("RBRACKET"): return None
@@ -160,19 +166,19 @@ class Parser():
         return left_expression
     
     def parse_prefix_expression(self):
-        expression = simple_ast.PrefixExpression(self.current_token, self.current_token.literal)
+        expression = simple_ast.PrefixExpression(self.current_offset, self.current_token.literal)
         self.next_token()
         expression.right = self.parse_expression(PRECEDENCE["PREFIX"])
         return expression
     
     def parse_infix_expression(self, left: simple_ast.Expression):
-        expression = simple_ast.InfixExpression(self.current_token, left, self.current_token.literal)
+        expression = simple_ast.InfixExpression(self.current_offset, left, self.current_token.literal)
         precedence = self.current_precedence()
         self.next_token()
         expression.right = self.parse_expression(precedence)
         return expression
     
-    def parse_boolean(self): return simple_ast.Boolean(self.current_token, self.current_token.type == simple_token.TRUE)
+    def parse_boolean(self): return simple_ast.Boolean(self.current_offset, self.current_token.type == simple_token.TRUE)
 
     def parse_grouped_expression(self):
         self.next_token()
@@ -181,7 +187,7 @@ class Parser():
         return expression
     
     def parse_if_expression(self):
-        expression = simple_ast.IfExpression(self.current_token) 
+        expression = simple_ast.IfExpression(self.current_offset) 
         if not self.expect_peek("LPAREN"): return None
         self.next_token()
         expression.condition = self.parse_expression(PRECEDENCE["LOWEST"])
@@ -197,7 +203,7 @@ class Parser():
         return expression
 
     def parse_block_statement(self):
-        block_statements = simple_ast.BlockStatement(self.current_token)
+        block_statements = simple_ast.BlockStatement(self.current_offset)
         self.next_token()
 
         while self.current_token.type != "RBRACE" and self.current_token.type != "EOF":
@@ -207,7 +213,7 @@ class Parser():
         return block_statements
     
     def parse_function_literal(self):
-        function_literal = simple_ast.FunctionLiteral(self.current_token)
+        function_literal = simple_ast.FunctionLiteral(self.current_offset)
         if not self.expect_peek("LPAREN"): return None
         function_literal.parameters = self.parse_function_parameters()
         if not self.expect_peek("LBRACE"): return None
@@ -231,7 +237,7 @@ class Parser():
         return identifiers
     
     def parse_call_expression(self, function):
-        expression = simple_ast.CallExpression(self.current_token, function)
+        expression = simple_ast.CallExpression(self.current_offset, function)
         expression.arguments = self.parse_expression_list("RPAREN")
         return expression
     
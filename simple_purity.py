@@ -0,0 +1,37 @@
+import simple_ast
+from simple_optimizer import children
+
+IMPURE_BUILTINS = {"puts"}
+
+# a function is pure when its body (and every function literal in it) never names a builtin with side effects,
+# the values its captured names hold are checked when it is called.
+# a let binds its name for the statements after it in its block, and for functions in its own value since those run later.
+# any other read of the name may still reach an enclosing binding, the tree walker falls back to one while the slot is empty
+class PurityAnalyzer():
+    def analyze(self, node: simple_ast.FunctionLiteral) -> set[str]:
+        self.pure, captured = True, set()
+        if node.body is not None: self.visit_block(node.body.statements, {parameter.value for parameter in node.parameters}, captured)
+        node.pure, node.captured = self.pure, sorted(captured)
+        return captured
+
+    def visit_block(self, statements: list[simple_ast.Statement], bound: set[str], captured: set[str]):
+        bound = set(bound)
+        for statement in statements:
+            if type(statement) == simple_ast.LetStatement:
+                self.visit(statement.value, bound, bound | {statement.name.value}, captured)
+                bound.add(statement.name.value)
+            else: self.visit(statement, bound, bound, captured)
+
+    def visit(self, node: simple_ast.Node, bound: set[str], deferred: set[str], captured: set[str]):
+        if node is None: return
+        kind = type(node)
+        if kind == simple_ast.Identifier:
+            if node.value in IMPURE_BUILTINS: self.pure = False
+            if node.value not in bound: captured.add(node.value)
+        elif kind == simple_ast.FunctionLiteral:
+            pure = self.pure
+            captured |= PurityAnalyzer().analyze(node) - deferred
+            self.pure = pure and node.pure
+        elif kind == simple_ast.BlockStatement: self.visit_block(node.statements, bound, captured)
+        else:
+            for child in children(node, into_functions=False): self.visit(child, bound, deferred, captured)
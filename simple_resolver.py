@@ -0,0 +1,113 @@
+import simple_ast
+import simple_builtins
+
+class FunctionScope():
+    def __init__(self, outer: "FunctionScope", names: dict[str, int]):
+        self.outer = outer
+        self.names = names
+
+# annotates identifiers with (depth, slot) coordinates so the Evaluator can index SlotEnvironments instead of hashing names.
+# every let of a function gets a slot up front, reads that run before their let find an empty slot and fall back to the outer binding at runtime
+class Resolver():
+    def __init__(self):
+        self.scope: FunctionScope = None
+
+    def resolve(self, node: simple_ast.Node):
+        if node is None: return
+        if type(node) == simple_ast.Program:
+            for statement in node.statements: self.resolve(statement)
+            node.resolved = True
+        elif type(node) == simple_ast.BlockStatement:
+            for statement in node.statements: self.resolve(statement)
+        elif type(node) == simple_ast.ExpressionStatement: self.resolve(node.expression)
+        elif type(node) == simple_ast.ReturnStatement: self.resolve(node.value)
+        elif type(node) == simple_ast.LetStatement:
+            self.resolve(node.value)
+            if self.scope is not None: node.slot = self.scope.names[node.name.value]
+        elif type(node) == simple_ast.Identifier: self.resolve_identifier(node)
+        elif type(node) == simple_ast.PrefixExpression: self.resolve(node.right)
+        elif type(node) == simple_ast.InfixExpression:
+            self.resolve(node.left)
+            self.resolve(node.right)
+        elif type(node) == simple_ast.IfExpression:
+            self.resolve(node.condition)
+            self.resolve(node.consequence)
+            self.resolve(node.alternative)
+        elif type(node) == simple_ast.FunctionLiteral: self.resolve_function_literal(node)
+        elif type(node) == simple_ast.CallExpression:
+            self.resolve(node.function)
+            for argument in node.arguments: self.resolve(argument)
+        elif type(node) == simple_ast.ArrayLiteral:
+            for element in node.elements: self.resolve(element)
+        elif type(node) == simple_ast.IndexExpression:
+            self.resolve(node.left)
+            self.resolve(node.index)
+        elif type(node) == simple_ast.HashLiteral:
+            for key, value in node.dict.items():
+                self.resolve(key)
+                self.resolve(value)
+
+    def resolve_identifier(self, node: simple_ast.Identifier):
+        scope, depth = self.scope, 0
+        while scope is not None:
+            if node.value in scope.names:
+                node.depth, node.slot = depth, scope.names[node.value]
+                return
+            scope, depth = scope.outer, depth + 1
+        node.depth, node.slot = depth, None
+        node.builtin = simple_builtins.functions.get(node.value)
+
+    def resolve_function_literal(self, node: simple_ast.FunctionLiteral):
+        names = {}
+        for parameter in node.parameters: names.setdefault(parameter.value, len(names))
+        for name in self.let_names(node.body.statements): names.setdefault(name, len(names))
+        node.names = names
+        self.scope = FunctionScope(self.scope, names)
+        self.resolve(node.body)
+        self.scope = self.scope.outer
+        self.mark_tail_calls(node.body, True)
+
+    # calls whose value becomes the function result, the Evaluator runs them in the caller's apply_function loop
+    def mark_tail_calls(self, block: simple_ast.BlockStatement, tail: bool):
+        for i, statement in enumerate(block.statements):
+            if type(statement) == simple_ast.ReturnStatement: self.mark_tail_expression(statement.value)
+            elif type(statement) != simple_ast.ExpressionStatement: continue
+            elif tail and i == len(block.statements) - 1: self.mark_tail_expression(statement.expression)
+            elif type(statement.expression) == simple_ast.IfExpression: self.mark_if_branches(statement.expression, False)
+
+    def mark_tail_expression(self, node: simple_ast.Expression):
+        if type(node) == simple_ast.CallExpression: node.tail = True
+        if type(node) == simple_ast.IfExpression: self.mark_if_branches(node, True)
+
+    def mark_if_branches(self, node: simple_ast.IfExpression, tail: bool):
+        self.mark_tail_calls(node.consequence, tail)
+        if node.alternative is not None: self.mark_tail_calls(node.alternative, tail)
+
+    # lets of nested ifs bind in the function environment as well, nested functions get their own scope
+    def let_names(self, statements: list[simple_ast.Statement]) -> list[str]:
+        names = []
+        for statement in statements:
+            if type(statement) == simple_ast.LetStatement: names.append(statement.name.value)
+            for expression in self.statement_expressions(statement): names.extend(self.if_let_names(expression))
+        return names
+
+    def statement_expressions(self, statement: simple_ast.Statement) -> list[simple_ast.Expression]:
+        if type(statement) == simple_ast.ExpressionStatement: return [statement.expression]
+        return [statement.value]
+
+    def if_let_names(self, node: simple_ast.Expression) -> list[str]:
+        names = []
+        if type(node) == simple_ast.IfExpression:
+            names.extend(self.if_let_names(node.condition))
+            names.extend(self.let_names(node.consequence.statements))
+            if node.alternative is not None: names.extend(self.let_names(node.alternative.statements))
+        elif type(node) == simple_ast.PrefixExpression: names.extend(self.if_let_names(node.right))
+        elif type(node) == simple_ast.InfixExpression: names.extend(self.if_let_names(node.left) + self.if_let_names(node.right))
+        elif type(node) == simple_ast.CallExpression:
+            for expression in [node.function, *node.arguments]: names.extend(self.if_let_names(expression))
+        elif type(node) == simple_ast.ArrayLiteral:
+            for expression in node.elements: names.extend(self.if_let_names(expression))
+        elif type(node) == simple_ast.IndexExpression: names.extend(self.if_let_names(node.left) + self.if_let_names(node.index))
+        elif type(node) == simple_ast.HashLiteral:
+            for key, value in node.dict.items(): names.extend(self.if_let_names(key) + self.if_let_names(value))
+        return names
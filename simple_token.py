@@ -1,6 +1,7 @@
+import os, re, sys, codecs
 ILLEGAL = "ILLEGAL"
 EOF = "EOF"
-# identifiers
+# identifiers, interned so every name in a program and every dict keyed by one shares the same string
 IDENT = "IDENT"
 INT = "INT"
 STRING = "STRING"
@@ -47,6 +48,7 @@ class Lexer:
         self.position = 0
         self.read_position = 0
         self.char = 0
+        self.token_offset = 0 # where the last token returned starts
 
         self.read_char()
 
@@ -60,6 +62,7 @@ class Lexer:
 
     def next_token(self):
         self.skip_whitespaces()
+        self.token_offset = self.position
 
         if self.char == "=":
             if self.peek_char() == "=":
@@ -89,7 +92,9 @@ class Lexer:
         elif self.char == "/": token = Token("SLASH", "/")
         elif self.char == "<": token = Token("LT", "<")
         elif self.char == ">": token = Token("GT", ">")
-        elif self.char == "": token = Token("EOF", "")
+        elif self.char == "":
+            self.token_offset = len(self.input) # an unterminated string reads one past the end
+            token = Token("EOF", "")
         else:
             if self.char.isalpha():
                 literal = self.read_literal()
@@ -112,7 +117,7 @@ class Lexer:
         literal_start = self.position
         while self.char.isalpha() or self.char == "_":
             self.read_char()
-        return self.input[literal_start:self.position]
+        return sys.intern(self.input[literal_start:self.position])
     
     def read_number(self):
         literal_start = self.position
@@ -136,7 +141,130 @@ class Lexer:
         while self.char.isspace():
             self.read_char()
 
+OPERATORS = {"==": "EQ", "!=": "NEQ", "=": "ASSIGN", "+": "PLUS", "-": "MINUS", "!": "BANG", "*": "ASTERISK", "/": "SLASH", "<": "LT", ">": "GT",
+        "(": "LPAREN", ")": "RPAREN", "[": "LBRACKET", "]": "RBRACKET", "{": "LBRACE", "}": "RBRACE", ",": "COMMA", ";": "SEMICOLON", ":": "COLON"}
+# leading whitespace is part of every match. identifiers and numbers only match when they don't run on into a non-ascii
+# character, the possessive quantifiers stop them from backing off to a shorter match instead
+TOKEN_PATTERN = re.compile(r'\s*+(?:(?P<IDENT>[A-Za-z][A-Za-z_]*+)(?![^\x00-\x7f])|(?P<OPERATOR>==|!=|[-=+!*/<>()\[\]{},;:])|(?P<INT>[0-9]++)(?![^\x00-\x7f])|"(?P<STRING>[^"]*)"?|(?P<OTHER>.))', re.DOTALL)
+IDENT_GROUP, OPERATOR_GROUP, INT_GROUP, STRING_GROUP, OTHER_GROUP = 1, 2, 3, 4, 5
+# bytes read at a time by StreamLexer, a token longer than what is buffered makes the next read as large as the buffer
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# one compiled pattern run over the whole input instead of a method call per character. whatever it leaves to OTHER
+# (unicode letters and digits, illegal characters) goes through the per character rules for that one token.
+# tokens are never changed after parsing, so every identifier, number, keyword and operator with the same text shares one
+class RegexLexer(Lexer):
+    def __init__(self, input: str):
+        self.input = input
+        self.offset = 0
+        self.token_offset = 0
+        self.next_match = TOKEN_PATTERN.finditer(input).__next__
+        self.tokens = shared_tokens()
+
+    def next_token(self):
+        try: match = self.next_match()
+        except StopIteration:
+            self.token_offset = len(self.input)
+            return Token(EOF, "")
+        group = match.lastindex
+        literal = match[group]
+        self.token_offset = match.start(group)
+        if group <= INT_GROUP:
+            token = self.tokens.get(literal)
+            if token is None: token = self.tokens[literal] = new_shared_token(group, literal)
+            return token
+        if group == STRING_GROUP:
+            self.token_offset -= 1
+            return Token(STRING, literal)
+        return self.next_character_token(match.start(group))
+
+    def next_character_token(self, offset: int):
+        self.read_position = offset
+        self.read_char()
+        token = super().next_token()
+        self.next_match = TOKEN_PATTERN.finditer(self.input, self.position).__next__
+        return token
+
+# lexes a path, a binary file or an mmap while holding only a window of the decoded text. a match that reaches the end of
+# the window may have been cut short (an identifier, "=" before "=", an unterminated string) and is retried after reading more
+class StreamLexer(RegexLexer):
+    def __init__(self, source, chunk_size: int = STREAM_CHUNK_SIZE):
+        self.file = open(source, "rb") if isinstance(source, (str, os.PathLike)) else source
+        self.owned = self.file is not source
+        self.chunk_size = chunk_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.window = ""
+        self.offset = 0
+        self.base = 0 # characters dropped from the front of the window so far
+        self.token_offset = 0
+        self.eof = False
+        self.tokens = shared_tokens()
+        self.stream = self.generate()
+
+    # iterating stops after EOF, next_token keeps returning it like the other lexers do
+    def __iter__(self):
+        for token in self.stream:
+            yield token
+            if token.type == EOF: return
+
+    def next_token(self): return next(self.stream)
+
+    def read_more(self):
+        data = self.file.read(max(self.chunk_size, len(self.window) - self.offset))
+        text = self.decoder.decode(data, final=not data)
+        self.window = self.window[self.offset:] + text
+        self.base += self.offset
+        self.offset = 0
+        if not data:
+            self.eof = True
+            if self.owned: self.file.close()
+
+    def generate(self):
+        tokens = self.tokens
+        while True:
+            match = TOKEN_PATTERN.match(self.window, self.offset)
+            if (match is None or match.end() == len(self.window)) and not self.eof:
+                self.read_more()
+                continue
+            if match is None: break
+            group = match.lastindex
+            literal = match[group]
+            if group == OTHER_GROUP:
+                self.input = self.window
+                self.read_position = match.start(group)
+                self.read_char()
+                token = Lexer.next_token(self)
+                if self.position >= len(self.window) and not self.eof:
+                    self.read_more()
+                    continue
+                self.offset = self.position
+                self.token_offset += self.base
+                yield token
+                continue
+            self.offset = match.end()
+            self.token_offset = self.base + match.start(group)
+            if group == STRING_GROUP:
+                self.token_offset -= 1
+                yield Token(STRING, literal)
+            else:
+                token = tokens.get(literal)
+                if token is None: token = tokens[literal] = new_shared_token(group, literal)
+                yield token
+        self.token_offset = self.base + len(self.window)
+        while True: yield Token(EOF, "")
+
+def shared_tokens() -> dict[str, "Token"]:
+    tokens = {literal: Token(type, literal) for literal, type in OPERATORS.items()}
+    tokens.update((literal, Token(type, literal)) for literal, type in KEYWORDS.items())
+    return tokens
+
+def new_shared_token(group: int, literal: str) -> "Token":
+    if group == IDENT_GROUP: return Token(IDENT, sys.intern(literal))
+    return Token(INT, literal)
+
 class Token:
+    __slots__ = ("type", "literal")
+
     def __init__(self, type: str, literal: str):
         self.type = type
         self.literal = literal
\ No newline at end of file
@@ -0,0 +1,305 @@
+import ast
+import hashlib
+import types
+from collections import OrderedDict
+import simple_ast, object as obj
+import simple_builtins
+import simple_eval
+from simple_eval import NULL, TRUE, FALSE
+from simple_token import Lexer
+from simple_parser import Parser
+
+PROGRAM = "_program"
+INFIX_HELPERS = {"+": "_add", "-": "_sub", "*": "_mul", "/": "_div", "<": "_lt", ">": "_gt", "==": "_eq", "!=": "_neq"}
+RESERVED = {"None", "True", "False"}
+
+class Unsupported(Exception): pass
+
+class MonkeyError(Exception):
+    def __init__(self, error: obj.Error): self.error = error
+
+class TranspiledFunction(obj.Compiled):
+    def __init__(self, function: types.FunctionType): self.function = function
+    def call(self, function: obj.Function, args: list[obj.Object]) -> obj.Object: return run_guarded(self.function, *args)
+
+class TranspiledProgram():
+    def __init__(self, code: types.CodeType, constants: list[obj.Object], literals: list[simple_ast.FunctionLiteral]):
+        self.code = code
+        self.constants = constants
+        self.literals = literals
+
+# runtime helpers called from the generated code, errors unwind as MonkeyError up to run_guarded
+EVALUATOR = simple_eval.Evaluator()
+
+def checked(result: obj.Object):
+    if type(result) is obj.Error: raise MonkeyError(result)
+    return result
+
+def run_guarded(function: types.FunctionType, *args):
+    try: return function(*args)
+    except MonkeyError as error: return error.error
+    except NameError as error: return obj.Error(f'identifier not found: {error.name}')
+
+def integer_helper(operator: str, native):
+    Integer = obj.Integer
+    def helper(left, right):
+        if type(left) is Integer and type(right) is Integer: return Integer(native(left.value, right.value))
+        return checked(EVALUATOR.eval_infix_expression(operator, left, right))
+    return helper
+
+def comparison_helper(operator: str, native):
+    Integer = obj.Integer
+    def helper(left, right):
+        if type(left) is Integer and type(right) is Integer: return TRUE if native(left.value, right.value) else FALSE
+        return checked(EVALUATOR.eval_infix_expression(operator, left, right))
+    return helper
+
+def call(function, *args):
+    if type(function) is obj.Function and type(function.compiled) is TranspiledFunction: return function.compiled.function(*args)
+    return checked(EVALUATOR.apply_function(function, list(args)))
+
+def hash_key(key):
+    if not isinstance(key, obj.Hashable): raise MonkeyError(EVALUATOR.new_error(f'object type not supported for key, got={key.type()}'))
+    return key
+
+def hash_literal(pairs):
+    hash_dict = obj.Hash()
+    for key, value in pairs: hash_dict.set(key, value)
+    return hash_dict
+
+RUNTIME = {"_add": integer_helper("+", lambda a, b: a + b),
+           "_sub": integer_helper("-", lambda a, b: a - b),
+           "_mul": integer_helper("*", lambda a, b: a * b),
+           "_div": integer_helper("/", lambda a, b: a / b),
+           "_lt": comparison_helper("<", lambda a, b: a < b),
+           "_gt": comparison_helper(">", lambda a, b: a > b),
+           "_eq": comparison_helper("==", lambda a, b: a == b),
+           "_neq": comparison_helper("!=", lambda a, b: a != b),
+           "_truthy": lambda value: value is not FALSE and value is not NULL,
+           "_bang": lambda value: checked(EVALUATOR.eval_prefix_expression("!", value)),
+           "_minus": lambda value: checked(EVALUATOR.eval_prefix_expression("-", value)),
+           "_call": call,
+           "_array": lambda elements: obj.Array(elements),
+           "_index": lambda left, index: checked(EVALUATOR.eval_index(left, index)),
+           "_key": hash_key,
+           "_hash": hash_literal,
+           "_NULL": NULL}
+
+class FunctionScope():
+    def __init__(self, outer: "FunctionScope", names: set[str], defined: set[str]):
+        self.outer = outer
+        self.names = names
+        self.defined = defined
+        self.pending: str = None
+
+# lowers a Program into one python function, monkey functions become nested python functions
+class Lowering():
+    def __init__(self):
+        self.constants: list[obj.Object] = []
+        self.constant_index: dict = {}
+        self.literals: list[simple_ast.FunctionLiteral] = []
+        self.prelude: list[ast.stmt] = []
+        self.scope: FunctionScope = None
+        self.globals: set[str] = set()
+
+    def lower_program(self, program: simple_ast.Program) -> types.CodeType:
+        body = self.lower_statements(program.statements, tail=True)
+        if len(self.globals) > 0: body.insert(0, ast.Global(sorted(self.globals)))
+        function = ast.FunctionDef(PROGRAM, ast.arguments([], [], None, [], [], None, []), body, [], None, None, [])
+        module = ast.fix_missing_locations(ast.Module([function], []))
+        code = compile(module, "<monkey>", "exec")
+        return next(constant for constant in code.co_consts if type(constant) is types.CodeType)
+
+    # function literals are hoisted into defs in front of the statement that evaluates them
+    def lower_statements(self, statements: list[simple_ast.Statement], tail: bool) -> list[ast.stmt]:
+        out: list[ast.stmt] = []
+        outer_prelude = self.prelude
+        for i, statement in enumerate(statements):
+            self.prelude = []
+            lowered = self.lower_statement(statement, tail and i == len(statements) - 1)
+            out.extend(self.prelude)
+            out.extend(lowered)
+        self.prelude = outer_prelude
+        if tail and (len(statements) == 0 or type(statements[-1]) == simple_ast.LetStatement): out.append(ast.Return(ast.Constant(None)))
+        return out
+
+    def lower_statement(self, node: simple_ast.Statement, tail: bool) -> list[ast.stmt]:
+        if type(node) == simple_ast.LetStatement: return self.lower_let_statement(node)
+        if type(node) == simple_ast.ReturnStatement: return [ast.Return(self.lower_expression(node.value))]
+        if type(node) == simple_ast.ExpressionStatement:
+            if node.expression is None: raise Unsupported("empty expression statement")
+            if type(node.expression) == simple_ast.IfExpression and not self.is_simple_if(node.expression): return self.lower_if_statement(node.expression, tail)
+            expression = self.lower_expression(node.expression)
+            return [ast.Return(expression)] if tail else [ast.Expr(expression)]
+        raise Unsupported(f'statement {type(node).__name__}')
+
+    def lower_let_statement(self, node: simple_ast.LetStatement) -> list[ast.stmt]:
+        name = self.check_name(node.name.value)
+        if self.scope is None:
+            self.globals.add(name)
+            return [ast.Assign([ast.Name(name, ast.Store())], self.lower_expression(node.value))]
+        outer_pending, self.scope.pending = self.scope.pending, name
+        value = self.lower_expression(node.value)
+        self.scope.pending = outer_pending
+        self.scope.defined.add(name)
+        return [ast.Assign([ast.Name(name, ast.Store())], value)]
+
+    def lower_if_statement(self, node: simple_ast.IfExpression, tail: bool) -> list[ast.stmt]:
+        condition = self.lower_condition(node.condition)
+        consequence = self.lower_branch(node.consequence.statements, tail)
+        alternative = self.lower_branch(node.alternative.statements, tail) if node.alternative is not None else ([ast.Return(ast.Name("_NULL", ast.Load()))] if tail else [])
+        return [ast.If(condition, consequence, alternative)]
+
+    # lets inside a branch are not visible after the if, the tree walker would fall back to outer bindings there
+    def lower_branch(self, statements: list[simple_ast.Statement], tail: bool) -> list[ast.stmt]:
+        defined = set(self.scope.defined) if self.scope is not None else None
+        out = self.lower_statements(statements, tail)
+        if self.scope is not None: self.scope.defined = defined
+        return out if len(out) > 0 else [ast.Pass()]
+
+    def is_simple_block(self, block: simple_ast.BlockStatement) -> bool:
+        if len(block.statements) == 0: return True
+        return len(block.statements) == 1 and type(block.statements[0]) == simple_ast.ExpressionStatement and block.statements[0].expression is not None \
+            and (type(block.statements[0].expression) != simple_ast.IfExpression or self.is_simple_if(block.statements[0].expression))
+
+    def is_simple_if(self, node: simple_ast.IfExpression) -> bool:
+        return self.is_simple_block(node.consequence) and (node.alternative is None or self.is_simple_block(node.alternative))
+
+    def lower_block_expression(self, block: simple_ast.BlockStatement) -> ast.expr:
+        if len(block.statements) == 0: return ast.Constant(None)
+        return self.lower_expression(block.statements[0].expression)
+
+    def lower_condition(self, node: simple_ast.Expression) -> ast.expr:
+        return ast.Call(ast.Name("_truthy", ast.Load()), [self.lower_expression(node)], [])
+
+    def lower_expression(self, node: simple_ast.Expression) -> ast.expr:
+        if type(node) == simple_ast.IntegerLiteral: return self.constant(obj.Integer(node.value), ('int', node.value))
+        if type(node) == simple_ast.StringLiteral: return self.constant(obj.String(node.value), ('str', node.value))
+        if type(node) == simple_ast.Boolean: return self.constant(TRUE if node.value else FALSE, ('bool', node.value))
+        if type(node) == simple_ast.Identifier: return self.lower_identifier(node)
+        if type(node) == simple_ast.PrefixExpression: return self.helper("_bang" if node.operator == "!" else "_minus", self.lower_expression(node.right))
+        if type(node) == simple_ast.InfixExpression: return self.helper(INFIX_HELPERS[node.operator], self.lower_expression(node.left), self.lower_expression(node.right))
+        if type(node) == simple_ast.IfExpression:
+            if not self.is_simple_if(node): raise Unsupported("if expression with statements in expression position")
+            condition = self.lower_condition(node.condition)
+            consequence = self.lower_branch_expression(node.consequence)
+            alternative = self.lower_branch_expression(node.alternative) if node.alternative is not None else ast.Name("_NULL", ast.Load())
+            return ast.IfExp(condition, consequence, alternative)
+        if type(node) == simple_ast.FunctionLiteral: return self.lower_function_literal(node)
+        if type(node) == simple_ast.CallExpression: return self.helper("_call", self.lower_expression(node.function), *[self.lower_expression(argument) for argument in node.arguments])
+        if type(node) == simple_ast.ArrayLiteral: return self.helper("_array", ast.List([self.lower_expression(element) for element in node.elements], ast.Load()))
+        if type(node) == simple_ast.IndexExpression: return self.helper("_index", self.lower_expression(node.left), self.lower_expression(node.index))
+        if type(node) == simple_ast.HashLiteral:
+            pairs = [ast.Tuple([self.helper("_key", self.lower_expression(key)), self.lower_expression(value)], ast.Load()) for key, value in node.dict.items()]
+            return self.helper("_hash", ast.Tuple(pairs, ast.Load()))
+        raise Unsupported(f'expression {type(node).__name__}')
+
+    def lower_branch_expression(self, block: simple_ast.BlockStatement) -> ast.expr:
+        defined = set(self.scope.defined) if self.scope is not None else None
+        expression = self.lower_block_expression(block)
+        if self.scope is not None: self.scope.defined = defined
+        return expression
+
+    # python resolves names statically, so reading a local before its let (where the tree walker sees the outer binding) is not lowered
+    def lower_identifier(self, node: simple_ast.Identifier) -> ast.expr:
+        name = self.check_name(node.value)
+        scope, innermost = self.scope, True
+        while scope is not None:
+            if name in scope.names:
+                if name in scope.defined or (not innermost and name == scope.pending): break
+                raise Unsupported(f'{name} is read before its let')
+            scope, innermost = scope.outer, False
+        return ast.Name(name, ast.Load())
+
+    def lower_function_literal(self, node: simple_ast.FunctionLiteral) -> ast.expr:
+        parameters = [self.check_name(parameter.value) for parameter in node.parameters]
+        self.scope = FunctionScope(self.scope, set(parameters) | self.let_names(node.body.statements), set(parameters))
+        body = self.lower_statements(node.body.statements, tail=True)
+        self.scope = self.scope.outer
+
+        name = f'_function_{len(self.literals)}'
+        self.literals.append(node)
+        arguments = ast.arguments([], [ast.arg(parameter) for parameter in parameters], ast.arg("_extra"), [], [], None, [])
+        self.prelude.append(ast.FunctionDef(name, arguments, body, [], None, None, []))
+        return self.helper("_function", ast.Name(name, ast.Load()), ast.Constant(len(self.literals) - 1))
+
+    def let_names(self, statements: list[simple_ast.Statement]) -> set[str]:
+        names = set()
+        for statement in statements:
+            if type(statement) == simple_ast.LetStatement: names.add(statement.name.value)
+            if type(statement) == simple_ast.ExpressionStatement and type(statement.expression) == simple_ast.IfExpression:
+                names |= self.let_names(statement.expression.consequence.statements)
+                if statement.expression.alternative is not None: names |= self.let_names(statement.expression.alternative.statements)
+        return names
+
+    def check_name(self, name: str) -> str:
+        if name in RESERVED: raise Unsupported(f'identifier {name} is reserved in python')
+        return name
+
+    def constant(self, constant: obj.Object, key: tuple) -> ast.expr:
+        if key not in self.constant_index:
+            self.constant_index[key] = len(self.constants)
+            self.constants.append(constant)
+        return ast.Name(f'_constant_{self.constant_index[key]}', ast.Load())
+
+    def helper(self, name: str, *args: ast.expr) -> ast.expr: return ast.Call(ast.Name(name, ast.Load()), list(args), [])
+
+# names the generated code does not find in its globals (the forked environment) are looked up here: builtins and
+# runtime helpers first, then the environments the fork reads through to
+class ForkNamespace(dict):
+    def __init__(self, outer: obj.Environment):
+        super().__init__()
+        self.outer = outer
+
+    def __missing__(self, name: str):
+        value = self.outer.get(name)
+        if value is None: raise KeyError(name)
+        return value
+
+# programs it cannot lower run on the Evaluator instead
+class Transpiler():
+    # most recently used sources, oldest dropped past CACHE_SIZE
+    CACHE_SIZE = 256
+    cache: OrderedDict = OrderedDict()
+
+    def eval(self, node: simple_ast.Node, environment: obj.Environment):
+        if type(node) != simple_ast.Program or type(environment) is not obj.Environment: return EVALUATOR.eval(node, environment)
+        if node.transpiled is None: node.transpiled = self.transpile(node)
+        return self.run(node.transpiled, node, environment)
+
+    def eval_source(self, source: str, environment: obj.Environment):
+        key = hashlib.sha256(source.encode()).hexdigest()
+        found = Transpiler.cache.get(key)
+        if found is None:
+            parser = Parser(Lexer(source))
+            program = parser.parse_program()
+            if len(parser.errors) > 0: return obj.Error(f'parser errors: {", ".join(parser.errors)}')
+            found = Transpiler.cache[key] = (program, self.transpile(program))
+            if len(Transpiler.cache) > Transpiler.CACHE_SIZE: Transpiler.cache.popitem(last=False)
+        else: Transpiler.cache.move_to_end(key)
+        program, transpiled = found
+        if type(environment) is not obj.Environment: return EVALUATOR.eval(program, environment)
+        return self.run(transpiled, program, environment)
+
+    def transpile(self, program: simple_ast.Program):
+        lowering = Lowering()
+        try: code = lowering.lower_program(program)
+        except Unsupported: return False
+        return TranspiledProgram(code, lowering.constants, lowering.literals)
+
+    def run(self, transpiled: TranspiledProgram, program: simple_ast.Program, environment: obj.Environment):
+        if transpiled is False: return EVALUATOR.eval(program, environment)
+        # a fork's outer bindings shadow the builtins of the same name, as they do for the tree walker
+        if environment.outer is None: namespace = dict(simple_builtins.functions)
+        else:
+            namespace = ForkNamespace(environment.outer)
+            namespace.update((name, builtin) for name, builtin in simple_builtins.functions.items() if environment.outer.get(name) is None)
+        namespace.update(RUNTIME)
+        namespace.update((f'_constant_{i}', constant) for i, constant in enumerate(transpiled.constants))
+        literals = transpiled.literals
+        namespace["_function"] = lambda function, index: obj.Function(literals[index].parameters, literals[index].body, environment, TranspiledFunction(function))
+        # generated functions take their builtins from the globals they are created in, so the namespace is only needed there briefly
+        environment.environment["__builtins__"] = namespace
+        try: function = types.FunctionType(transpiled.code, environment.environment)
+        finally: del environment.environment["__builtins__"]
+        return run_guarded(function)
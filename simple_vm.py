@@ -0,0 +1,198 @@
+import simple_ast, object as obj
+import simple_builtins
+import simple_eval
+from simple_compiler import *
+
+class VM():
+    def __init__(self):
+        self.evaluator = simple_eval.Evaluator()
+
+    def eval(self, node: simple_ast.Node, environment: obj.Environment):
+        compiler = Compiler()
+        compiler.compile(node)
+        bytecode = compiler.bytecode()
+        return self.run(bytecode.instructions, bytecode.constants, None, environment)
+
+    def call_function(self, function: obj.Function, args: list[obj.Object]):
+        compiled = function.compiled
+        scope = [function.scope, *args[:compiled.num_parameters]] + [None] * (compiled.num_parameters - len(args))
+        scope.extend(compiled.padding)
+        return self.run(compiled.instructions, compiled.constants, scope, function.environment)
+
+    # an empty slot reads the binding further out, as the tree walker does: slots of enclosing functions, then the globals
+    def fallback(self, scope: list, name, environment: obj.Environment):
+        if type(name) is tuple:
+            name, outer = name
+            for depth, slot in outer:
+                enclosing = scope
+                for _ in range(depth): enclosing = enclosing[0]
+                if enclosing[slot] is not None: return enclosing[slot]
+        value = environment.get(name)
+        if value is None: value = simple_builtins.functions.get(name)
+        if value is None: return obj.Error(f'identifier not found: {name}')
+        return value
+
+    # errors stop the whole program, the tree walker propagates every obj.Error up to the top as well
+    def run(self, code: list[int], constants: list, scope: list, environment: obj.Environment):
+        Integer, Error, Function, CompiledFunction, Return = obj.Integer, obj.Error, obj.Function, obj.CompiledFunction, obj.Return
+        NULL, TRUE, FALSE = simple_eval.NULL, simple_eval.TRUE, simple_eval.FALSE
+        evaluator = self.evaluator
+        globals, builtins = environment.environment, simple_builtins.functions
+        stack, frames = [], []
+        push, pop = stack.append, stack.pop
+        base, ip = 0, 0
+
+        while True:
+            op = code[ip]
+            if op == OP_GET_LOCAL:
+                value = scope[code[ip + 1]]
+                if value is None:
+                    value = self.fallback(scope, constants[code[ip + 2]], environment)
+                    if type(value) is Error: return value
+                push(value)
+                ip += 3
+            elif op == OP_CONSTANT:
+                push(constants[code[ip + 1]])
+                ip += 2
+            elif op == OP_GET_GLOBAL:
+                name = constants[code[ip + 1]]
+                value = globals.get(name)
+                if value is None: value = environment.get(name)
+                if value is None: value = builtins.get(name)
+                if value is None: return Error(f'identifier not found: {name}')
+                push(value)
+                ip += 2
+            elif op == OP_CALL:
+                count = code[ip + 1]
+                function = stack[-count - 1]
+                if type(function) is Function and type(function.compiled) is CompiledFunction:
+                    compiled = function.compiled
+                    frames.append((code, ip + 2, scope, base, constants, environment, globals))
+                    if count == compiled.num_parameters: scope = [function.scope, *stack[len(stack) - count:]]
+                    else: scope = [function.scope, *stack[len(stack) - count:][:compiled.num_parameters]] + [None] * (compiled.num_parameters - count)
+                    scope.extend(compiled.padding)
+                    del stack[len(stack) - count - 1:]
+                    code, base, ip = compiled.instructions, len(stack), 0
+                    # functions made by an earlier program (a prelude, a previous repl line) bring their own constants and globals
+                    if compiled.constants is not constants: constants, environment, globals = compiled.constants, function.environment, function.environment.environment
+                else:
+                    args = stack[len(stack) - count:]
+                    del stack[len(stack) - count - 1:]
+                    result = evaluator.apply_function(function, args)
+                    if type(result) is Error: return result
+                    push(result)
+                    ip += 2
+            elif op == OP_RETURN or op == OP_RETURN_VALUE:
+                value = stack[-1]
+                if op == OP_RETURN and type(value) is Return: value = value.value
+                if len(frames) == 0: return value
+                del stack[base:]
+                push(value)
+                code, ip, scope, base, constants, environment, globals = frames.pop()
+            elif op == OP_JUMP_IF_FALSY:
+                condition = pop()
+                if condition is FALSE or condition is NULL: ip = code[ip + 1]
+                elif type(condition) is Error: return condition
+                else: ip += 2
+            elif op == OP_ADD:
+                right = pop()
+                left = stack[-1]
+                if type(left) is Integer and type(right) is Integer: stack[-1] = Integer(left.value + right.value)
+                else:
+                    result = evaluator.eval_infix_expression("+", left, right)
+                    if type(result) is Error: return result
+                    stack[-1] = result
+                ip += 1
+            elif op == OP_SUB:
+                right = pop()
+                left = stack[-1]
+                if type(left) is Integer and type(right) is Integer: stack[-1] = Integer(left.value - right.value)
+                else:
+                    result = evaluator.eval_infix_expression("-", left, right)
+                    if type(result) is Error: return result
+                    stack[-1] = result
+                ip += 1
+            elif op <= OP_NEQ and op >= OP_MUL:
+                right = pop()
+                left = stack[-1]
+                if type(left) is Integer and type(right) is Integer:
+                    if op == OP_LT: result = TRUE if left.value < right.value else FALSE
+                    elif op == OP_EQ: result = TRUE if left.value == right.value else FALSE
+                    elif op == OP_MUL: result = Integer(left.value * right.value)
+                    elif op == OP_GT: result = TRUE if left.value > right.value else FALSE
+                    elif op == OP_NEQ: result = TRUE if left.value != right.value else FALSE
+                    else: result = Integer(left.value / right.value)
+                else:
+                    result = evaluator.eval_infix_expression(OPERATORS[op], left, right)
+                    if type(result) is Error: return result
+                stack[-1] = result
+                ip += 1
+            elif op == OP_JUMP:
+                ip = code[ip + 1]
+            elif op == OP_POP:
+                # a statement that evaluates to a Return ends the body, its last instruction is the OP_RETURN that unwraps it
+                if type(stack[-1]) is Return: ip = len(code) - 1
+                else:
+                    pop()
+                    ip += 1
+            elif op == OP_SET_LOCAL:
+                scope[code[ip + 1]] = pop()
+                ip += 2
+            elif op == OP_GET_OUTER:
+                outer = scope
+                for _ in range(code[ip + 1]): outer = outer[0]
+                value = outer[code[ip + 2]]
+                if value is None:
+                    value = self.fallback(scope, constants[code[ip + 3]], environment)
+                    if type(value) is Error: return value
+                push(value)
+                ip += 4
+            elif op == OP_SET_GLOBAL:
+                value = pop()
+                if value is not None: environment.set(constants[code[ip + 1]], value)
+                ip += 2
+            elif op == OP_CLOSURE:
+                compiled = constants[code[ip + 1]]
+                push(Function(compiled.parameters, compiled.body, environment, compiled, scope))
+                ip += 2
+            elif op == OP_BANG:
+                stack[-1] = evaluator.eval_bang_operator_expression(stack[-1])
+                ip += 1
+            elif op == OP_MINUS:
+                result = evaluator.eval_prefix_expression("-", stack[-1])
+                if type(result) is Error: return result
+                stack[-1] = result
+                ip += 1
+            elif op == OP_ARRAY:
+                count = code[ip + 1]
+                elements = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(obj.Array(elements))
+                ip += 2
+            elif op == OP_HASH_KEY:
+                if not isinstance(stack[-1], obj.Hashable): return evaluator.new_error(f'object type not supported for key, got={stack[-1].type()}')
+                ip += 1
+            elif op == OP_HASH:
+                count = code[ip + 1]
+                hash_dict = obj.Hash()
+                for i in range(len(stack) - 2 * count, len(stack), 2): hash_dict.set(stack[i], stack[i + 1])
+                del stack[len(stack) - 2 * count:]
+                push(hash_dict)
+                ip += 2
+            elif op == OP_INDEX:
+                index = pop()
+                result = evaluator.eval_index(stack[-1], index)
+                if type(result) is Error: return result
+                stack[-1] = result
+                ip += 1
+            elif op == OP_POP_OR_JUMP:
+                if type(stack[-1]) is Return: ip = code[ip + 1]
+                else:
+                    pop()
+                    ip += 2
+            elif op == OP_WRAP_RETURN:
+                stack[-1] = Return(stack[-1])
+                ip += 1
+            else: raise ValueError(f'unknown opcode: {op}')
+
+OPERATORS = {op: operator for operator, op in INFIX_OPS.items()}
@@ -0,0 +1,68 @@
+import simple_token
+import simple_parser
+import simple_resolver
+import simple_arena
+import simple_eval
+import object as obj
+
+PROGRAMS = ["let x = 5 + y * 2;", "return -a;", 'let s = "monkey"; s + "!"', "if (a < b) { a } else { b }", "if (!true) { 1 }",
+        "let f = fn(x, y) { let z = x; return z + y; }; f(1, 2)", "let g = fn(n) { if (n == 0) { 0 } else { g(n - 1) } }",
+        '[1, "two", [3]][0]', '{"a": 1, true: fn() { 2 }, 3: {}}', "fn() { }()", "a != b == false"]
+
+def parse(input):
+    parser = simple_parser.Parser(simple_token.RegexLexer(input))
+    program = parser.parse_program()
+    assert parser.errors == [], f'parser errors for {input}: {parser.errors}'
+    simple_resolver.Resolver().resolve(program)
+    return program
+
+def calls(node, found):
+    if type(node) is list:
+        for element in node: calls(element, found)
+    elif hasattr(node, "__slots__"):
+        if hasattr(node, "tail"): found.append((node.offset, node.tail))
+        for name in node.__slots__:
+            value = getattr(node, name, None)
+            calls(list(value.items()) if type(value) is dict else list(value) if type(value) is tuple else value, found)
+    return found
+
+def test_round_trip():
+    for test in PROGRAMS:
+        program = parse(test)
+        converted = simple_arena.to_ast(simple_arena.from_ast(program))
+        assert converted.string() == program.string(), f'round trip changed {test}, expected={program.string()}, got={converted.string()}'
+        assert calls(converted.statements, []) == calls(program.statements, []), f'round trip lost call offsets or tail flags for {test}'
+
+def test_streaming_parse_matches_conversion():
+    source = "\n".join(test.rstrip(";") + ";" for test in PROGRAMS)
+    streamed = simple_arena.parse(simple_parser.Parser(simple_token.RegexLexer(source)))
+    converted = simple_arena.from_ast(parse(source))
+    for name in ("kinds", "offsets", "children", "statements", "literals"):
+        assert getattr(streamed, name) == getattr(converted, name), f'streamed arena differs from the converted one in {name}'
+    assert streamed.operands == converted.operands, f'streamed arena differs from the converted one in operands'
+
+def test_cursor():
+    arena = simple_arena.from_ast(parse('let add = fn(a, b) { a + b }; add(1, 2); {"k": [true]}'))
+    let, call, hash = [arena.cursor(index) for index in arena.statements]
+    assert let.kind == simple_arena.LET and let.name.value == "add" and let.offset == 0, f'wrong let, got={let}'
+    function = let.value
+    assert [parameter.value for parameter in function.parameters] == ["a", "b"], f'wrong parameters, got={function.parameters}'
+    infix = function.body.statements[0].expression
+    assert (infix.left.value, infix.operator, infix.right.value, infix.offset) == ("a", "+", "b", 23), f'wrong infix, got={infix.string()} at {infix.offset}'
+    assert call.expression.function.value == "add" and [argument.value for argument in call.expression.arguments] == [1, 2], f'wrong call, got={call.string()}'
+    key, value = next(iter(hash.expression.dict.items()))
+    assert key.value == "k" and value.elements[0].value is True, f'wrong hash, got={hash.string()}'
+    assert arena.cursor(arena.statements[0]) == let and len({let, arena.cursor(arena.statements[0])}) == 1, f'cursors on one node should be equal'
+    assert len(arena.literals) == len(set(arena.literals)), f'literals are not stored once, got={arena.literals}'
+
+def test_evaluate_arena():
+    arena = simple_arena.parse(simple_parser.Parser(simple_token.RegexLexer("let count = fn(n, a) { if (n == 0) { a } else { count(n - 1, a + 1) } }; count(20000, 0)")))
+    evaluated = simple_arena.ArenaEvaluator().eval(arena, obj.Environment())
+    assert evaluated.inspect() == "20000", f'tail calls should not grow the stack, got={evaluated.inspect()}'
+
+def test_incomplete_program_matches_evaluator():
+    for test in ["let a1 = fn(x) { x }; let b = a1(2) + 1;", "if (true) { }", "let x = ;"]:
+        program = simple_parser.Parser(simple_token.RegexLexer(test)).parse_program()
+        expected = simple_eval.Evaluator().eval(program, obj.Environment())
+        evaluated = simple_arena.ArenaEvaluator().eval(program, obj.Environment())
+        assert type(evaluated) == type(expected) and (expected is None or evaluated.inspect() == expected.inspect()), f'wrong result for {test}, expected={expected}, got={evaluated}'
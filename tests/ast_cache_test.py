@@ -0,0 +1,59 @@
+import os
+import simple_token
+import simple_parser
+import simple_resolver
+import simple_eval
+import simple_ast_cache
+import simple_batch
+import object as obj
+
+SOURCE = "let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; puts(len(\"abc\")); fib(10)"
+
+def parse(input):
+    program = simple_parser.Parser(simple_token.Lexer(input)).parse_program()
+    simple_resolver.Resolver().resolve(program)
+    return program
+
+def test_hit_and_miss(tmp_path):
+    cache = simple_ast_cache.AstCache(str(tmp_path))
+    assert cache.get(SOURCE) is None, f'empty cache should miss'
+    program = parse(SOURCE)
+    cache.put(SOURCE, program)
+    loaded = simple_ast_cache.AstCache(str(tmp_path)).get(SOURCE)
+    assert loaded is not program and loaded.string() == program.string(), f'wrong tree loaded, got={loaded.string()}'
+    evaluated = simple_eval.Evaluator().eval(loaded, obj.Environment())
+    assert evaluated.inspect() == "55", f'loaded tree evaluates wrong, got={evaluated.inspect()}'
+    assert cache.get(SOURCE + " ") is None
+    assert cache.stats() == {"hits": 0, "misses": 2, "writes": 1, "evictions": 0}, f'wrong stats, got={cache.stats()}'
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(simple_ast_cache.SUFFIX)] == [], f'temporary files were left behind'
+
+def test_parser_version(tmp_path, monkeypatch):
+    cache = simple_ast_cache.AstCache(str(tmp_path))
+    cache.put(SOURCE, parse(SOURCE))
+    monkeypatch.setattr(simple_parser, "PARSER_VERSION", simple_parser.PARSER_VERSION + 1)
+    assert cache.get(SOURCE) is None, f'trees of another parser version should be ignored'
+
+def test_corrupt_entries_miss(tmp_path):
+    cache = simple_ast_cache.AstCache(str(tmp_path))
+    with open(cache.path(SOURCE), "wb") as file: file.write(b"garbage")
+    assert cache.get(SOURCE) is None, f'corrupt entry should be a miss'
+
+def test_eviction(tmp_path):
+    cache = simple_ast_cache.AstCache(str(tmp_path))
+    sources = [f'{i} + {i}' for i in range(3)]
+    for i, source in enumerate(sources):
+        cache.put(source, parse(source))
+        os.utime(cache.path(source), (i, i))
+    cache.max_bytes = os.path.getsize(cache.path(sources[0])) * 2
+    os.utime(cache.path(sources[0]))
+    cache.evict()
+    assert [os.path.exists(cache.path(source)) for source in sources] == [True, False, True], f'least recently used entry should go first'
+
+def test_batch_uses_disk_cache(tmp_path):
+    for mode in simple_batch.MODES:
+        results = simple_batch.run_batch([SOURCE, "1 +"], workers=1, mode=mode, cache_directory=str(tmp_path))
+        assert results[0].inspect() == "55", f'wrong result in {mode} mode, got={results[0].inspect()}'
+    assert len(os.listdir(tmp_path)) == 1, f'the program should be stored once, parser errors not at all'
+    cache = simple_batch.ParseCache(disk=simple_ast_cache.AstCache(str(tmp_path)))
+    cache.parse(SOURCE)
+    assert cache.stats()["disk_hits"] == 1, f'wrong stats, got={cache.stats()}'
@@ -0,0 +1,58 @@
+import pytest
+import simple_batch
+import object as obj
+
+SOURCES = ["let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; fib(10)", "let x = 1; x + 2", "x", "let a = [1, 2]; push(a, 3)", "1 +", '"a" + "b"']
+
+def test_run_batch():
+    expected = ["55", "3", "ERROR: identifier not found: x", "[1, 2, 3]", None, "ab"]
+    for mode in simple_batch.MODES:
+        results = simple_batch.run_batch(SOURCES * 3, workers=2, mode=mode)
+        assert len(results) == len(SOURCES) * 3, f'wrong number of results in {mode} mode, got={len(results)}'
+        for i, result in enumerate(results):
+            if expected[i % len(SOURCES)] is None: assert type(result) is obj.Error and result.message.startswith("parser has 1 error(s)"), f'expected a parser error in {mode} mode, got={result.inspect()}'
+            else: assert result.inspect() == expected[i % len(SOURCES)], f'wrong result {i} in {mode} mode, expected={expected[i % len(SOURCES)]}, got={result.inspect()}'
+
+def test_boolean_keys_survive_process_mode():
+    results = simple_batch.run_batch(['{true: 1, false: 2, 1: 3}'], workers=1, mode="process")
+    assert results[0].get(obj.Boolean(True)).inspect() == "1" and results[0].get(obj.Boolean(False)).inspect() == "2", f'boolean keys were lost on the way back, got={results[0].inspect()}'
+
+def test_deep_ropes_in_process_mode():
+    grow = 'let grow = fn(s, n) { if (n == 0) { s } else { grow(s + "abcdefghijklmnopqrstuvwxyzabcdefghijklmnopqrstuvwxyzabcdefghijklmnopqr", n - 1) } };'
+    results = simple_batch.run_batch([grow + ' grow("", 3000)', grow + ' [grow("", 3000)]', "1 + 1"], workers=1, mode="process")
+    assert type(results[0]) is obj.String and results[0].length == 3000 * 70, f'deep rope did not come back, got={results[0].inspect()[:80]}'
+    assert results[1].inspect() == "ERROR: ARRAY result can not be sent back from a worker process", f'an array holding a deep rope should fail its own slot, got={results[1].inspect()[:80]}'
+    assert results[2].inspect() == "2", f'a deep rope broke the rest of the batch, got={results[2].inspect()}'
+
+def test_programs_are_isolated():
+    results = simple_batch.run_batch(["let x = 5; x", "x"], workers=1, mode="thread")
+    assert results[1].inspect() == "ERROR: identifier not found: x", f'environments leaked between programs, got={results[1].inspect()}'
+
+def test_prelude():
+    prelude = "let double = fn(x) { x * 2 }; let base = [1, 2];"
+    for mode in simple_batch.MODES:
+        results = simple_batch.run_batch(["let base = 5; double(base)", "push(base, double(len(base)))", "base"], workers=2, mode=mode, prelude=prelude)
+        assert [result.inspect() for result in results] == ["10", "[1, 2, 4]", "[1, 2]"], f'wrong results with a prelude in {mode} mode, got={[result.inspect() for result in results]}'
+
+def test_parse_cache():
+    cache = simple_batch.ParseCache(size=2)
+    first = cache.parse("1 + 2")
+    assert cache.parse("1 + 2") is first, f'identical sources should share one tree'
+    cache.parse("3")
+    cache.parse("4")
+    assert cache.parse("1 + 2") is not first, f'the oldest entry should have been evicted'
+    assert cache.stats() == {"hits": 1, "misses": 4, "entries": 2}, f'wrong stats, got={cache.stats()}'
+
+def test_unknown_mode():
+    with pytest.raises(ValueError): simple_batch.BatchRunner(mode="fiber")
+
+def test_failures_stay_in_their_slot():
+    sources = ["5 / 0", "let down = fn(n) { 1 + down(n + 1) }; down(0)", "let k = 2; fn(x) { x + k }", "[fn(x) { x }]", "1 + 1"]
+    for engine in ("eval", "closure", "python"):
+        for mode in simple_batch.MODES:
+            results = simple_batch.run_batch(sources, workers=1, mode=mode, engine=engine)
+            assert results[0].inspect() == "ERROR: ZeroDivisionError: division by zero", f'wrong result for 5 / 0 with {engine} in {mode} mode, got={results[0].inspect()}'
+            assert type(results[1]) is obj.Error, f'expected an error for the runaway recursion with {engine} in {mode} mode, got={results[1].inspect()}'
+            if mode == "process" and engine != "eval":
+                for result, kind in zip(results[2:4], ["FUNCTION", "ARRAY"]): assert result.inspect() == f'ERROR: {kind} result can not be sent back from a worker process', f'wrong result for an unpicklable {kind} with {engine}, got={result.inspect()}'
+            assert results[4].inspect() == "2", f'a failing program broke the rest of the batch with {engine} in {mode} mode, got={results[4].inspect()}'
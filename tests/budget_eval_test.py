@@ -0,0 +1,44 @@
+import sys
+import simple_token
+import simple_parser
+import simple_budget_eval
+import object as obj
+
+FIB = "let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; fib(15)"
+
+def evaluate(input, **limits):
+    program = simple_parser.Parser(simple_token.Lexer(input)).parse_program()
+    evaluator = simple_budget_eval.BudgetedEvaluator(**limits)
+    return evaluator.eval(program, obj.Environment()), evaluator
+
+def test_limits():
+    tests = [(FIB, {"max_calls": 1000}, "call limit exceeded: 1000"),
+            ("let loop = fn(n) { loop(n + 1) }; loop(0)", {"max_calls": 500}, "call limit exceeded: 500"),
+            ("let down = fn(n) { if (n == 0) { 0 } else { 1 + down(n - 1) } }; down(100)", {"max_depth": 50}, "call depth limit exceeded: 50"),
+            ("let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; map(fn(x) { fib(20) }, [1, 2])", {"max_calls": 100}, "call limit exceeded: 100"),
+            ("let grow = fn(a, n) { if (n == 0) { a } else { grow(a + \"abcdefghij\", n - 1) } }; len(grow(\"\", 100000))", {"max_memory": 10 ** 6}, "memory limit exceeded: 1000000 bytes"),
+            ("let fill = fn(a, n) { if (n == 0) { a } else { fill(push(a, n), n - 1) } }; len(fill([], 100000))", {"max_memory": 10 ** 5}, "memory limit exceeded: 100000 bytes"),
+            ("len(range(100000))", {"max_memory": 10 ** 5}, "memory limit exceeded: 100000 bytes"),
+            ("len(range(100000000000))", {"max_memory": 10 ** 5}, "memory limit exceeded: 100000 bytes"),
+            ("let make = fn(n) { range(n) }; len(make(100000))", {"max_memory": 10 ** 5}, "memory limit exceeded: 100000 bytes"),
+            ("len(map(fn(x) { x }, range(10000)))", {"max_memory": 10 ** 5}, "memory limit exceeded: 100000 bytes")]
+    for test in tests:
+        evaluated, _ = evaluate(test[0], **test[1])
+        assert type(evaluated) == obj.Error, f'expected an error for {test[0]}, got={evaluated.inspect()}'
+        assert evaluated.message == test[2], f'wrong error for {test[0]}, expected={test[2]}, got={evaluated.message}'
+
+def test_within_limits():
+    evaluated, evaluator = evaluate(FIB, max_calls=2000, max_depth=20, max_memory=100)
+    assert evaluated.inspect() == "610", f'wrong result, got={evaluated.inspect()}'
+    assert evaluator.usage() == {"calls": 1973, "memory": 0}, f'wrong usage, got={evaluator.usage()}'
+    test = "let sum = fn(a, total) { if (len(a) == 0) { total } else { sum(rest(a), total + first(a)) } }; sum(range(2000), 0)"
+    evaluated, evaluator = evaluate(test, max_memory=20000)
+    assert evaluated.inspect() == str(sum(range(2000))), f'rest should not be charged for the shared array, got={evaluated.inspect()}'
+    evaluated, evaluator = evaluate("let grow = fn(a, n) { if (n == 0) { a } else { grow(a + \"abcdefghij\", n - 1) } }; len(grow(\"\", 1000))", max_memory=10 ** 5)
+    assert evaluated.inspect() == "10000", f'concatenation should be charged for the new node only, got={evaluated.inspect()}'
+
+def test_python_stack_exhaustion():
+    evaluated, _ = evaluate("let down = fn(n) { if (n == 0) { 0 } else { 1 + down(n - 1) } }; down(100000)")
+    assert type(evaluated) == obj.Error and evaluated.message.startswith("call depth limit exceeded: python stack exhausted at depth "), f'expected a depth error, got={evaluated.inspect()}'
+    depth = int(evaluated.message.rsplit(" ", 1)[1])
+    assert 0 < depth < sys.getrecursionlimit(), f'reported depth should be where the stack ran out, got={depth}'
@@ -0,0 +1,28 @@
+import simple_token
+import simple_parser
+import simple_closure
+import simple_eval
+import object as obj
+
+def parse(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    return parser.parse_program()
+
+def test_function_literal_caches_closure():
+    program = parse("let double = fn(x) { x * 2 }; double(2) + double(3)")
+    literal = program.statements[0].value
+    assert literal.closure is None
+    compiler = simple_closure.ClosureCompiler()
+    evaluated = compiler.eval(program, obj.Environment())
+    assert evaluated.value == 10, f'wrong result, got={evaluated.inspect()}'
+    cached = literal.closure
+    assert type(cached) == simple_closure.CompiledClosure, f'closure not cached on FunctionLiteral, got={type(cached)}'
+    compiler.eval(program, obj.Environment())
+    assert literal.closure is cached, 'closure was rebuilt for an already compiled FunctionLiteral'
+
+def test_closure_functions_callable_from_evaluator():
+    environment = obj.Environment()
+    simple_closure.ClosureCompiler().eval(parse("let add = fn(x) { fn(y) { x + y } }; let addTwo = add(2);"), environment)
+    evaluated = simple_eval.Evaluator().eval(parse("addTwo(3)"), environment)
+    assert type(evaluated) == obj.Integer and evaluated.value == 5, f'wrong result, got={evaluated.inspect()}'
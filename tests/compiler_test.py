@@ -0,0 +1,47 @@
+import simple_token
+import simple_parser
+import simple_compiler
+import simple_vm
+import object as obj
+
+def compile_source(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    program = parser.parse_program()
+    compiler = simple_compiler.Compiler()
+    compiler.compile(program)
+    return compiler.bytecode()
+
+def test_compile_expressions():
+    tests = [("1 + 2", ["CONSTANT 0", "CONSTANT 1", "ADD", "RETURN"]),
+            ("1; 2", ["CONSTANT 0", "POP", "CONSTANT 1", "RETURN"]),
+            ("-1", ["CONSTANT 0", "MINUS", "RETURN"]),
+            ("!true", ["CONSTANT 0", "BANG", "RETURN"]),
+            ("let x = 1; x", ["CONSTANT 0", "SET_GLOBAL 1", "GET_GLOBAL 1", "RETURN"]),
+            ("if (true) { 10 }", ["CONSTANT 0", "JUMP_IF_FALSY 8", "CONSTANT 1", "JUMP 10", "CONSTANT 2", "RETURN"]),
+            ("[1, 2][0]", ["CONSTANT 0", "CONSTANT 1", "ARRAY 2", "CONSTANT 2", "INDEX", "RETURN"]),
+            ('{"a": 1}', ["CONSTANT 0", "HASH_KEY", "CONSTANT 1", "HASH 1", "RETURN"]),
+            ("return 1; 2", ["CONSTANT 0", "RETURN_VALUE", "CONSTANT 1", "RETURN"]),
+            ("1 + if (true) { return 5 }", ["CONSTANT 0", "CONSTANT 1", "JUMP_IF_FALSY 13", "CONSTANT 2", "WRAP_RETURN", "JUMP 15", "JUMP 15", "CONSTANT 3", "ADD", "RETURN"])]
+
+    for input, expected in tests:
+        bytecode = compile_source(input)
+        assert simple_compiler.disassemble(bytecode.instructions) == expected, f'wrong instructions for {input}, got={simple_compiler.disassemble(bytecode.instructions)}'
+
+def test_constants_are_deduplicated():
+    bytecode = compile_source("1 + 1 + 1")
+    assert len(bytecode.constants) == 1, f'expected a single constant, got={len(bytecode.constants)}'
+
+def test_compile_function_scopes():
+    bytecode = compile_source("fn(a) { let b = a; fn(c) { a + b + c } }")
+    outer = bytecode.constants[-1]
+    assert type(outer) == obj.CompiledFunction
+    assert outer.num_slots == 2, f'expected 2 slots, got={outer.num_slots}'
+    inner = [constant for constant in bytecode.constants if type(constant) == obj.CompiledFunction and constant is not outer][0]
+    assert simple_compiler.disassemble(inner.instructions) == ["GET_OUTER 1 1 0", "GET_OUTER 1 2 1", "ADD", "GET_LOCAL 1 2", "ADD", "RETURN"]
+
+def test_vm_deep_recursion():
+    input = "let count = fn(n) { if (n == 0) { 0 } else { 1 + count(n - 1) } }; count(5000)"
+    program = simple_parser.Parser(simple_token.Lexer(input)).parse_program()
+    evaluated = simple_vm.VM().eval(program, obj.Environment())
+    assert type(evaluated) == obj.Integer and evaluated.value == 5000
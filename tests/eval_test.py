@@ -1,9 +1,18 @@
+import pytest
 import simple_token
 import simple_parser
 import simple_ast
 import simple_eval
+import simple_engine
 import object as obj
 
+ENGINE = "eval"
+
+@pytest.fixture(autouse=True, params=simple_engine.ENGINES.keys())
+def engine(request):
+    global ENGINE
+    ENGINE = request.param
+
 def test_eval_integer_expression():
     tests = [("5", 5),
             ("10", 10),
@@ -172,6 +181,9 @@ def test_builtin():
 		    ('rest([1, 2, 3])', [2,3]),
 		    ('rest([])', None),
 		    ('push([], 1)', [1]),
+		    ('let a = [1]; let b = push(a, 2); let c = push(a, 3); a', [1]),
+		    ('let a = [1]; let b = push(a, 2); push(a, 3)', [1, 3]),
+		    ('let a = [1, 2, 3]; let b = push(rest(a), 4); rest(a)', [2, 3]),
 		    ('push(1, 1)', "first argument to 'push' must be ARRAY, got INTEGER")]
     
     for input, expected in tests:
@@ -232,8 +244,7 @@ def test_hash_literals():
     for key, value in expected.items():
         evaluated_value = evaluated.dict.get(key)
         assert evaluated_value is not None, f'key is not inside dict'
-        assert type(evaluated_value) == obj.HashPair, f'dict element is not of type HashPair, got={type(value)}'
-        check_integer_obj(evaluated_value.value, value)
+        check_integer_obj(evaluated_value, value)
 
 def test_hash_index_expressions():
     tests = [
@@ -251,11 +262,98 @@ def test_hash_index_expressions():
         if type(expected) == int: check_integer_obj(evaluated, expected)
         if type(expected) == None: check_null_obj(evaluated)
 
+def test_higher_order_builtins():
+    tests = [("map(fn(x) { x * 2 + 1 }, [1, 2, 3])", "[3, 5, 7]"), ("map(fn(x) { x < 2 }, [1, 2])", "[True, False]"), ('map(fn(x) { x + "!" }, ["a", "b"])', "[a!, b!]"),
+            ("map(fn(x) { x / 2 }, [1, 2])", "[0.5, 1.0]"), ("let y = 10; map(fn(x) { x + y }, [1, 2])", "[11, 12]"), ("map(len, [[1], []])", "[1, 0]"),
+            ("filter(fn(x) { x > 1 }, [1, 2, 3])", "[2, 3]"), ("filter(fn(x) { x }, [0, 1])", "[0, 1]"), ('filter(fn(x) { len(x) > 1 }, ["a", "bc"])', "[bc]"),
+            ("reduce(fn(a, b) { a + b }, [1, 2, 3], 10)", "16"), ('reduce(fn(a, b) { a + b }, ["b", "c"], "a")', "abc"), ("reduce(fn(a, b) { a * b }, [], 1)", "1"),
+            ("sum([1, 2, 3])", "6"), ("sum([])", "0"), ("min([3, 1, 2])", "1"), ("max([3, 1, 2])", "3"), ("min([])", "null"),
+            ("range(3)", "[0, 1, 2]"), ("range(1, 7, 2)", "[1, 3, 5]"), ("sum(map(fn(x) { x * x }, range(1, 11)))", "385"),
+            ("map(1, [1])", "ERROR: first argument to 'map' must be FUNCTION, got INTEGER"), ("map(fn(x) { x }, 1)", "ERROR: second argument to 'map' must be ARRAY, got INTEGER"),
+            ("map(fn(x, y) { x }, [1])", "ERROR: function passed to 'map' must take 1 argument(s), got 2"), ('sum([1, "a"])', "ERROR: elements of 'sum' must be INTEGER, got STRING"),
+            ("map(fn(x) { x + true }, [1])", "ERROR: type mismatch: INTEGER + BOOLEAN"), ("range(1, 2, 0)", "ERROR: step of 'range' must not be 0"),
+            ("map(fn(x) { (x < 1) + 1 }, [1])", "ERROR: type mismatch: BOOLEAN + INTEGER")]
+    for test in tests:
+        evaluated = evaluate(test[0])
+        assert evaluated.inspect() == test[1], f'wrong result for {test[0]}, expected={test[1]}, got={evaluated.inspect()}'
+
+def test_unboxed_arithmetic():
+    tests = [("1 + 2 * 3 - -4", "11"), ("7 / 2 * 2", "7.0"), ("let x = 3; x * x < 10", "True"), ("(1 + 2) + true", "ERROR: type mismatch: INTEGER + BOOLEAN"),
+            ('-"a"', "ERROR: unknown operator: -STRING"), ("1 + 2 == 3", "True"), ("let f = fn(x) { x + 1 }; f(2) * f(3)", "12")]
+    for test in tests:
+        evaluated = evaluate(test[0])
+        assert evaluated.inspect() == test[1], f'wrong result for {test[0]}, expected={test[1]}, got={evaluated.inspect()}'
+
+# every engine gives the tree walker's result, errors and returns from inside operands included
+def test_engines_agree():
+    tests = ["let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; fib(15)",
+            "let f = fn() { let g = fn(x) { if (x == 0) { 0 } else { g(x - 1) } }; g(5) }; f()",
+            "let x = 1; let f = fn() { let y = x; let x = 2; y + x }; f()",
+            "let f = fn(x) { let x = x + 1; x }; f(1)",
+            "let x = 10; let f = fn() { let x = x + 1; x }; f()",
+            "let f = fn() { let g = fn() { h() }; let h = fn() { 1 }; g() }; f()",
+            "let add = fn(a, b) { a + b }; add(1, foo)",
+            "let f = fn(x) { if (x > 1) { return x; } 0 }; f(5) + f(1)",
+            "let a = [1, 2, 3]; let f = fn(x) { x * 2 }; f(a[1]) + len(a)",
+            '{"a": fn(x) { x }}["a"](3)',
+            "let f = fn(x) { x }; let g = fn() { f(1) + f(true) }; g()",
+            "let f = fn() { puts(1); let a = 2; }; f(); 5",
+            "if (foo) { 1 }",
+            "if (1 > 2) { 1 }",
+            "let x = if (true) { 1 } else { 2 }; x",
+            "-(1 + 2) * 3 / 3",
+            '{"a": 1, [1]: 2}',
+            'len([1, 2, 3]) + len("ab")',
+            "1 + if (true) { return 5 }",
+            "let x = if (true) { return 5 }; 7",
+            "let x = if (true) { return 5 }; x; 7",
+            "let f = fn() { 1 + if (true) { return 5 } else { 2 } }; f() + 1",
+            "let f = fn() { let x = if (true) { return 5 }; 7 }; f()",
+            "let f = fn() { let x = if (true) { if (true) { return 5 }; 6 }; x; 7 }; f()",
+            "let f = fn() { return if (true) { return 5 } }; f() + 1",
+            "let y = 5; let f = fn() { if (false) { let y = 2; }; y }; f()",
+            "let f = fn(y) { let g = fn() { if (false) { let y = 2; }; y }; g() }; f(7)",
+            "let f = fn() { let g = fn() { if (false) { let y = 2; }; y }; g() }; f()",
+            "let f = fn() { if (false) { let len = 1; }; len([1, 2]) }; f()"]
+    for test in tests:
+        expected = simple_eval.Evaluator().eval(simple_parser.Parser(simple_token.Lexer(test)).parse_program(), obj.Environment())
+        evaluated = evaluate(test)
+        assert type(evaluated) == type(expected), f'{ENGINE} disagrees with the tree walker on {test}, expected={type(expected)}, got={type(evaluated)}'
+        assert evaluated.inspect() == expected.inspect(), f'{ENGINE} disagrees with the tree walker on {test}, expected={expected.inspect()}, got={evaluated.inspect()}'
+
+def test_literals_and_small_integers_are_shared():
+    program = simple_parser.Parser(simple_token.Lexer("let f = fn() { 1000 }; f() == f()")).parse_program()
+    evaluator = simple_eval.Evaluator()
+    environment = obj.Environment()
+    evaluator.eval(program, environment)
+    function = environment.get("f")
+    assert evaluator.apply_function(function, []) is evaluator.apply_function(function, []), f'literal is boxed on every evaluation'
+    assert evaluator.eval(simple_parser.Parser(simple_token.Lexer("100 + 100")).parse_program(), environment) is obj.new_integer(200), f'small integers are not shared'
+
+def test_prelude_forks():
+    prelude = simple_engine.Prelude("let double = fn(x) { x * 2 }; let limit = 10; let quad = fn(x) { double(double(x)) };", ENGINE)
+    tests = [("quad(limit)", "40"), ("let limit = 1; quad(limit)", "4"), ("limit", "10"), ("let double = fn(x) { x }; quad(3)", "12"), ("let f = fn(x) { double(x) + limit }; f(1)", "12"), ("x", "ERROR: identifier not found: x")]
+    for test in tests:
+        program = simple_parser.Parser(simple_token.Lexer(test[0])).parse_program()
+        evaluated = prelude.run(program)
+        assert evaluated.inspect() == test[1], f'wrong result for {test[0]}, expected={test[1]}, got={evaluated.inspect()}'
+    assert prelude.environment.environment.keys() == {"double", "limit", "quad"}, f'requests leaked into the prelude, got={list(prelude.environment.environment)}'
+
+# functions of a prelude evaluated by one engine are called from, and call back into, programs run by every other engine
+def test_prelude_across_engines():
+    prelude = simple_engine.Prelude("let apply = fn(f, x) { f(x) }; let double = fn(x) { x * 2 }; let twice = fn(f) { fn(x) { f(f(x)) } };", ENGINE)
+    tests = [("apply(fn(x) { x * 2 }, 21)", "42"), ("double(21)", "42"), ("twice(fn(x) { x + 1 })(40)", "42"), ("map(double, [1, 2])", "[2, 4]"), ("apply(1, 2)", "ERROR: not a function: INTEGER")]
+    for engine in simple_engine.ENGINES:
+        for test in tests:
+            program = simple_parser.Parser(simple_token.Lexer(test[0])).parse_program()
+            evaluated = simple_engine.new_engine(engine).eval(program, prelude.fork())
+            assert evaluated is not None and evaluated.inspect() == test[1], f'wrong result for {test[0]} on {engine} with a {ENGINE} prelude, expected={test[1]}, got={evaluated}'
+
 def evaluate(input):
     lexer = simple_token.Lexer(input)
     parser = simple_parser.Parser(lexer)
     program = parser.parse_program()
-    evaluator = simple_eval.Evaluator()
+    evaluator = simple_engine.new_engine(ENGINE)
     environment = obj.Environment()
     return evaluator.eval(program, environment)
 
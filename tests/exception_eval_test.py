@@ -0,0 +1,33 @@
+import simple_token
+import simple_parser
+import simple_eval
+import simple_exception_eval
+import object as obj
+
+def parse(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    return parser.parse_program()
+
+def test_agrees_with_evaluator():
+    tests = ["let f = fn() { let a = 1 }; f(); 5", "let f = fn() { let a = 1 }; let x = f(); x", "let f = fn() { }; 1 + f()",
+            "let f = fn(x) { return g(); x }; let g = fn() { let b = 2 }; f(3)", "if (true) { let a = 1 }", "[1, fn() { }()]",
+            "let f = fn(n) { if (n > 0) { return f(n - 1); } n }; f(100)", "let f = fn() { 1 + true; 2 }; f(); 3",
+            '{1: 2, fn(){ 1 }: 3}', "let f = fn(x) { if (x) { return x * 2; } return 0; }; f(3) + f(false)", "len(1, 2); 4",
+            "let g = fn(x) { x / 0 }; 5", "[1, 2][true]", "let a = [1, x]; 1", "!fn() { let a = 1 }()", "-(1 + true)",
+            "1 + if (true) { return 5 }", "let x = if (true) { return 5 }; 7", "let x = if (true) { return 5 }; x; 7", "-if (true) { return 5 }",
+            "[if (true) { return 5 }, 2]", "let f = fn() { let x = if (true) { return 5 }; 7 }; f()", "let f = fn() { 1 + if (true) { return 5 } }; f()",
+            "let f = fn() { return if (true) { return 5 } }; f() + 1", "if (if (true) { return 5 }) { 1 } else { 2 }", "if (true) { if (true) { return 5 }; 6 }"]
+    for test in tests:
+        expected = simple_eval.Evaluator().eval(parse(test), obj.Environment())
+        evaluated = simple_exception_eval.ExceptionEvaluator().eval(parse(test), obj.Environment())
+        assert type(evaluated) == type(expected), f'wrong type for {test}, expected={type(expected)}, got={type(evaluated)}'
+        if expected is not None: assert evaluated.inspect() == expected.inspect(), f'wrong result for {test}, expected={expected.inspect()}, got={evaluated.inspect()}'
+
+def test_errors_stay_values_outside():
+    evaluator = simple_exception_eval.ExceptionEvaluator()
+    environment = obj.Environment()
+    evaluator.eval(parse("let f = fn(x) { x + true }"), environment)
+    evaluated = evaluator.apply_function(environment.get("f"), [obj.Integer(1)])
+    assert type(evaluated) == obj.Error, f'error escaped apply_function, got={evaluated}'
+    assert evaluated.message == "type mismatch: INTEGER + BOOLEAN", f'wrong message, got={evaluated.message}'
@@ -0,0 +1,42 @@
+import sys
+import simple_token
+import simple_parser
+import simple_heap_eval
+import object as obj
+
+def evaluate(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    program = parser.parse_program()
+    return simple_heap_eval.HeapEvaluator().eval(program, obj.Environment())
+
+def test_recursion_deeper_than_python_stack():
+    depth = sys.getrecursionlimit() * 10
+    test = f'let count = fn(n) {{ if (n == 0) {{ 0 }} else {{ 1 + count(n - 1) }} }}; count({depth})'
+    evaluated = evaluate(test)
+    assert not type(evaluated) == obj.Error, evaluated.message
+    assert evaluated.value == depth, f'wrong result, got={evaluated.inspect()}'
+
+def test_callbacks_deeper_than_python_stack():
+    depth = sys.getrecursionlimit() * 10
+    evaluated = evaluate(f'let count = fn(n) {{ if (n == 0) {{ 0 }} else {{ 1 + count(n - 1) }} }}; map(count, [{depth}, 1])')
+    assert evaluated.inspect() == f'[{depth}, 1]', f'map should call back through the heap evaluator, got={evaluated.inspect()}'
+
+def test_recursive_map():
+    test = """let map = fn(arr, f) { if (len(arr) == 0) { [] } else { let mapped = map(rest(arr), f); let head = [f(first(arr))]; concat(head, mapped) } };
+    let concat = fn(a, b) { if (len(b) == 0) { a } else { concat(push(a, first(b)), rest(b)) } };
+    map([1, 2, 3, 4], fn(x) { x * 2 })"""
+    evaluated = evaluate(test)
+    assert type(evaluated) == obj.Array, f'object is not Array, got={type(evaluated)}'
+    assert [element.value for element in evaluated.elements] == [2, 4, 6, 8]
+
+def test_errors_stop_evaluation():
+    tests = [("let f = fn(x) { x + true }; f(1); 5", "type mismatch: INTEGER + BOOLEAN"),
+            ("[1, foo, 3]", "identifier not found: foo"),
+            ('{[1]: 2}', "object type not supported for key, got=ARRAY"),
+            ("let f = fn() { if (true) { return bar; } 1 }; f()", "identifier not found: bar")]
+
+    for input, expected in tests:
+        evaluated = evaluate(input)
+        assert type(evaluated) == obj.Error, f'object is not Error, got={type(evaluated)}'
+        assert evaluated.message == expected, f'error message does not match. expected={expected}, got={evaluated.message}'
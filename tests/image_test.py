@@ -0,0 +1,66 @@
+import pytest
+import simple_token
+import simple_parser
+import simple_eval
+import simple_engine
+import simple_image
+import object as obj
+
+PRELUDE = """let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } };
+let counter = fn(start) { fn(step) { start + step } };
+let from_ten = counter(10);
+let table = {true: [1, 2, 3], "name": "monkey" + "-" + "image-with-a-name-long-enough-to-become-a-rope-in-the-string-object", 1: if (false) { 1 }};
+let numbers = range(5);
+let shared = [numbers, numbers];
+let add = fn(a, b) { a + b };
+let total = fn(xs) { reduce(add, xs, 0) };"""
+
+def run(input, environment, engine="eval"):
+    program = simple_parser.Parser(simple_token.Lexer(input)).parse_program()
+    return simple_engine.new_engine(engine).eval(program, environment)
+
+@pytest.mark.parametrize("engine", [engine for engine in simple_engine.ENGINES if engine != "python"])
+def test_round_trip(engine, tmp_path):
+    path = str(tmp_path / "prelude.image")
+    environment = obj.Environment()
+    run(PRELUDE, environment, engine)
+    simple_image.dump(environment, path, PRELUDE)
+    loaded = simple_image.load(path, PRELUDE)
+    tests = [("fib(15)", "610"), ("from_ten(5)", "15"), ("table[true]", "[1, 2, 3]"), ('len(table["name"])', "74"), ("table[1]", "null"),
+            ("total(numbers)", "10"), ("map(fn(x) { fib(x) }, numbers)", "[0, 1, 1, 2, 3]")]
+    for test in tests:
+        evaluated = run(test[0], loaded.fork(), engine)
+        assert evaluated.inspect() == test[1], f'wrong result for {test[0]} with {engine}, expected={test[1]}, got={evaluated.inspect()}'
+    assert loaded.get("table").get(simple_eval.TRUE) is not None, f'boolean keys were not mapped back to the shared keys'
+    assert loaded.get("table").get(obj.Integer(1)) is simple_eval.NULL, f'NULL was not mapped back to the singleton'
+    assert loaded.get("shared").get(0) is loaded.get("shared").get(1), f'shared arrays were copied'
+
+def test_recursive_function_is_a_cycle(tmp_path):
+    environment = obj.Environment()
+    run(PRELUDE, environment)
+    loaded = simple_image.loads(simple_image.dumps(environment, PRELUDE), PRELUDE)
+    fib = loaded.get("fib")
+    assert fib.environment is loaded, f'function environment should be the loaded environment itself'
+    assert loaded.get("add") is loaded.get("total").environment.get("add"), f'identity of functions was not preserved'
+
+def test_transpiled_functions_are_refused():
+    environment = obj.Environment()
+    run(PRELUDE, environment, "python")
+    with pytest.raises(simple_image.ImageError): simple_image.dumps(environment, PRELUDE)
+
+def test_invalidation(tmp_path):
+    environment = obj.Environment()
+    run(PRELUDE, environment)
+    image = simple_image.dumps(environment, PRELUDE)
+    assert simple_image.loads(image, PRELUDE + " ") is None, f'image of another source should be ignored'
+    stale = image[:len(simple_image.MAGIC)] + (simple_image.FORMAT_VERSION + 1).to_bytes(2, "little") + image[len(simple_image.MAGIC) + 2:]
+    assert simple_image.loads(stale, PRELUDE) is None, f'image of another format version should be ignored'
+    with pytest.raises(simple_image.ImageError): simple_image.loads(b"not an image", PRELUDE)
+    assert simple_image.load(str(tmp_path / "missing"), PRELUDE) is None
+
+def test_prelude_image(tmp_path):
+    path = str(tmp_path / "prelude.image")
+    simple_engine.Prelude(PRELUDE, image=path)
+    prelude = simple_engine.Prelude(PRELUDE, image=path)
+    evaluated = prelude.run(simple_parser.Parser(simple_token.Lexer("fib(10)")).parse_program())
+    assert evaluated.inspect() == "55", f'wrong result from an image prelude, got={evaluated.inspect()}'
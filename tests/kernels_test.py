@@ -0,0 +1,39 @@
+import pytest
+import simple_token
+import simple_parser
+import simple_eval
+import simple_kernels
+import object as obj
+
+def function(input):
+    program = simple_parser.Parser(simple_token.Lexer(input)).parse_program()
+    return simple_eval.Evaluator().eval(program, obj.Environment())
+
+def integers(values):
+    return obj.Array([obj.Integer(value) for value in values])
+
+def test_kernel_detection():
+    tests = [("fn(x) { x * 2 + -1 }", 1, True), ("fn(x) { x < 3 }", 1, True), ("fn(a, b) { a + b }", 2, True), ("fn(x) { y + x }", 1, False),
+            ("fn(x) { (x < 1) + 1 }", 1, False), ("fn(x) { let y = x; y }", 1, False), ("fn(x) { x }", 2, False), ('fn(x) { x + "a" }', 1, False)]
+    for test in tests:
+        found = simple_kernels.kernel(function(test[0]), test[1], True)
+        assert (found is not None) == test[2], f'wrong kernel detection for {test[0]}, expected={test[2]}'
+
+def test_kernels_agree_with_apply_function():
+    values = integers(range(-100, 100))
+    square = function("fn(x) { x * x - 3 }")
+    mapped = simple_kernels.map_kernel(square, values)
+    assert [element.value for element in mapped.elements] == [value * value - 3 for value in range(-100, 100)]
+    filtered = simple_kernels.filter_kernel(function("fn(x) { x > 97 }"), values)
+    assert filtered.inspect() == "[98, 99]", f'wrong filter, got={filtered.inspect()}'
+    reduced = simple_kernels.reduce_kernel(function("fn(a, b) { a + b * 2 }"), values, obj.Integer(1))
+    assert reduced.value == 1 + 2 * sum(range(-100, 100)), f'wrong reduce, got={reduced.inspect()}'
+    assert simple_kernels.map_kernel(square, obj.Array([obj.String("a")])) is None, f'kernel used on a generic array'
+
+def test_numpy_kernels():
+    pytest.importorskip("numpy")
+    values = integers(range(1000))
+    mapped = simple_kernels.map_kernel(function("fn(x) { x * 3 + 1 }"), values)
+    assert type(mapped.backing) is simple_kernels.array and mapped.get(999).value == 2998
+    big = simple_kernels.map_kernel(function("fn(x) { x * 10000000000 * 10000000000 }"), values)
+    assert big.get(999).value == 999 * 10 ** 20, f'int64 overflow in the vectorized kernel'
@@ -1,14 +1,19 @@
 import sys
+import io
+import mmap
+import random
 from pathlib import Path
 
 root_dir = Path(__file__).parent.parent
 sys.path.append(str(root_dir))
 
-from simple_token import Lexer, Token
+from simple_token import Lexer, RegexLexer, StreamLexer, Token
+import simple_parser
 
 def assert_tokens(input, assert_input):
-    lexer = Lexer(input)
+    for lexer in (Lexer(input), RegexLexer(input), StreamLexer(io.BytesIO(input.encode()), 4)): assert_lexer_tokens(lexer, assert_input)
 
+def assert_lexer_tokens(lexer, assert_input):
     for assert_token in assert_input:
         token = lexer.next_token()
         assert token.type == assert_token.type
@@ -134,3 +139,41 @@ if (5 < 10) {
 
     assert_tokens(input, assert_input)
 
+
+# offsets of the tokens up to the first EOF are compared too, the EOF returned after that only has to be another EOF
+def tokens(lexer):
+    found = []
+    while len(found) == 0 or found[-1][0] != "EOF":
+        token = lexer.next_token()
+        found.append((token.type, token.literal, lexer.token_offset))
+    token = lexer.next_token()
+    return found + [(token.type, token.literal)]
+
+def test_regex_lexer_matches_lexer():
+    tests = ["", "   ", "a_b_ x__", "_a", "a1b2", "12abc", '"unterminated', '"a" "" "b', "== = != ! @ # &", "héllo wörld", "x٣ ٣12 12٣ ½x", "a_é", "日本 = 1;", "let\x1cx\u00a0=\u20031;"]
+    for test in tests:
+        assert tokens(RegexLexer(test)) == tokens(Lexer(test)), f'lexers disagree on {test!r}'
+    alphabet = list('abxyzAZ_0129 \t\n"=!+-*/<>(){}[],;:@é٣½日') + ["fn", "let", "true", "if", "else", "return"]
+    generator = random.Random(22)
+    for _ in range(2000):
+        test = "".join(generator.choice(alphabet) for _ in range(generator.randint(0, 25)))
+        assert tokens(RegexLexer(test)) == tokens(Lexer(test)), f'lexers disagree on {test!r}'
+
+def test_stream_lexer_chunk_boundaries():
+    tests = ["héllo wörld = 日本;", 'let s = "' + "x" * 1000 + '"; s == s != !s', "a_é ٣12 12٣ ½x", '"unterminated é', "abc   "]
+    for test in tests:
+        for chunk_size in (1, 2, 3, 5, 64):
+            assert tokens(StreamLexer(io.BytesIO(test.encode()), chunk_size)) == tokens(Lexer(test)), f'stream lexer with chunks of {chunk_size} disagrees on {test!r}'
+
+def test_parse_from_path_and_mmap(tmp_path):
+    source = "let greet = fn(name) { \"hello \" + name }; let xs = [1, 2, 3];\n" * 50 + "greet(\"wörld\")"
+    path = tmp_path / "program.monkey"
+    path.write_bytes(source.encode())
+    expected = simple_parser.Parser(Lexer(source)).parse_program().string()
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for lexer in (StreamLexer(str(path), 16), StreamLexer(path), StreamLexer(mapped, 7), StreamLexer(io.BytesIO(source.encode()))):
+            parser = simple_parser.Parser(lexer)
+            program = parser.parse_program()
+            assert parser.errors == [], f'parser errors: {parser.errors}'
+            assert program.string() == expected, f'stream parse differs from parsing the whole string'
+    assert [token.literal for token in StreamLexer(io.BytesIO(b"a = 1"))][:3] == ["a", "=", "1"]
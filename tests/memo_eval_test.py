@@ -0,0 +1,57 @@
+import simple_token
+import simple_parser
+import simple_memo_eval
+import simple_purity
+import object as obj
+
+def parse(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    return parser.parse_program()
+
+def run(input, evaluator = None):
+    evaluator = evaluator if evaluator is not None else simple_memo_eval.MemoizingEvaluator()
+    environment = obj.Environment()
+    return evaluator.eval(parse(input), environment), environment, evaluator
+
+def test_purity():
+    tests = [("fn(x) { x + 1 }", True, []), ("fn(x) { puts(x) }", False, ["puts"]), ("fn(a) { push(a, 1) }", True, ["push"]),
+            ("fn(x) { let y = x; y + g(x) }", True, ["g"]), ("fn(x) { fn(y) { puts(y) } }", False, ["puts"]),
+            ("fn(x) { fn(y) { x + y + z } }", True, ["z"]), ("fn(x) { let y = y + x; y }", True, ["y"]), ("fn(x) { if (x) { let t = 1; t } else { t } }", True, ["t"]),
+            ("fn(x) { let g = fn(n) { g(n) + h(n) }; let h = fn(n) { n }; g(x) }", True, ["h"]), ("fn(x) { let g = fn(n) { let m = n; g(m) }; g(x) }", True, [])]
+    for test in tests:
+        node = parse(test[0]).statements[0].expression
+        simple_purity.PurityAnalyzer().analyze(node)
+        assert node.pure == test[1], f'wrong purity of {test[0]}, expected={test[1]}, got={node.pure}'
+        assert node.captured == test[2], f'wrong captured names of {test[0]}, expected={test[2]}, got={node.captured}'
+
+def test_fib_is_memoized():
+    evaluated, environment, evaluator = run("let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; fib(60)")
+    assert evaluated.value == 1548008755920, f'wrong result, got={evaluated.inspect()}'
+    stats = evaluator.memo_stats(environment.get("fib"))
+    assert stats == {"hits": 58, "misses": 61, "evictions": 0, "entries": 61}, f'wrong stats, got={stats}'
+
+def test_callbacks_are_memoized():
+    evaluated, environment, evaluator = run("let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; map(fib, [60, 60])")
+    assert evaluated.inspect() == "[1548008755920, 1548008755920]", f'wrong result, got={evaluated.inspect()}'
+    stats = evaluator.memo_stats(environment.get("fib"))
+    assert stats == {"hits": 59, "misses": 61, "evictions": 0, "entries": 61}, f'map should call back through the memoizing evaluator, got={stats}'
+
+def test_impure_calls_are_not_memoized():
+    evaluated, environment, evaluator = run("let log = fn(a) { puts(a); a }; log(1); log(1)")
+    assert evaluated.value == 1, f'wrong result, got={evaluated.inspect()}'
+    assert environment.get("log").memo is None
+    evaluated, environment, evaluator = run("let a = [1]; let f = fn(i) { len(a) + i }; f(1); let a = push(a, 2); f(1)")
+    assert evaluated.value == 3, f'array capture was memoized, got={evaluated.inspect()}'
+
+def test_rebound_captures_invalidate():
+    evaluated, environment, evaluator = run("let x = 1; let f = fn(a) { a + x }; let y = f(1); let x = 10; y + f(1)")
+    assert evaluated.value == 13, f'stale result, got={evaluated.inspect()}'
+    evaluated, _, _ = run("let x = 1; let g = fn() { x }; let f = fn(a) { a + g() }; let y = f(1); let x = 10; y + f(1)")
+    assert evaluated.value == 13, f'stale result through a captured function, got={evaluated.inspect()}'
+
+def test_eviction():
+    source = "let f = fn(n) { n * 2 }; f(1); f(2); f(1); f(3); f(1)"
+    for eviction, stats in [("lru", {"hits": 2, "misses": 3, "evictions": 1, "entries": 2}), ("fifo", {"hits": 1, "misses": 4, "evictions": 2, "entries": 2})]:
+        _, environment, evaluator = run(source, simple_memo_eval.MemoizingEvaluator(cache_size=2, eviction=eviction))
+        assert evaluator.memo_stats(environment.get("f")) == stats, f'{eviction}: wrong stats, got={evaluator.memo_stats(environment.get("f"))}'
@@ -1,3 +1,4 @@
+import pickle
 import simple_token
 import simple_parser
 import simple_ast
@@ -21,4 +22,74 @@ def test_string_hashes():
     assert integer_3.hashkey() != boolean_3.hashkey(), f'hashkeys of different value are equal'
     assert integer_3.hashkey() != string_3.hashkey(), f'hashkeys of different value are equal'
     assert boolean_3.hashkey() != string_3.hashkey(), f'hashkeys of different value are equal'
-    
\ No newline at end of file
+    
+def test_small_integer_cache():
+    assert object.new_integer(256) is object.new_integer(256), f'small integers are not shared'
+    assert object.new_integer(-5) is object.new_integer(-5), f'small integers are not shared'
+    assert object.new_integer(257) is not object.new_integer(257), f'large integers are shared'
+    assert type(object.new_integer(1.0).value) is float, f'floats are served from the integer cache'
+
+def test_array_views():
+    array = object.Array([object.Integer(1), object.Integer(2)])
+    rest = array.rest()
+    pushed = array.push(object.Integer(3))
+    branched = array.push(object.Integer(4))
+    assert [element.value for element in array.elements] == [1, 2], f'push changed the original, got={array.inspect()}'
+    assert [element.value for element in rest.elements] == [2], f'wrong rest, got={rest.inspect()}'
+    assert [element.value for element in pushed.elements] == [1, 2, 3], f'wrong push, got={pushed.inspect()}'
+    assert [element.value for element in branched.elements] == [1, 2, 4], f'wrong push of a shared array, got={branched.inspect()}'
+    assert pushed.backing is array.backing and rest.backing is array.backing, f'elements were copied'
+    assert rest.push(object.Integer(5)).inspect() == "[2, 5]" and rest.inspect() == "[2]"
+
+def test_large_arrays():
+    array = object.Array([])
+    for i in range(100000): array = array.push(object.Integer(i))
+    assert array.length() == 100000 and len(array.backing) == 100000, f'push copied, backing has {len(array.backing)} elements'
+    for _ in range(99999): array = array.rest()
+    assert array.length() == 1 and array.get(0).value == 99999, f'wrong rest, got={array.inspect()}'
+    # views of a backing that is not int64 only must not scan it again
+    array = object.Array([object.Integer(1), object.Integer(2 ** 70)])
+    for i in range(100000): array = array.push(object.Integer(i))
+    for _ in range(99999): array = array.rest()
+    assert array.length() == 3 and type(array.backing) is list, f'wrong views of a mixed array, got={array.inspect()}'
+
+def test_string_ropes():
+    chunk = object.String("x" * 100)
+    string = object.String("")
+    for _ in range(100000): string = string.concat(chunk)
+    assert string.flat is None and string.length == 10000000, f'concatenation was flattened eagerly'
+    assert string.value == "x" * 10000000, f'wrong contents'
+    assert string.flat is not None and string.left is None, f'flattened contents are not cached'
+    short = object.String("ab").concat(object.String("cd"))
+    assert short.flat == "abcd", f'short strings are not joined right away'
+    assert short.hashkey() == object.String("abcd").hashkey()
+
+def test_hash_keys_are_exact():
+    hash_dict = object.Hash()
+    hash_dict.set(object.Integer(-1), object.String("minus one"))
+    hash_dict.set(object.Integer(-2), object.String("minus two"))
+    hash_dict.set(object.Integer(1), object.String("one"))
+    hash_dict.set(object.Boolean(True), object.String("true"))
+    hash_dict.set(object.String("1"), object.String("string"))
+    assert hash(-1) == hash(-2), f'python hashes of the keys should collide'
+    assert len(hash_dict.dict) == 5, f'keys overwrote each other, got={hash_dict.inspect()}'
+    assert hash_dict.get(object.Integer(-1)).value == "minus one"
+    assert hash_dict.get(object.Boolean(True)).value == "true" and hash_dict.get(object.Integer(1)).value == "one"
+    assert hash_dict.get(object.Boolean(False)) is None
+    assert hash_dict.inspect() == "{-1: minus one, -2: minus two, 1: one, True: true, 1: string}", f'wrong inspect, got={hash_dict.inspect()}'
+    copied = pickle.loads(pickle.dumps(hash_dict))
+    assert copied.get(object.Boolean(True)).value == "true" and copied.get(object.Integer(1)).value == "one", f'boolean key lost in a pickle round trip, got={copied.inspect()}'
+    assert pickle.loads(pickle.dumps(object.BOOLEAN_KEYS[1])) is object.BOOLEAN_KEYS[1], f'unpickled boolean keys should be the shared ones'
+
+def test_typed_integer_arrays():
+    array = object.Array([object.Integer(1), object.Integer(2)])
+    assert array.backing.typecode == "q", f'integer array is not typed, got={type(array.backing)}'
+    pushed = array.push(object.Integer(3))
+    assert pushed.backing is array.backing and pushed.inspect() == "[1, 2, 3]", f'wrong push, got={pushed.inspect()}'
+    mixed = pushed.push(object.String("a"))
+    assert type(mixed.backing) is list and mixed.inspect() == "[1, 2, 3, a]", f'wrong fallback, got={mixed.inspect()}'
+    assert pushed.inspect() == "[1, 2, 3]" and array.inspect() == "[1, 2]", f'fallback changed the original'
+    assert type(object.Array([object.Integer(1.5)]).backing) is list, f'floats are stored as int64'
+    assert type(object.Array([object.Integer(2 ** 63)]).backing) is list, f'big integers are stored as int64'
+    assert type(array.push(object.Integer(2 ** 64)).backing) is list
+    assert array.get(1).value == 2 and array.rest().get(0).value == 2 and array.rest().elements[0].value == 2
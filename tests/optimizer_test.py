@@ -0,0 +1,68 @@
+import simple_token
+import simple_parser
+import simple_optimizer
+import simple_engine
+import object as obj
+
+def parse(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    return parser.parse_program()
+
+def optimize(input):
+    optimizer = simple_optimizer.Optimizer()
+    return optimizer.optimize(parse(input)), optimizer
+
+def test_constant_folding():
+    tests = [("1 + 2 * 3", "7"), ("-5 - 5", "-10"), ('"a" + "b"', "ab"), ("1 < 2 == true", "true"), ("!5", "false"),
+            ("10 / 2", "(10 / 2)"), ("true + 1", "(true + 1)"), ("-true", "(-true)"), ("x + 1 * 2", "(x + 2)")]
+    for test in tests:
+        program, _ = optimize(test[0])
+        assert program.string() == test[1], f'wrong folding of {test[0]}, expected={test[1]}, got={program.string()}'
+
+def test_algebraic_simplification():
+    tests = [("let x = 2 + 3; x * 1", "let: x = 5;x"), ("let x = 2; 0 + x + 0", "let: x = 2;x"), ("let x = 2; x * 0", "let: x = 2;0"),
+            ("let x = 2; x - x", "let: x = 2;0"), ("fn(x) { x * 1 }", "fn (x) { (x * 1) }"), ("fn(x) { (x * 2) * 1 }", "fn (x) { (x * 2) }"),
+            ("fn(x) { (x * 2) + 0 }", "fn (x) { ((x * 2) + 0) }"), ('let x = 2; let x = "a"; x * 1', 'let: x = 2;let: x = a;(x * 1)'),
+            ("let x = 2; if (y) { let x = y; } x * 1", "let: x = 2;if y let: x = y;(x * 1)")]
+    for test in tests:
+        program, _ = optimize(test[0])
+        assert program.string() == test[1], f'wrong simplification of {test[0]}, expected={test[1]}, got={program.string()}'
+
+def test_dead_branch_elimination():
+    tests = [("if (1 < 2) { 10 } else { 20 }", "10"), ("if (false) { 10 }; 5", "5"), ("if (false) { 10 }", "if false 10"),
+            ("let f = fn() { if (true) { let a = 1; return a; } 5 }", "let: f = fn () { let: a = 1;return a;5 };"),
+            ("let a = if (2 > 3) { 1 } else { 2 }", "let: a = 2;"), ("if (true) { } 1", "if true 1")]
+    for test in tests:
+        program, _ = optimize(test[0])
+        assert program.string() == test[1], f'wrong elimination of {test[0]}, expected={test[1]}, got={program.string()}'
+
+def test_unused_let_elimination():
+    tests = [("let f = fn() { let a = 1; let b = fn() { 2 }; 3 }", "let: f = fn () { 3 };"), ("let a = 1;", "let: a = 1;"),
+            ("fn() { let a = puts(1); 3 }", "fn () { let: a = puts(1);3 }"), ("fn() { let a = 1; a }", "fn () { let: a = 1;a }"),
+            ("fn() { 3; let a = 1 }", "fn () { 3let: a = 1; }")]
+    for test in tests:
+        program, _ = optimize(test[0])
+        assert program.string() == test[1], f'wrong elimination of {test[0]}, expected={test[1]}, got={program.string()}'
+
+def test_stats_report():
+    _, optimizer = optimize("let f = fn() { let unused = 1; if (1 < 2) { 3 * 1 } else { 4 } }; f()")
+    stats = {stats.name: stats for stats in reversed(optimizer.stats)}
+    assert stats["constant folding"].rewrites == 2, f'wrong folding count, got={stats["constant folding"].rewrites}'
+    assert stats["constant folding"].eliminated() == 4, f'wrong eliminated count, got={stats["constant folding"].eliminated()}'
+    assert stats["dead branch elimination"].rewrites == 1
+    assert stats["unused let elimination"].rewrites == 1
+    assert stats["unused let elimination"].eliminated() == 2
+    assert "dead branch elimination: 1 rewrite(s)" in optimizer.report(), f'wrong report, got={optimizer.report()}'
+
+def test_optimized_programs_agree():
+    tests = ["let x = 10 / 4; x * 1 - 0", "let f = fn(n) { if (1 > 2) { 0 } else { n * 1 + 0 } }; f(7)", '"a" * 1', "let a = [1, 2 * 3]; a[0 + 1]",
+            "let f = fn(x) { if (true) { return x * 2; } 0 }; f(4)", "if (false) { 1 }", '{"a" + "b": 1 + 1}["ab"]', "let x = 0 / -1; x + 0",
+            "let f = fn() { let g = fn() { 1 }; 2 }; f()", "let f = fn(x) { if (x) { let y = 1; } y }; f(false)", "5 + true; 1"]
+    for test in tests:
+        for engine in simple_engine.ENGINES:
+            expected = simple_engine.new_engine(engine).eval(parse(test), obj.Environment())
+            program, _ = optimize(test)
+            optimized = simple_engine.new_engine(engine).eval(program, obj.Environment())
+            assert type(optimized) == type(expected), f'{engine}: wrong type for {test}, expected={type(expected)}, got={type(optimized)}'
+            if expected is not None: assert optimized.inspect() == expected.inspect(), f'{engine}: wrong result for {test}, expected={expected.inspect()}, got={optimized.inspect()}'
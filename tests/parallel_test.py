@@ -0,0 +1,47 @@
+import simple_token
+import simple_parser
+import simple_eval
+import simple_parallel
+import simple_engine
+import object as obj
+
+def run(input):
+    program = simple_parser.Parser(simple_token.Lexer(input)).parse_program()
+    return simple_eval.Evaluator().eval(program, obj.Environment())
+
+def test_pmap_matches_map():
+    tests = ["fn(x) { x * x }", "let k = 3; fn(x) { x + k }", 'let names = {1: "one"}; fn(x) { if (x < 2) { names[1] } else { "many" } }',
+            "let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; fib", "let double = fn(x) { x * 2 }; fn(x) { double(len([x, x])) + x }",
+            "fn(x) { let y = x * 2; y }", "let y = puts; fn(x) { let y = x * 2; y }", "fn(x) { let square = fn(n) { n * n }; square(x) + 1 }",
+            "let square = [fn(n) { n }]; fn(x) { let square = fn(n) { n * n }; square(x) }"]
+    for workers, chunk_size in [(1, 1024), (2, 7)]:
+        simple_parallel.configure(workers=workers, chunk_size=chunk_size)
+        for test in tests:
+            expected = run(f'let f = {test}; map(f, range(20))').inspect()
+            value = run(f'let f = {test}; pmap(f, range(20))')
+            assert value.inspect() == expected, f'wrong pmap for {test} with {workers} worker(s), expected={expected}, got={value.inspect()}'
+        value = run("let r = pmap(fn(x) { {true: x} }, range(20)); r[1][true] + r[19][true]")
+        assert value.inspect() == "20", f'boolean keys were lost on the way back from a worker with {workers} worker(s), got={value.inspect()}'
+    simple_parallel.configure(workers=1, chunk_size=1024)
+
+def test_pmap_errors():
+    simple_parallel.configure(workers=2, chunk_size=4)
+    tests = [("pmap(fn(x) { puts(x) }, [1])", "function passed to 'pmap' must be pure, it calls puts"),
+            ("let p = puts; pmap(fn(x) { p(x) }, [1])", "function passed to 'pmap' must be pure, p is puts"),
+            ("pmap(puts, [1])", "function passed to 'pmap' must be pure, the function is puts"),
+            ("let a = [fn(x) { x }]; pmap(fn(x) { a }, [1])", "function passed to 'pmap' captures a of type ARRAY, which cannot be sent to a worker"),
+            ("pmap(fn(x) { x + true }, range(10))", "type mismatch: INTEGER + BOOLEAN"),
+            ("pmap(fn(x, y) { x }, [1])", "function passed to 'pmap' must take 1 argument(s), got 2"),
+            ("pmap(1, [1])", "first argument to 'pmap' must be FUNCTION, got INTEGER")]
+    for test in tests:
+        value = run(test[0])
+        assert type(value) == obj.Error, f'expected an error for {test[0]}, got={value.inspect()}'
+        assert value.message == test[1], f'wrong error for {test[0]}, expected={test[1]}, got={value.message}'
+    simple_parallel.configure(workers=1, chunk_size=1024)
+
+def test_captures_outside_the_environment():
+    for engine in simple_engine.ENGINES:
+        program = simple_parser.Parser(simple_token.Lexer("let mk = fn(k) { fn(x) { x + k } }; pmap(mk(10), range(3))")).parse_program()
+        value = simple_engine.new_engine(engine).eval(program, obj.Environment())
+        if engine in ("vm", "python"): assert value.inspect() == "ERROR: function passed to 'pmap' captures k, which is not in its environment and cannot be sent to a worker", f'expected a shipping error with {engine}, got={value.inspect()}'
+        else: assert value.inspect() == "[10, 11, 12]", f'wrong pmap with {engine}, got={value.inspect()}'
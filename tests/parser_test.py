@@ -1,3 +1,4 @@
+import sys
 import simple_token
 import simple_parser
 import simple_ast
@@ -395,6 +396,19 @@ def test_empty_hash_literal():
     assert type(statement.expression) == simple_ast.HashLiteral, f'statement.expression is not HashLiteral, got={type(statement.expression)}'
     assert len(statement.expression.dict) == 0, f'dictionary length does not match, got={len(statement.expression.dict)}'
 
+def test_node_offsets():
+    test_input = 'let x = 5 + y;\n  f("s", !x)'
+    for lexer in (simple_token.Lexer(test_input), simple_token.RegexLexer(test_input)):
+        parser = simple_parser.Parser(lexer)
+        program = parser.parse_program()
+        check_parser_errors(parser.errors)
+        let, call = program.statements[0], program.statements[1].expression
+        offsets = [let.offset, let.name.offset, let.value.offset, let.value.left.offset, let.value.right.offset, call.function.offset, call.offset, call.arguments[0].offset, call.arguments[1].offset]
+        assert offsets == [0, 4, 10, 8, 12, 17, 18, 19, 24], f'wrong offsets with {type(lexer).__name__}, got={offsets}'
+        assert [let.token_literal(), let.value.token_literal(), call.token_literal(), call.arguments[0].token_literal()] == ["let", "+", "(", "s"], f'wrong token literals'
+        assert let.name.value is sys.intern("x"), f'identifier names are not interned'
+        assert not hasattr(let, "__dict__") and not hasattr(call, "__dict__"), f'nodes should only have slots'
+
 def function_with_params(test_input, parameters):
     lexer = simple_token.Lexer(test_input)
     parser = simple_parser.Parser(lexer)
@@ -0,0 +1,73 @@
+import simple_token
+import simple_parser
+import simple_resolver
+import simple_eval
+import simple_builtins
+import object as obj
+
+def parse(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    return parser.parse_program()
+
+def evaluate(input):
+    return simple_eval.Evaluator().eval(parse(input), obj.Environment())
+
+def test_identifier_coordinates():
+    program = parse("let g = 1; fn(a) { let b = a; fn(c) { a + b + c + g + len } }")
+    simple_resolver.Resolver().resolve(program)
+    outer = program.statements[1].expression
+    assert outer.names == {"a": 0, "b": 1}, f'wrong slots, got={outer.names}'
+    assert outer.body.statements[0].slot == 1
+    inner = outer.body.statements[1].expression
+    sum = inner.body.statements[0].expression
+    len_identifier, g, c = sum.right, sum.left.right, sum.left.left.right
+    b, a = sum.left.left.left.right, sum.left.left.left.left
+    assert (a.depth, a.slot) == (1, 0)
+    assert (b.depth, b.slot) == (1, 1)
+    assert (c.depth, c.slot) == (0, 0)
+    assert (g.depth, g.slot, g.builtin) == (2, None, None)
+    assert (len_identifier.depth, len_identifier.slot) == (2, None)
+    assert len_identifier.builtin is simple_builtins.functions["len"]
+
+def test_deeply_nested_closures():
+    test = "let x = 1; let f = fn(a) { fn(b) { fn(c) { x + a + b + c } } }; f(2)(3)(4)"
+    evaluated = evaluate(test)
+    assert type(evaluated) == obj.Integer and evaluated.value == 10, f'wrong result, got={evaluated.inspect()}'
+
+def test_unset_slots_fall_back_to_outer_bindings():
+    tests = [("let x = 1; let f = fn() { let y = x; let x = 2; y + x }; f()", 3),
+            ("let x = 1; let f = fn(c) { if (c) { let x = 5; } x }; f(false)", 1),
+            ("let x = 1; let f = fn(c) { if (c) { let x = 5; } x }; f(true)", 5),
+            ("let f = fn() { let g = fn() { x }; let x = 7; g() }; f()", 7)]
+
+    for input, expected in tests:
+        evaluated = evaluate(input)
+        assert type(evaluated) == obj.Integer and evaluated.value == expected, f'wrong result for {input}, got={evaluated.inspect()}'
+
+def test_slot_environment():
+    outer = obj.Environment()
+    outer.set("x", obj.Integer(1))
+    environment = obj.SlotEnvironment({"a": 0}, outer)
+    environment.set("a", obj.Integer(2))
+    assert environment.slots == [environment.get("a")]
+    assert environment.get("x").value == 1
+    assert environment.get_slot(0, 0).value == 2
+
+def test_tail_calls_are_marked():
+    program = parse("let f = fn(n) { if (n > 0) { return g(n); } h(n); if (n) { g(n) } else { 1 + g(n) } }")
+    simple_resolver.Resolver().resolve(program)
+    body = program.statements[0].value.body.statements
+    assert body[0].expression.consequence.statements[0].value.tail, 'return in a statement if is a tail call'
+    assert not body[1].expression.tail, 'call before the last statement is not a tail call'
+    assert body[2].expression.consequence.statements[0].expression.tail, 'last call of a tail if branch is a tail call'
+    assert not body[2].expression.alternative.statements[0].expression.right.tail, 'operand of an infix is not a tail call'
+
+def test_tail_recursion_runs_in_constant_stack():
+    tests = [("let loop = fn(n, acc) { if (n == 0) { acc } else { loop(n - 1, acc + n) } }; loop(20000, 0)", 200010000),
+            ("let even = fn(n) { if (n == 0) { true } else { odd(n - 1) } }; let odd = fn(n) { if (n == 0) { false } else { return even(n - 1); } }; even(20001)", False)]
+
+    for input, expected in tests:
+        evaluated = evaluate(input)
+        assert not type(evaluated) == obj.Error, evaluated.message
+        assert evaluated.value == expected, f'wrong result for {input}, got={evaluated.inspect()}'
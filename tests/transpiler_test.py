@@ -0,0 +1,67 @@
+import hashlib
+import simple_token
+import simple_parser
+import simple_transpiler
+import simple_eval
+import object as obj
+
+def parse(input):
+    lexer = simple_token.Lexer(input)
+    parser = simple_parser.Parser(lexer)
+    return parser.parse_program()
+
+def test_programs_are_lowered():
+    tests = ["let fib = fn(n) { if (n < 2) { n } else { fib(n - 1) + fib(n - 2) } }; fib(10)",
+            "let f = fn(x) { if (x > 1) { let y = x * 2; return y; } 0 }; f(5)",
+            'let h = {"a": [1, 2]}; h["a"][1]']
+
+    for input in tests:
+        program = parse(input)
+        simple_transpiler.Transpiler().eval(program, obj.Environment())
+        assert type(program.transpiled) == simple_transpiler.TranspiledProgram, f'program was not lowered: {input}'
+
+def test_unsupported_programs_fall_back():
+    tests = [("let x = 1; let f = fn() { let y = x; let x = 2; y + x }; f()", 3),
+            ("let f = fn() { 1 + if (true) { let a = 1; a } else { 2 } }; f()", 2),
+            ("let None = 5; None", 5)]
+
+    for input, expected in tests:
+        program = parse(input)
+        evaluated = simple_transpiler.Transpiler().eval(program, obj.Environment())
+        assert program.transpiled is False, f'program should not be lowered: {input}'
+        assert type(evaluated) == obj.Integer and evaluated.value == expected, f'wrong result for {input}, got={evaluated.inspect()}'
+
+def test_source_cache():
+    source = "let double = fn(x) { x * 2 }; double(21)"
+    transpiler = simple_transpiler.Transpiler()
+    first = transpiler.eval_source(source, obj.Environment())
+    cached = len(simple_transpiler.Transpiler.cache)
+    second = transpiler.eval_source(source, obj.Environment())
+    assert first.value == 42 and second.value == 42
+    assert len(simple_transpiler.Transpiler.cache) == cached, 'same source was transpiled twice'
+
+def test_source_cache_is_bounded():
+    transpiler, size = simple_transpiler.Transpiler(), simple_transpiler.Transpiler.CACHE_SIZE
+    first = "let first_source = 1; first_source"
+    transpiler.eval_source(first, obj.Environment())
+    for i in range(size): transpiler.eval_source(f'{i} + 1', obj.Environment())
+    assert len(simple_transpiler.Transpiler.cache) == size, f'cache grew past its size, got={len(simple_transpiler.Transpiler.cache)}'
+    assert hashlib.sha256(first.encode()).hexdigest() not in simple_transpiler.Transpiler.cache, 'the least recently used source should have been dropped'
+
+def test_forked_environments_are_transpiled():
+    outer = obj.Environment()
+    simple_eval.Evaluator().eval(parse("let double = fn(x) { x * 2 }; let len = fn(x) { 99 }; let k = 3;"), outer)
+    tests = [("double(k) + len([1])", "105"), ("let k = 10; double(k)", "20"), ("let f = fn(x) { double(x) + k }; f(1)", "5"), ("first([1])", "1"), ("missing", "ERROR: identifier not found: missing")]
+    for input, expected in tests:
+        program, environment = parse(input), outer.fork()
+        evaluated = simple_transpiler.Transpiler().eval(program, environment)
+        assert type(program.transpiled) == simple_transpiler.TranspiledProgram, f'program in a fork was not lowered: {input}'
+        assert evaluated.inspect() == expected, f'wrong result in a fork for {input}, expected={expected}, got={evaluated.inspect()}'
+    assert outer.get("k").value == 3, f'a let in a fork wrote into the outer environment'
+
+def test_environment_is_shared_with_evaluator():
+    environment = obj.Environment()
+    simple_transpiler.Transpiler().eval(parse("let add = fn(x) { fn(y) { x + y } }; let addTwo = add(2);"), environment)
+    assert "__builtins__" not in environment.environment
+    evaluated = simple_eval.Evaluator().eval(parse("addTwo(3)"), environment)
+    assert type(evaluated) == obj.Integer and evaluated.value == 5, f'wrong result, got={evaluated.inspect()}'